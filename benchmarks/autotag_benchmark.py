@@ -0,0 +1,114 @@
+"""Benchmark of the auto-tagging paths under Pulumi mocks.
+
+Compares registering resources through the stack transformation against
+letting the AWS provider apply tags via `aws:defaultTags`. Each path runs in a
+fresh interpreter: a stack transformation stays registered on the root stack
+resource for the rest of the process, so the second path would still go through it.
+
+Usage:
+    python benchmarks/autotag_benchmark.py [--resources 5000] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+import pulumi
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import autotag  # noqa: E402
+
+AUTO_TAGS = {"PROJECT": "WeatherAlertingSystem"}
+PATHS = ("transformation", "default_tags")
+
+
+class BenchmarkMocks(pulumi.runtime.Mocks):
+    def new_resource(self, args):
+        return f"{args.name}_id", args.inputs
+
+    def call(self, args):
+        return {}
+
+
+class MockedResource(pulumi.CustomResource):
+    def __init__(self, type_, name):
+        super().__init__(type_, name, {"tags": None})
+
+
+# register_resources registers count resources in this interpreter, and returns the seconds it took and the
+# number of resources that went through the auto_tag transformation.
+def register_resources(count, use_default_tags):
+    types = autotag.taggable_resource_types
+    config = {"aws:defaultTags": json.dumps({"tags": AUTO_TAGS})} if use_default_tags else {}
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    pulumi.runtime.set_all_config(config)
+    pulumi.runtime.set_mocks(BenchmarkMocks(), preview=True)
+    transformed = 0
+    auto_tag = autotag.auto_tag
+
+    def counting_auto_tag(args, auto_tags):
+        nonlocal transformed
+        transformed += 1
+        return auto_tag(args, auto_tags)
+
+    autotag.auto_tag = counting_auto_tag
+    start = time.perf_counter()
+    autotag.register_auto_tags(AUTO_TAGS)
+    for index in range(count):
+        MockedResource(types[index % len(types)], f"resource-{index}")
+    asyncio.get_event_loop().run_until_complete(pulumi.runtime.stack.wait_for_rpcs())
+    return time.perf_counter() - start, transformed
+
+
+def run_path(path, count, repeat):
+    seconds, transformed = [], 0
+    for _ in range(repeat):
+        child = subprocess.run(
+            [sys.executable, __file__, "--child", path, "--resources", str(count)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(child.stdout.splitlines()[-1])
+        seconds.append(result["seconds"])
+        transformed = result["transformed"]
+    return statistics.median(seconds), transformed
+
+
+def lookup_benchmark(number):
+    types = autotag.taggable_resource_types + ["awsx:ec2:Vpc", "pulumi:pulumi:Stack"]
+    linear = timeit.timeit(lambda: [t in autotag.taggable_resource_types for t in types], number=number)
+    indexed = timeit.timeit(lambda: [autotag.is_taggable(t) for t in types], number=number)
+    return linear, indexed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resources", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", choices=PATHS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        seconds, transformed = register_resources(args.resources, use_default_tags=args.child == "default_tags")
+        print(json.dumps({"seconds": seconds, "transformed": transformed}))
+        return
+
+    linear, indexed = lookup_benchmark(args.lookups)
+    print(f"is_taggable lookups: linear scan {linear:.3f}s, frozenset index {indexed:.3f}s")
+
+    for path in PATHS:
+        seconds, transformed = run_path(path, args.resources, args.repeat)
+        print(f"{args.resources} resources through {path}: {seconds:.3f}s median, {transformed} transformed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Check of the resource dependency graph the program registers under Pulumi mocks.
+
+Runs src/__main__.py offline like stack_benchmark.py and records the parent and dependencies of every resource.
+The check fails when an AWS resource is not parented to a component, or when resources that only need their own
+inputs wait on each other: the frontend bucket, the DocumentDB cluster and the IAM roles. It also prints the
+longest chain of dependent resources, the part of `pulumi up` that cannot run in parallel.
+
+Usage:
+    python benchmarks/dependency_graph.py [--config alerts:enabled=true ...]
+"""
+
+import argparse
+import asyncio
+import functools
+import os
+import runpy
+import sys
+
+import pulumi
+
+from stack_benchmark import (
+    BENCHMARK_CONFIG,
+    SRC_DIR,
+    BenchmarkMocks,
+    BenchmarkMonitor,
+    ComponentProfiler,
+    parse_config_overrides,
+)
+
+COMPONENT_TYPE_PREFIX = "weather-alerting:components:"
+# Resources registered at the stack root on purpose, shared by several components.
+ROOT_RESOURCES = {"GithubProvider"}
+# Types of the resources that must not wait on each other.
+INDEPENDENT_RESOURCE_TYPES = {"aws:s3/bucket:Bucket", "aws:docdb/cluster:Cluster", "aws:iam/role:Role"}
+# Types whose resources may wait on another of the same type, like secondary clusters of a global cluster.
+REPLICATED_RESOURCE_TYPES = {"aws:docdb/cluster:Cluster"}
+
+
+class GraphMonitor(BenchmarkMonitor):
+    def __init__(self, mocks):
+        super().__init__(mocks)
+        self.registrations = {}
+
+    def RegisterResource(self, request):
+        response = super().RegisterResource(request)
+        self.registrations[response.urn] = {
+            "type": request.type,
+            "name": request.name,
+            "custom": request.custom,
+            "parent": request.parent,
+            "dependencies": set(request.dependencies),
+        }
+        return response
+
+
+class DependencyGraph:
+    def __init__(self, registrations):
+        self.registrations = registrations
+        self.children = {}
+        for urn, registration in registrations.items():
+            self.children.setdefault(registration["parent"], []).append(urn)
+
+    # custom_resources maps a component to the custom resources below it, which are what a dependency on it
+    # waits for. Remote components like the awsx VPC register their children in their provider, not here.
+    def custom_resources(self, urn):
+        if urn not in self.registrations or self.registrations[urn]["custom"] or urn not in self.children:
+            return {urn}
+        resources = set()
+        for child in self.children.get(urn, []):
+            resources |= self.custom_resources(child)
+        return resources
+
+    def direct_dependencies(self, urn):
+        dependencies = set()
+        for dependency in self.registrations[urn]["dependencies"]:
+            dependencies |= self.custom_resources(dependency)
+        return dependencies - {urn}
+
+    @functools.lru_cache(maxsize=None)
+    def transitive_dependencies(self, urn):
+        dependencies = set()
+        for dependency in self.direct_dependencies(urn):
+            if dependency in self.registrations:
+                dependencies |= {dependency} | self.transitive_dependencies(dependency)
+        return frozenset(dependencies)
+
+    @functools.lru_cache(maxsize=None)
+    def longest_chain(self, urn):
+        chains = [self.longest_chain(dependency) for dependency in self.direct_dependencies(urn)]
+        return max(chains, key=len, default=()) + (urn,)
+
+    def resource_urns(self):
+        return [urn for urn in self.registrations if self.custom_resources(urn) == {urn}]
+
+    def describe(self, urn):
+        registration = self.registrations[urn]
+        return f"{registration['type']}::{registration['name']}"
+
+
+def build_graph(config):
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    pulumi.runtime.set_all_config(config)
+    mocks = BenchmarkMocks(ComponentProfiler())
+    monitor = GraphMonitor(mocks)
+    pulumi.runtime.set_mocks(mocks, preview=True, monitor=monitor)
+    runpy.run_path(os.path.join(SRC_DIR, "__main__.py"), run_name="__main__")
+    asyncio.get_event_loop().run_until_complete(pulumi.runtime.stack.wait_for_rpcs())
+    return DependencyGraph(monitor.registrations)
+
+
+def check_graph(graph):
+    failures = []
+    for urn in graph.resource_urns():
+        registration = graph.registrations[urn]
+        parent = graph.registrations.get(registration["parent"])
+        is_component_child = parent is not None and parent["type"].startswith(COMPONENT_TYPE_PREFIX)
+        if not is_component_child and registration["name"] not in ROOT_RESOURCES:
+            failures.append(f"{graph.describe(urn)} is not part of a component")
+
+    independent = {
+        urn for urn in graph.resource_urns() if graph.registrations[urn]["type"] in INDEPENDENT_RESOURCE_TYPES
+    }
+    for urn in sorted(independent):
+        for dependency in sorted(graph.transitive_dependencies(urn) & independent):
+            typ = graph.registrations[urn]["type"]
+            if typ in REPLICATED_RESOURCE_TYPES and graph.registrations[dependency]["type"] == typ:
+                continue
+            failures.append(f"{graph.describe(urn)} waits on {graph.describe(dependency)}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", action="append", default=[], metavar="KEY=VALUE", help="stack config override")
+    args = parser.parse_args()
+
+    graph = build_graph({**BENCHMARK_CONFIG, **parse_config_overrides(args.config)})
+    critical_path = max((graph.longest_chain(urn) for urn in graph.resource_urns()), key=len, default=())
+    print(f"{len(graph.resource_urns())} resources, critical path of {len(critical_path)}:")
+    for urn in critical_path:
+        print(f"  {graph.describe(urn)}")
+    failures = check_graph(graph)
+    for failure in failures:
+        print(f"Dependency check failed: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
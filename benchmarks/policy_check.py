@@ -0,0 +1,148 @@
+"""Check of the performance policy pack against the resources the program registers under Pulumi mocks.
+
+Runs src/__main__.py offline like stack_benchmark.py, once per scenario, and validates the recorded resource inputs
+with the rules of policy/performance_rules.py. The dev scenario, shaped like Pulumi.WeatherAlerting.dev.yaml, must
+trip every rule, and the production scenario none of them.
+
+Usage:
+    python benchmarks/policy_check.py
+"""
+
+import asyncio
+import os
+import runpy
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+import pulumi
+from pulumi.runtime import rpc
+
+from stack_benchmark import BENCHMARK_CONFIG, SRC_DIR, BenchmarkMocks, BenchmarkMonitor, ComponentProfiler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "policy"))
+
+from performance_rules import RULES  # noqa: E402
+
+# Overrides of the benchmark config every rule accepts.
+PRODUCTION_OVERRIDES = {
+    "backend:log_level": "info",
+    "backend:cron_config": "*/5 * * * *",
+    "backend:auto_scaling_max_instances": "4",
+    "backend:app_runner_auto_deployment": "false",
+    "database:instances_number": "2",
+    "networking:nat_strategy": "one_per_az",
+}
+# Outputs the backend environment is built from, so its variables are known in the mocked preview.
+ENDPOINT_OUTPUTS = {
+    "aws:docdb/cluster:Cluster": {"endpoint": "docdb.mock", "readerEndpoint": "docdb-ro.mock"},
+    "aws:elasticache/replicationGroup:ReplicationGroup": {"primaryEndpointAddress": "cache.mock"},
+    "aws:sqs/queue:Queue": {"url": "https://sqs.mock"},
+}
+# Rules each scenario must trip.
+SCENARIOS = {
+    "dev": (BENCHMARK_CONFIG, {rule.name for rule in RULES}),
+    "production": ({**BENCHMARK_CONFIG, **PRODUCTION_OVERRIDES}, set()),
+}
+
+
+@dataclass
+class MockedResource:
+    resource_type: str
+    name: str
+    urn: str
+    props: dict
+    parent: Optional["MockedResource"]
+
+
+@dataclass
+class MockedStack:
+    resources: list
+
+
+class PolicyMocks(BenchmarkMocks):
+    def __init__(self):
+        super().__init__(ComponentProfiler())
+        self.resources = {}
+
+    def new_resource(self, args):
+        self.resources[args.name] = (args.typ, plain_properties(args.inputs))
+        resource_id, outputs = super().new_resource(args)
+        return resource_id, {**outputs, **ENDPOINT_OUTPUTS.get(args.typ, {})}
+
+
+class PolicyMonitor(BenchmarkMonitor):
+    def __init__(self, mocks):
+        super().__init__(mocks)
+        self.resources = {}
+
+    def RegisterResource(self, request):
+        response = super().RegisterResource(request)
+        _, props = self.mocks.resources.get(request.name, (request.type, {}))
+        self.resources[response.urn] = MockedResource(
+            request.type, request.name, response.urn, props, self.resources.get(request.parent)
+        )
+        return response
+
+
+# plain_properties unwraps secrets like the policy engine does and drops values unknown in a preview.
+def plain_properties(value):
+    if isinstance(value, dict):
+        if value.get(rpc._special_sig_key) == rpc._special_secret_sig:
+            return plain_properties(value["value"])
+        return {key: plain_properties(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [plain_properties(item) for item in value]
+    if isinstance(value, pulumi.output.Unknown):
+        return None
+    return value
+
+
+def record_resources(config):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    pulumi.runtime.set_all_config(config)
+    mocks = PolicyMocks()
+    monitor = PolicyMonitor(mocks)
+    pulumi.runtime.set_mocks(mocks, preview=True, monitor=monitor)
+    # The stack config is cached per process, and every scenario runs the program with its own config
+    if "stack_config" in sys.modules:
+        sys.modules["stack_config"].load_stack_config.cache_clear()
+    runpy.run_path(os.path.join(SRC_DIR, "__main__.py"), run_name="__main__")
+    loop.run_until_complete(pulumi.runtime.stack.wait_for_rpcs())
+    loop.close()
+    return list(monitor.resources.values())
+
+
+# run_rules returns the violations of every rule, as (rule name, resource name, message).
+def run_rules(resources):
+    violations = []
+    for rule in RULES:
+        targets = [MockedStack(resources)] if rule.stack else resources
+        for target in targets:
+            name = getattr(target, "name", "stack")
+
+            def report_violation(message, urn=None, rule=rule, name=name):
+                violations.append((rule.name, urn.split("::")[-1] if urn else name, message))
+
+            rule.validate(target, report_violation)
+    return violations
+
+
+def main():
+    failures = []
+    for scenario, (config, expected_rules) in SCENARIOS.items():
+        violations = run_rules(record_resources(config))
+        print(f"{scenario}: {len(violations)} violations")
+        for rule_name, resource_name, message in violations:
+            print(f"  {rule_name:<26} {resource_name}: {message}")
+        reported_rules = {rule_name for rule_name, _, _ in violations}
+        failures += [f"{scenario} does not trip {name}" for name in sorted(expected_rules - reported_rules)]
+        failures += [f"{scenario} trips {name}" for name in sorted(reported_rules - expected_rules)]
+    for failure in failures:
+        print(f"Policy check failed: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""Benchmark of building the whole stack's resource graph under Pulumi mocks.
+
+Runs src/__main__.py offline against mocked AWS, with no network access or credentials. It records wall time,
+resource count, invoke count and peak traced memory for each component, and time spent in the autotag
+transformation. Results are written as JSON and the run fails when a budget in stack_budgets.json is exceeded.
+Memory is traced with tracemalloc, which also slows the run, so wall times are only comparable between runs
+of this harness.
+
+Usage:
+    python benchmarks/stack_benchmark.py [--output results.json] [--budgets benchmarks/stack_budgets.json]
+        [--config alerts:enabled=true ...]
+"""
+
+import argparse
+import asyncio
+import functools
+import importlib
+import inspect
+import json
+import os
+import runpy
+import sys
+import time
+import tracemalloc
+
+import pulumi
+from pulumi.runtime.mocks import MockMonitor
+from pulumi.runtime.proto import resource_pb2
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+DEFAULT_BUDGETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stack_budgets.json")
+sys.path.insert(0, SRC_DIR)
+
+# Component classes profiled, by the name they are reported under.
+COMPONENTS = {
+    "networking": ("networking", "Networking"),
+    "database": ("database", "Database"),
+    "cache": ("cache", "Cache"),
+    "alerts": ("alerts", "AlertEvaluation"),
+    "email": ("email_delivery", "EmailDelivery"),
+    "backend": ("backend", "Backend"),
+    "multi_region": ("multi_region", "MultiRegion"),
+    "api_edge": ("api_edge", "ApiEdge"),
+    "warm_capacity": ("warm_capacity", "WarmCapacity"),
+    "frontend": ("frontend_s3", "Frontend"),
+    "monitoring": ("monitoring", "Monitoring"),
+}
+# Resources and invokes made outside every component, e.g. directly in __main__.py.
+PROGRAM = "program"
+
+# Stack configuration of the benchmark, shaped like Pulumi.WeatherAlerting.dev.yaml without encrypted values.
+# aws:defaultTags is left out so the autotag transformation runs.
+BENCHMARK_CONFIG = {
+    "WeatherAlerting:account_id": "163636840347",
+    "aws:region": "eu-central-1",
+    "backend:app_runner_auto_deployment": "true",
+    "backend:app_runner_cpu": "1024",
+    "backend:app_runner_memory": "2048",
+    "backend:auto_scaling_max_instances": "1",
+    "backend:cron_config": "* * * * *",
+    "backend:ecr_uri": "163636840347.dkr.ecr.eu-central-1.amazonaws.com/backend",
+    "backend:hash_salt": "benchmark",
+    "backend:jwt_secret": "benchmark",
+    "backend:log_level": "debug",
+    "backend:port": "3000",
+    "backend:repository": "WeatherAlertingSystem/WeatherAlerting-Backend",
+    "backend:send_emails": "true",
+    "backend:smtp_host": "smtp.example.com",
+    "backend:smtp_password": "benchmark",
+    "backend:smtp_port": "587",
+    "backend:smtp_require_tls": "true",
+    "backend:smtp_secure": "false",
+    "backend:smtp_user": "benchmark",
+    "backend:weatherapi_apikey": "benchmark",
+    "database:instance_class": "db.t3.medium",
+    "database:instances_number": "1",
+    "database:mongodb_version": "3.6.0",
+    "database:password": "benchmark",
+    "database:username": "benchmark",
+    "frontend:bucket_name": "163636840347-weather-alerting-frontend",
+    "frontend:repository": "WeatherAlertingSystem/WeatherAlerting-Frontend",
+    "frontend:s3_force_destroy": "true",
+}
+
+
+class ComponentProfiler:
+    def __init__(self):
+        self.stats = {}
+        self.active = []
+
+    def component_stats(self, name):
+        return self.stats.setdefault(name, {"wall_seconds": 0.0, "resources": 0, "invokes": 0, "peak_memory_mb": 0.0})
+
+    @property
+    def current(self):
+        return self.active[-1] if self.active else PROGRAM
+
+    # wrap times every call of function under the given component; calls nested in the same component
+    # are part of the outer call and are not counted twice.
+    def wrap(self, name, function, track_memory=True):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if name in self.active:
+                return function(*args, **kwargs)
+            stats = self.component_stats(name)
+            self.active.append(name)
+            if track_memory:
+                tracemalloc.reset_peak()
+                start_memory = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stats["wall_seconds"] += time.perf_counter() - start
+                if track_memory:
+                    peak_memory_mb = (tracemalloc.get_traced_memory()[1] - start_memory) / 2**20
+                    stats["peak_memory_mb"] = max(stats["peak_memory_mb"], peak_memory_mb)
+                self.active.pop()
+
+        return wrapper
+
+    def count_resource(self, args):
+        self.component_stats(self.current)["resources"] += 1
+
+    def count_invoke(self):
+        self.component_stats(self.current)["invokes"] += 1
+
+
+class BenchmarkMocks(pulumi.runtime.Mocks):
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def new_resource(self, args):
+        outputs = {key: value for key, value in args.inputs.items() if not isinstance(value, pulumi.Resource)}
+        if args.typ == "awsx:ec2:Vpc":
+            outputs = {
+                "vpcId": "vpc-benchmark",
+                "privateSubnetIds": ["subnet-private-a", "subnet-private-b", "subnet-private-c"],
+                "publicSubnetIds": ["subnet-public-a", "subnet-public-b", "subnet-public-c"],
+                "isolatedSubnetIds": [],
+            }
+        outputs.setdefault("arn", f"arn:aws:mock:eu-central-1:163636840347:{args.name}")
+        return f"{args.name}_id", outputs
+
+    def call(self, args):
+        self.profiler.count_invoke()
+        if args.token == "aws:index/getAvailabilityZones:getAvailabilityZones":
+            return {"names": ["eu-central-1a", "eu-central-1b", "eu-central-1c"], "zoneIds": ["a", "b", "c"]}
+        return {}
+
+
+# Resource references make the mock monitor resolve outputs on another event loop, so they are turned off.
+class BenchmarkMonitor(MockMonitor):
+    def SupportsFeature(self, request):
+        if request.id == "resourceReferences":
+            return type("SupportsFeatureResponse", (), {"hasSupport": False})
+        return super().SupportsFeature(request)
+
+    def GetDeploymentInfo(self, request):
+        features = [
+            feature
+            for feature in super().GetDeploymentInfo(request).supportedFeatures
+            if feature != resource_pb2.RESOURCE_MONITOR_FEATURE_RESOURCE_REFERENCES
+        ]
+        return resource_pb2.DeploymentInfo(supportedFeatures=features)
+
+
+def instrument(profiler):
+    for name, (module_name, class_name) in COMPONENTS.items():
+        component_class = getattr(importlib.import_module(module_name), class_name)
+        for attribute, value in list(vars(component_class).items()):
+            if inspect.isfunction(value):
+                setattr(component_class, attribute, profiler.wrap(name, value))
+    autotag = importlib.import_module("autotag")
+    # Transformations run inside component calls, so autotag time is also part of the component times.
+    autotag.auto_tag = profiler.wrap("autotag", autotag.auto_tag, track_memory=False)
+
+
+def run_program(config):
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    profiler = ComponentProfiler()
+    pulumi.runtime.set_all_config(config)
+    mocks = BenchmarkMocks(profiler)
+    pulumi.runtime.set_mocks(mocks, preview=True, monitor=BenchmarkMonitor(mocks))
+    instrument(profiler)
+    pulumi.runtime.register_stack_transformation(lambda args: profiler.count_resource(args))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    runpy.run_path(os.path.join(SRC_DIR, "__main__.py"), run_name="__main__")
+    asyncio.get_event_loop().run_until_complete(pulumi.runtime.stack.wait_for_rpcs())
+    wall_seconds = time.perf_counter() - start
+    peak_memory_mb = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+
+    components = {name: profiler.stats[name] for name in sorted(profiler.stats)}
+    total = {
+        "wall_seconds": wall_seconds,
+        "resources": sum(stats["resources"] for stats in components.values()),
+        "invokes": sum(stats["invokes"] for stats in components.values()),
+        "peak_memory_mb": peak_memory_mb,
+    }
+    return {"components": components, "total": total}
+
+
+# check_budgets returns a message for every measured value above its budget.
+def check_budgets(results, budgets):
+    violations = []
+    measured = {**results["components"], "total": results["total"]}
+    for name, limits in budgets.items():
+        for metric, limit in limits.items():
+            value = measured.get(name, {}).get(metric, 0)
+            if value > limit:
+                violations.append(f"{name}.{metric} = {round(value, 3)}, budget {limit}")
+    return violations
+
+
+def parse_config_overrides(pairs):
+    overrides = {}
+    for pair in pairs:
+        key, separator, value = pair.partition("=")
+        if not separator:
+            raise SystemExit(f"--config expects KEY=VALUE, got {pair}")
+        overrides[key] = value
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="stack_benchmark.json", help="where to write the JSON results")
+    parser.add_argument("--budgets", default=DEFAULT_BUDGETS, help="JSON budgets file, empty to skip the check")
+    parser.add_argument("--config", action="append", default=[], metavar="KEY=VALUE", help="stack config override")
+    args = parser.parse_args()
+
+    overrides = parse_config_overrides(args.config)
+    results = run_program({**BENCHMARK_CONFIG, **overrides})
+    results["config_overrides"] = overrides
+    violations = []
+    if args.budgets:
+        with open(args.budgets) as budgets_file:
+            violations = check_budgets(results, json.load(budgets_file))
+    results["budget_violations"] = violations
+    with open(args.output, "w") as output_file:
+        json.dump(results, output_file, indent=2, sort_keys=True)
+
+    print(f"{'component':<12} {'wall (s)':>9} {'resources':>10} {'invokes':>8} {'peak (MB)':>10}")
+    for name, stats in [*results["components"].items(), ("total", results["total"])]:
+        print(
+            f"{name:<12} {stats['wall_seconds']:>9.3f} {stats['resources']:>10} "
+            f"{stats['invokes']:>8} {stats['peak_memory_mb']:>10.2f}"
+        )
+    for violation in violations:
+        print(f"Budget exceeded: {violation}", file=sys.stderr)
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
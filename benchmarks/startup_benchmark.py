@@ -0,0 +1,94 @@
+"""Benchmark of program startup: provider SDK imports and resource graph construction under Pulumi mocks.
+
+Every scenario runs src/__main__.py in a fresh interpreter with `-X importtime`. The benchmark reports the median time
+spent importing pulumi_aws, pulumi_awsx and boto3, and the median time until every resource is registered.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import runpy
+import statistics
+import subprocess
+import sys
+import time
+
+# Stack config overrides of each scenario.
+SCENARIOS = {
+    "all components": {},
+    "frontend only": {"WeatherAlerting:components": '["frontend"]'},
+}
+PROVIDER_MODULE = re.compile(r"^(pulumi_aws|pulumi_awsx|boto3|botocore)(\.[\w.]+)?$")
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)$")
+
+
+# provider_import_seconds sums the cumulative import time of provider modules, without counting
+# a module again when it was imported by another provider module.
+def provider_import_seconds(importtime_output):
+    total_microseconds, ancestors = 0, []
+    # -X importtime prints a module after its imports, so reading backwards visits parents first
+    for line in reversed(importtime_output.splitlines()):
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, level, name = int(match.group(1)), len(match.group(2)), match.group(3)
+        while ancestors and ancestors[-1][0] >= level:
+            ancestors.pop()
+        counted = PROVIDER_MODULE.match(name) is not None and not any(counted for _, counted in ancestors)
+        if counted:
+            total_microseconds += cumulative
+        ancestors.append((level, counted or any(counted for _, counted in ancestors)))
+    return total_microseconds / 1e6
+
+
+def run_child(overrides):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import pulumi
+    from stack_benchmark import BENCHMARK_CONFIG, SRC_DIR, BenchmarkMocks, BenchmarkMonitor, ComponentProfiler
+
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    pulumi.runtime.set_all_config({**BENCHMARK_CONFIG, **overrides})
+    mocks = BenchmarkMocks(ComponentProfiler())
+    pulumi.runtime.set_mocks(mocks, preview=True, monitor=BenchmarkMonitor(mocks))
+    start = time.perf_counter()
+    runpy.run_path(os.path.join(SRC_DIR, "__main__.py"), run_name="__main__")
+    asyncio.get_event_loop().run_until_complete(pulumi.runtime.stack.wait_for_rpcs())
+    print(json.dumps({"program_seconds": time.perf_counter() - start}))
+
+
+def run_scenario(overrides, repeat):
+    program_seconds, import_seconds = [], []
+    for _ in range(repeat):
+        child = subprocess.run(
+            [sys.executable, "-X", "importtime", __file__, "--child", json.dumps(overrides)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        program_seconds.append(json.loads(child.stdout.splitlines()[-1])["program_seconds"])
+        import_seconds.append(provider_import_seconds(child.stderr))
+    return statistics.median(import_seconds), statistics.median(program_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        run_child(json.loads(args.child))
+        return
+
+    print(f"{'scenario':<16} {'provider imports (s)':>21} {'program (s)':>12}")
+    for name, overrides in SCENARIOS.items():
+        import_seconds, program_seconds = run_scenario(overrides, args.repeat)
+        print(f"{name:<16} {import_seconds:>21.3f} {program_seconds:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
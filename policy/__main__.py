@@ -0,0 +1,26 @@
+"""Pulumi CrossGuard policy pack - Performance guardrails for the WeatherAlerting stack
+
+Enforcement levels are set per stack with a policy config file, e.g.
+    pulumi preview --policy-pack policy --policy-pack-config policy/config/prod.json
+"""
+
+from pulumi_policy import EnforcementLevel, PolicyPack, ResourceValidationPolicy, StackValidationPolicy
+
+from performance_rules import RULES
+
+
+def policy(rule):
+    policy_class = StackValidationPolicy if rule.stack else ResourceValidationPolicy
+    return policy_class(
+        name=rule.name,
+        description=rule.description,
+        enforcement_level=EnforcementLevel(rule.enforcement_level),
+        validate=rule.validate,
+    )
+
+
+PolicyPack(
+    name="weather-alerting-performance",
+    enforcement_level=EnforcementLevel.ADVISORY,
+    policies=[policy(rule) for rule in RULES],
+)
@@ -0,0 +1,166 @@
+"""Performance guardrails of the WeatherAlerting policy pack, checked on the resource properties the components produce
+
+The rules only need resource_type, props, urn and parent from the validation arguments, so they also run outside
+the policy engine, e.g. in benchmarks/policy_check.py.
+"""
+
+from dataclasses import dataclass
+from typing import Callable
+
+APP_RUNNER_SERVICE = "aws:apprunner/service:Service"
+APP_RUNNER_AUTO_SCALING = "aws:apprunner/autoScalingConfigurationVersion:AutoScalingConfigurationVersion"
+DOCUMENTDB_INSTANCE = "aws:docdb/clusterInstance:ClusterInstance"
+AWSX_VPC = "awsx:ec2:Vpc"
+
+VERBOSE_LOG_LEVELS = {"debug", "trace", "silly"}
+MIN_AUTO_SCALING_MAX_INSTANCES = 2
+MIN_DATABASE_INSTANCES = 2
+MOVING_IMAGE_TAG = ":latest"
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    description: str
+    enforcement_level: str
+    validate: Callable
+    stack: bool = False
+
+
+# get_property follows keys through nested props, and returns None when a level is missing or unknown in a preview.
+def get_property(props, *keys):
+    for key in keys:
+        if not isinstance(props, dict):
+            return None
+        props = props.get(key)
+    return props
+
+
+def runtime_environment(props):
+    environment = get_property(
+        props, "sourceConfiguration", "imageRepository", "imageConfiguration", "runtimeEnvironmentVariables"
+    )
+    return environment if isinstance(environment, dict) else {}
+
+
+# runs_every_minute accepts the node-cron expressions of backend:cron_config, with an optional seconds field.
+def runs_every_minute(expression):
+    fields = expression.split()
+    if len(fields) == 6 and not fields[0].isdigit():
+        return True
+    return len(fields) in (5, 6) and fields[-5] in ("*", "*/1")
+
+
+def validate_log_level(args, report_violation):
+    if args.resource_type != APP_RUNNER_SERVICE:
+        return
+    log_level = runtime_environment(args.props).get("LOG_LEVEL")
+    if isinstance(log_level, str) and log_level.lower() in VERBOSE_LOG_LEVELS:
+        report_violation(f"LOG_LEVEL is {log_level}: every request writes debug logs, set backend:log_level to info.")
+
+
+def validate_cron_frequency(args, report_violation):
+    if args.resource_type != APP_RUNNER_SERVICE:
+        return
+    environment = runtime_environment(args.props)
+    cron_config = environment.get("CRON_CONFIG")
+    # With the alert pipeline the backend skips its in-process cron
+    if environment.get("ALERTS_PIPELINE_ENABLED") == "true" or not isinstance(cron_config, str):
+        return
+    if runs_every_minute(cron_config):
+        report_violation(
+            f"CRON_CONFIG '{cron_config}' sweeps every subscription at least once a minute on the instances serving "
+            "requests: schedule it less often or set alerts:enabled."
+        )
+
+
+def validate_auto_scaling(args, report_violation):
+    if args.resource_type != APP_RUNNER_AUTO_SCALING:
+        return
+    max_size = args.props.get("maxSize")
+    if isinstance(max_size, (int, float)) and max_size < MIN_AUTO_SCALING_MAX_INSTANCES:
+        report_violation(
+            f"maxSize is {max_size:.0f}: App Runner can not scale out under load, raise "
+            f"backend:auto_scaling_max_instances to at least {MIN_AUTO_SCALING_MAX_INSTANCES}."
+        )
+
+
+def validate_image_deployment(args, report_violation):
+    if args.resource_type != APP_RUNNER_SERVICE:
+        return
+    if get_property(args.props, "sourceConfiguration", "autoDeploymentsEnabled") is not True:
+        return
+    image_identifier = get_property(args.props, "sourceConfiguration", "imageRepository", "imageIdentifier")
+    if isinstance(image_identifier, str) and image_identifier.endswith(MOVING_IMAGE_TAG):
+        report_violation(
+            f"Auto deployments of {image_identifier} roll out every push, at any time of day: set "
+            "backend:app_runner_auto_deployment to false and deploy with the stack."
+        )
+
+
+def validate_nat_gateways(args, report_violation):
+    if args.resource_type != AWSX_VPC:
+        return
+    if get_property(args.props, "natGateways", "strategy") == "Single":
+        report_violation(
+            "A single NAT gateway carries the egress of every AZ, through cross-AZ hops and one connection limit: "
+            "set networking:nat_strategy to one_per_az."
+        )
+
+
+# validate_database_instances counts the instances of each Database component, so every region is checked.
+def validate_database_instances(args, report_violation):
+    instances = {}
+    for resource in args.resources:
+        if resource.resource_type == DOCUMENTDB_INSTANCE:
+            parent = resource.parent.urn if resource.parent else None
+            instances.setdefault(parent, []).append(resource)
+    for cluster_instances in instances.values():
+        if len(cluster_instances) < MIN_DATABASE_INSTANCES:
+            report_violation(
+                f"{len(cluster_instances)} DocumentDB instance: reads compete with writes on the primary and a "
+                f"failover has no replica to promote, set database:instances_number to at least "
+                f"{MIN_DATABASE_INSTANCES}.",
+                cluster_instances[0].urn,
+            )
+
+
+RULES = [
+    Rule(
+        "backend-log-level",
+        "The backend does not log at debug level.",
+        "advisory",
+        validate_log_level,
+    ),
+    Rule(
+        "backend-cron-frequency",
+        "The backend's in-process alert cron does not run every minute.",
+        "advisory",
+        validate_cron_frequency,
+    ),
+    Rule(
+        "backend-auto-scaling",
+        f"App Runner can scale out to at least {MIN_AUTO_SCALING_MAX_INSTANCES} instances.",
+        "mandatory",
+        validate_auto_scaling,
+    ),
+    Rule(
+        "backend-image-deployment",
+        "App Runner does not auto deploy a moving :latest image tag.",
+        "advisory",
+        validate_image_deployment,
+    ),
+    Rule(
+        "networking-nat-gateways",
+        "Each AZ has its own NAT gateway.",
+        "advisory",
+        validate_nat_gateways,
+    ),
+    Rule(
+        "database-instances",
+        f"Each DocumentDB cluster has at least {MIN_DATABASE_INSTANCES} instances.",
+        "mandatory",
+        validate_database_instances,
+        stack=True,
+    ),
+]
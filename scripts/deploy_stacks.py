@@ -0,0 +1,148 @@
+"""Preview or update several WeatherAlerting stacks in parallel with the Pulumi Automation API.
+
+Stacks run concurrently in a bounded pool of workers, each with its own `pulumi` process, and their engine
+events are printed as they arrive, prefixed with the stack name. After the first failure no other stack is
+started; stacks already running finish, as stopping an update midway leaves pending operations in its state.
+Timings and resource change counts of every stack are written to a JSON report.
+
+With --layers each name is a stack split into layers (see src/layers.py) and its <stack>-<layer> stacks run
+layer by layer, lowest first, so every layer reads the outputs the layers below it just published.
+
+The stacks use the backend of `pulumi login`, or --backend-url, e.g. file:///tmp/pulumi-state, and the program
+in --work-dir, by default this repository.
+
+Usage:
+    python scripts/deploy_stacks.py WeatherAlerting.dev WeatherAlerting.prod [--up] [--workers 4]
+        [--layers] [--backend-url URL] [--work-dir DIR] [--report deploy_report.json]
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+from pulumi import automation as auto
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "src"))
+
+from stack_config import LAYERS  # noqa: E402
+
+REPORTED_SEVERITIES = {"warning", "error"}
+
+
+@dataclass
+class StackResult:
+    stack: str
+    status: str = "skipped"
+    duration_seconds: float = 0.0
+    resource_changes: dict = field(default_factory=dict)
+    error: str = None
+
+
+# waves are the groups of stacks run one after the other, the stacks of a group in parallel.
+def waves(stacks, layers=False):
+    if not layers:
+        return [list(stacks)]
+    return [[f"{stack}-{layer}" for stack in stacks] for layer in LAYERS]
+
+
+class Deployment:
+    def __init__(self, operation, work_dir, backend_url=None, workers=4):
+        self.operation = operation
+        self.work_dir = work_dir
+        self.env_vars = {"PULUMI_BACKEND_URL": backend_url} if backend_url else None
+        self.workers = workers
+        self.failed = threading.Event()
+        self.print_lock = threading.Lock()
+
+    def log(self, stack_name, message):
+        with self.print_lock:
+            print(f"[{stack_name}] {message}", flush=True)
+
+    # on_event prints the steps that change a resource, failed operations, warnings and errors.
+    def on_event(self, stack_name, event):
+        if event.resource_pre_event and event.resource_pre_event.metadata.op != auto.OpType.SAME:
+            metadata = event.resource_pre_event.metadata
+            self.log(stack_name, f"{metadata.op.value} {metadata.urn.split('::')[-1]} ({metadata.type})")
+        elif event.res_op_failed_event:
+            metadata = event.res_op_failed_event.metadata
+            self.log(stack_name, f"failed {metadata.urn.split('::')[-1]} ({metadata.type})")
+        elif event.diagnostic_event and event.diagnostic_event.severity in REPORTED_SEVERITIES:
+            self.log(stack_name, f"{event.diagnostic_event.severity}: {event.diagnostic_event.message.strip()}")
+
+    def run_stack(self, stack_name):
+        result = StackResult(stack_name)
+        if self.failed.is_set():
+            return result
+        started_at = time.monotonic()
+        self.log(stack_name, f"{self.operation} started")
+        try:
+            stack = auto.select_stack(
+                stack_name, work_dir=self.work_dir, opts=auto.LocalWorkspaceOptions(env_vars=self.env_vars)
+            )
+            on_event = functools.partial(self.on_event, stack_name)
+            if self.operation == "up":
+                resource_changes = stack.up(on_event=on_event, color="never").summary.resource_changes
+            else:
+                resource_changes = stack.preview(on_event=on_event, color="never").change_summary
+            # Previews count by OpType and updates by its value
+            result.resource_changes = {
+                getattr(op, "value", op): count for op, count in (resource_changes or {}).items()
+            }
+            result.status = "succeeded"
+        except Exception as error:
+            self.failed.set()
+            result.status = "failed"
+            # The last line of a failed command is the engine's error
+            result.error = str(error).strip().splitlines()[-1] if str(error).strip() else repr(error)
+        result.duration_seconds = round(time.monotonic() - started_at, 1)
+        self.log(
+            stack_name, f"{self.operation} {result.status} in {result.duration_seconds}s {result.resource_changes}"
+        )
+        return result
+
+    def run(self, stack_waves):
+        results = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for wave in stack_waves:
+                results.extend(executor.map(self.run_stack, wave))
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("stacks", nargs="+")
+    parser.add_argument("--up", action="store_true", help="update the stacks instead of previewing them")
+    parser.add_argument("--workers", type=int, default=4, help="stacks run at the same time")
+    parser.add_argument("--layers", action="store_true", help="run the layer stacks of each stack, layer by layer")
+    parser.add_argument("--backend-url", help="state backend, by default the one of pulumi login")
+    parser.add_argument("--work-dir", default=REPO_DIR, help="directory of the Pulumi project to run")
+    parser.add_argument("--report", default="deploy_report.json")
+    args = parser.parse_args()
+
+    deployment = Deployment("up" if args.up else "preview", args.work_dir, args.backend_url, args.workers)
+    started_at = time.monotonic()
+    results = deployment.run(waves(args.stacks, args.layers))
+    report = {
+        "operation": deployment.operation,
+        "duration_seconds": round(time.monotonic() - started_at, 1),
+        "stacks": [asdict(result) for result in results],
+    }
+    with open(args.report, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+    for result in results:
+        print(f"{result.stack:<40} {result.status:<10} {result.duration_seconds:>8}s  {result.error or ''}")
+    print(
+        f"{deployment.operation} of {len(results)} stack(s) took {report['duration_seconds']}s, report in {args.report}"
+    )
+    sys.exit(1 if deployment.failed.is_set() else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Publish a frontend build directory to the frontend S3 bucket.
+
+Only files whose content changed since the last publish are uploaded. The bucket keeps a
+manifest of published file hashes under a prefix its bucket policy keeps from CloudFront and
+anonymous readers. Files are uploaded uncompressed: CloudFront compresses them with Brotli or
+gzip for the clients that accept it. Content-hashed bundles are marked immutable so CloudFront
+and browsers cache them for a year. `assets/config.json` is owned by the Pulumi stack and is
+never uploaded.
+
+Usage:
+    python scripts/publish_frontend_assets.py dist/weather-alerting --bucket BUCKET [--workers 16] [--dry-run]
+"""
+
+import argparse
+import hashlib
+import json
+import mimetypes
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import boto3
+
+# The bucket policy denies the prefix to everyone but the account, see PUBLISH_KEYS in src/frontend_s3.py
+MANIFEST_KEY = "_publish/manifest.json"
+STACK_MANAGED_KEYS = {"assets/config.json"}
+# Angular output hashing appends at least 16 hex characters, e.g. main.3f2a1b4c5d6e7f80.js
+HASHED_NAME = re.compile(r"\.[0-9a-f]{16,}\.[a-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+@dataclass(frozen=True)
+class Asset:
+    key: str
+    path: Path
+    sha256: str
+    content_type: str
+    cache_control: str
+
+    def manifest_entry(self):
+        return {"sha256": self.sha256, "cache_control": self.cache_control}
+
+
+def scan_build_directory(build_dir):
+    assets = []
+    for path in sorted(Path(build_dir).rglob("*")):
+        key = path.relative_to(build_dir).as_posix()
+        if not path.is_file() or key in STACK_MANAGED_KEYS:
+            continue
+        assets.append(
+            Asset(
+                key=key,
+                path=path,
+                sha256=hashlib.sha256(path.read_bytes()).hexdigest(),
+                content_type=mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+                cache_control=IMMUTABLE_CACHE_CONTROL if HASHED_NAME.search(path.name) else REVALIDATE_CACHE_CONTROL,
+            )
+        )
+    return assets
+
+
+def load_manifest(s3_client, bucket):
+    try:
+        return json.loads(s3_client.get_object(Bucket=bucket, Key=MANIFEST_KEY)["Body"].read())
+    except s3_client.exceptions.NoSuchKey:
+        return {}
+
+
+def changed_assets(assets, manifest):
+    return [asset for asset in assets if manifest.get(asset.key) != asset.manifest_entry()]
+
+
+def upload_asset(s3_client, bucket, asset):
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=asset.key,
+        Body=asset.path.read_bytes(),
+        ContentType=asset.content_type,
+        CacheControl=asset.cache_control,
+    )
+    return asset.key
+
+
+# publish uploads changed assets in a bounded thread pool. Entry points such as index.html go last,
+# so they never reference bundles that are not uploaded yet, and the manifest is written only on success.
+def publish(build_dir, bucket, s3_client=None, workers=16, dry_run=False):
+    s3_client = s3_client or boto3.client("s3")
+    assets = scan_build_directory(build_dir)
+    manifest = load_manifest(s3_client, bucket)
+    to_upload = changed_assets(assets, manifest)
+    if dry_run or not to_upload:
+        return [asset.key for asset in to_upload]
+
+    bundles = [asset for asset in to_upload if asset.cache_control == IMMUTABLE_CACHE_CONTROL]
+    entry_points = [asset for asset in to_upload if asset.cache_control != IMMUTABLE_CACHE_CONTROL]
+    uploaded = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for batch in (bundles, entry_points):
+            uploaded.extend(executor.map(lambda asset: upload_asset(s3_client, bucket, asset), batch))
+
+    new_manifest = {asset.key: asset.manifest_entry() for asset in assets}
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=MANIFEST_KEY,
+        Body=json.dumps(new_manifest, indent=2, sort_keys=True).encode(),
+        ContentType="application/json",
+        CacheControl=REVALIDATE_CACHE_CONTROL,
+    )
+    return uploaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("build_dir", type=Path)
+    parser.add_argument("--bucket", required=True)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--endpoint-url", help="S3 endpoint, e.g. a local moto server")
+    parser.add_argument("--dry-run", action="store_true", help="only list the files that would be uploaded")
+    args = parser.parse_args()
+
+    if not args.build_dir.is_dir():
+        sys.exit(f"{args.build_dir} is not a directory")
+    s3_client = boto3.client("s3", endpoint_url=args.endpoint_url)
+    keys = publish(args.build_dir, args.bucket, s3_client=s3_client, workers=args.workers, dry_run=args.dry_run)
+    action = "Would upload" if args.dry_run else "Uploaded"
+    print(f"{action} {len(keys)} file(s)")
+    for key in keys:
+        print(f"  {key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Move the resources of a WeatherAlerting stack into one stack per layer, without replacing any of them.
+
+For each layer of stack_config.LAYERS the stack <stack>-<layer> is created with a copy of the stack's config and
+WeatherAlerting:layer set, and `pulumi state move` moves the layer's components, with all their children, out of
+the stack. The GitHub OIDC provider goes to the network layer. The layers are then updated lowest first, so each
+one publishes the outputs the next reads; their previews must only show output changes.
+
+Without --execute the commands are only printed. `pulumi state move` needs the Pulumi CLI 3.117 or later.
+
+Usage:
+    python scripts/split_stack.py --stack dev [--execute]
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from stack_config import LAYERS  # noqa: E402
+
+COMPONENT_TYPE_PREFIX = "weather-alerting:components:"
+STACK_TYPE = "pulumi:pulumi:Stack"
+GITHUB_PROVIDER_TYPE = "aws:iam/openIdConnectProvider:OpenIdConnectProvider"
+# Components a stack split into layers can not hold, as they span regions.
+UNSUPPORTED_COMPONENT_TYPES = {f"{COMPONENT_TYPE_PREFIX}MultiRegion"}
+
+
+def export_resources(stack):
+    deployment = json.loads(subprocess.check_output(["pulumi", "stack", "export", "--stack", stack]))
+    return deployment["deployment"].get("resources") or []
+
+
+def resource_name(urn):
+    return urn.split("::")[-1]
+
+
+# layer_urns assigns each top level resource of the stack to a layer, from the name its component is built with.
+def layer_urns(resources):
+    root_urns = {resource["urn"] for resource in resources if resource["type"] == STACK_TYPE}
+    component_layers = {component: layer for layer, components in LAYERS.items() for component in components}
+    urns = {layer: [] for layer in LAYERS}
+    unassigned = []
+    for resource in resources:
+        if resource.get("parent") not in root_urns or resource["type"].startswith("pulumi:providers:"):
+            continue
+        if resource["type"] in UNSUPPORTED_COMPONENT_TYPES:
+            sys.exit(f"{resource_name(resource['urn'])} spans regions, stacks with secondary regions can not be split")
+        component = resource_name(resource["urn"]).replace("-", "_")
+        if resource["type"].startswith(COMPONENT_TYPE_PREFIX) and component in component_layers:
+            urns[component_layers[component]].append(resource["urn"])
+        elif resource["type"] == GITHUB_PROVIDER_TYPE:
+            urns["network"].append(resource["urn"])
+        else:
+            unassigned.append(resource["urn"])
+    if unassigned:
+        sys.exit("Resources outside the layers' components:\n  " + "\n  ".join(unassigned))
+    return urns
+
+
+def split_commands(stack, urns):
+    commands = []
+    for layer in LAYERS:
+        layer_stack = f"{stack}-{layer}"
+        commands += [
+            ["pulumi", "stack", "init", layer_stack, "--copy-config-from", stack, "--no-select"],
+            ["pulumi", "config", "set", "WeatherAlerting:layer", layer, "--stack", layer_stack],
+        ]
+        if urns[layer]:
+            commands.append(
+                ["pulumi", "state", "move", "--source", stack, "--dest", layer_stack, "--yes", *urns[layer]]
+            )
+    # Every layer reads the outputs the layers below publish on their first update
+    commands += [["pulumi", "up", "--stack", f"{stack}-{layer}", "--diff"] for layer in LAYERS]
+    return commands
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stack", required=True, help="stack to split, e.g. dev or org/WeatherAlerting/dev")
+    parser.add_argument("--execute", action="store_true", help="run the commands instead of printing them")
+    args = parser.parse_args()
+
+    commands = split_commands(args.stack, layer_urns(export_resources(args.stack)))
+    for command in commands:
+        print(shlex.join(command))
+        if args.execute:
+            subprocess.run(command, check=True)
+    print(f"Once every layer is up to date, {args.stack} only holds its providers: pulumi stack rm {args.stack}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,235 @@
 """An AWS Python Pulumi program"""
 
+from types import SimpleNamespace
 
-import utils
+import pulumi
 
-# Import custom modules
+# Import custom modules. Component modules are imported where they are built, so the provider
+# SDK modules they use are only loaded for the components selected by WeatherAlerting:components.
 from autotag import register_auto_tags
-from backend import Backend
-from database import Database
-from frontend_s3 import Frontend
-from networking import Networking
+from stack_config import load_stack_config
+
+# Load and validate the whole stack configuration before registering any resource
+config = load_stack_config()
+components = config.common.components
+if config.common.unselected_components:
+    # The engine diffs against the whole stack, so it shows the resources of the other components as deletes
+    pulumi.log.warn(
+        f"Previewing only {', '.join(components)}: the deletes of the resources of "
+        f"{', '.join(config.common.unselected_components)} are not part of any update"
+    )
+
+# A stack split into layers reads the outputs of the components of lower layers from their stacks
+lower_components = config.common.lower_components
+if config.common.layer:
+    from layers import LayerStacks, publish
+
+    layer_stacks = LayerStacks(config.common)
 
 # Inject tags to all AWS resources
 register_auto_tags({"PROJECT": "WeatherAlertingSystem"})
 
-# Create VPC with NAT
-networking = Networking()
-vpc = networking.create_vpc()
-vpc_default_sg = networking.create_dafault_sg()
+# Components only take the outputs of the components they depend on, so the engine creates every
+# resource whose inputs are known in parallel, e.g. the frontend bucket next to the DocumentDB cluster.
+
+# Create VPC with NAT and VPC endpoints
+if "networking" in components:
+    from networking import Networking
+
+    networking = Networking("networking", config)
+    if config.networking.vpc_endpoints:
+        pulumi.export("vpc_endpoint_ids", networking.vpc_endpoint_ids)
+        pulumi.export("vpc_endpoint_route_table_ids", networking.route_table_ids)
+    if config.common.layer:
+        publish("networking", networking)
+elif "networking" in lower_components:
+    networking = layer_stacks.outputs("networking")
+    # Monitoring alarms on each NAT gateway, so the IDs are read as a list of the configured length
+    published_nat_gateway_ids = networking.nat_gateway_ids
+    networking.nat_gateway_ids = [
+        published_nat_gateway_ids.apply(lambda nat_gateway_ids, index=index: nat_gateway_ids[index])
+        for index in range(config.networking.nat_gateways_number)
+    ]
+
+# Common resources, created by the network layer of a stack split into layers
+if config.common.layer == "network" or (
+    not config.common.layer and ("backend" in components or "frontend" in components)
+):
+    import utils
 
-# Common resources
-open_id_provider = utils.create_gh_open_id_provider()
+    open_id_provider_arn = utils.create_gh_open_id_provider().arn
+    if config.common.layer:
+        publish("github", open_id_provider_arn=open_id_provider_arn)
+elif "backend" in components or "frontend" in components:
+    open_id_provider_arn = layer_stacks.outputs("github").open_id_provider_arn
 
 # Database resource
-database = Database()
-subnet_group = database.create_db_subnet_group(vpc.private_subnet_ids)
-database.create_documentDB(subnet_group)
+if "database" in components:
+    from database import Database
+
+    database = Database("database", config, networking.private_subnet_ids)
+    if config.common.layer:
+        publish("database", database)
+elif "database" in lower_components:
+    database = layer_stacks.outputs("database")
+
+# Cache for WeatherAPI responses
+backend_environment = {}
+if config.cache.enabled and "cache" in components:
+    from cache import Cache
+
+    cache = Cache(
+        "cache", config, networking.private_subnet_ids, networking.vpc_id, networking.default_security_group_id
+    )
+    backend_environment.update(cache.environment())
+    if config.common.layer:
+        publish("cache", cache)
+elif config.cache.enabled and "cache" in lower_components:
+    from cache import cache_environment
+
+    backend_environment.update(cache_environment(config.cache, layer_stacks.outputs("cache").cache_url))
+
+# Alert evaluation pipeline replacing the backend's in-process cron
+if config.alerts.enabled:
+    from alerts import AlertEvaluation
+
+    backend_environment.update(AlertEvaluation.environment())
+
+# Queued email delivery through SES
+if config.email.enabled and "email" in components:
+    from email_delivery import EmailDelivery
+
+    email_delivery = EmailDelivery("email", config)
+    backend_environment.update(email_delivery.environment())
+    pulumi.export("email_queue_url", email_delivery.email_queue.url)
+    pulumi.export("email_feedback_queue_url", email_delivery.feedback_queue.url)
+    pulumi.export("email_dkim_tokens", email_delivery.dkim_tokens)
 
 # Backend resources
-backend = Backend(vpc.private_subnet_ids, vpc_default_sg)
-backend.grant_access_rights_for_gh_actions(repo_name="Backend", github_open_id_provider=open_id_provider)
-backend.create_app_runner(
-    database_uri=database.database_uri,
-    database_username=database.database_username,
-    database_password=database.database_password,
-)
+if "backend" in components:
+    from backend import Backend
+
+    backend = Backend(
+        "backend",
+        config,
+        networking.private_subnet_ids,
+        networking.default_security_group_id,
+        github_open_id_provider_arn=open_id_provider_arn,
+        database_uri=database.database_uri,
+        database_username=database.database_username,
+        database_password=database.database_password,
+        database_reader_uri=database.database_reader_uri,
+        database_connection_string=database.database_connection_string,
+        extra_environment=backend_environment,
+        load_balancer_subnet_ids=networking.public_subnet_ids,
+        vpc_id=networking.vpc_id,
+    )
+    backend_uri = backend.app_runner_uri
+    pulumi.export("backend_service_url", backend_uri)
+    pulumi.export("app_runner_capacity_plan", backend.capacity_plan.as_output())
+    if config.common.layer:
+        publish("backend", service_dimensions=backend.service_metrics.dimensions())
+    if config.multi_region.enabled:
+        from multi_region import MultiRegion
+
+        # The response cache stays in the primary region; secondary backends call WeatherAPI directly
+        regional_environment = {
+            key: value for key, value in backend_environment.items() if not key.startswith("CACHE_")
+        }
+        multi_region = MultiRegion("multi-region", config, networking, database, backend, regional_environment)
+        pulumi.export("api_domain", multi_region.api_domain)
+        pulumi.export("regional_backend_service_urls", multi_region.service_urls)
+        pulumi.export("api_certificate_validation_records", multi_region.certificate_validation_records)
+    if config.alerts.enabled and "alerts" in components:
+        alert_evaluation = AlertEvaluation(
+            "alerts",
+            config,
+            networking.private_subnet_ids,
+            networking.default_security_group_id,
+            backend.runtime_environment,
+        )
+        pulumi.export("alerts_queue_url", alert_evaluation.queue.url)
+        pulumi.export("alerts_dead_letter_queue_url", alert_evaluation.dead_letter_queue.url)
+    if config.email.enabled:
+        backend_role_prefix = "Fargate" if config.backend.compute == "ecs_fargate" else "AppRunner"
+        email_delivery.grant_queue_access(backend_role_prefix, backend.instance_role_name)
+        if config.multi_region.enabled:
+            for region, instance_role_name in multi_region.instance_role_names.items():
+                email_delivery.grant_queue_access(f"AppRunner-{region}", instance_role_name)
+        if config.alerts.enabled and "alerts" in components:
+            email_delivery.grant_queue_access("AlertWorker", alert_evaluation.worker_role_name)
+    # Warm App Runner instances ahead of known peaks
+    if config.warm_capacity.enabled and "warm_capacity" in components:
+        from warm_capacity import WarmCapacity
 
+        warm_capacity = WarmCapacity(
+            "warm-capacity",
+            config,
+            backend.service_arn,
+            backend.auto_scaling_configuration_arn,
+            backend.capacity_plan,
+        )
+        pulumi.export("warm_capacity_scaler_name", warm_capacity.scaler.name)
+    # CloudFront caches read-only API responses at the edge, in front of whichever backend URL is served
+    if config.api_edge.enabled and "api_edge" in components:
+        from api_edge import ApiEdge
+
+        if config.multi_region.enabled:
+            backend_uri = pulumi.Output.from_input(config.multi_region.api_domain)
+        api_edge = ApiEdge("api-edge", config, backend_uri)
+        backend_uri = api_edge.domain_name
+        pulumi.export("api_edge_domain_name", api_edge.domain_name)
+elif "backend" in lower_components:
+    from backend import service_metrics
+    from sizing import backend_capacity_plan
+
+    service_dimensions = layer_stacks.outputs("backend").service_dimensions
+    backend = SimpleNamespace(
+        service_metrics=service_metrics(
+            config.backend.compute,
+            {
+                role: service_dimensions.apply(lambda dimensions, role=role: dimensions[role])
+                for role in ("latency", "errors", "requests", "instances")
+            },
+        ),
+        capacity_plan=backend_capacity_plan(config.backend),
+    )
 
 # Frontend resources
-frontend = Frontend()
-frontend.create_frontend_bucket()
-frontend.attach_policies()
-frontend.render_config_to_s3_bucket(backend_uri=backend.app_runner_uri)
-frontend.authorize_github_to_deploy(github_open_id_provider=open_id_provider)
+if "frontend" in components:
+    from frontend_s3 import Frontend
+
+    # Without the components serving it, previews read the backend URL from the last update of this stack
+    last_update = f"{pulumi.get_organization()}/{pulumi.get_project()}/{pulumi.get_stack()}"
+    if config.api_edge.enabled:
+        # Browsers call the API through its CloudFront distribution
+        if config.common.layer:
+            backend_uri = layer_stacks.output("app", "api_edge_domain_name")
+        elif "api_edge" not in components:
+            backend_uri = pulumi.StackReference(last_update).get_output("api_edge_domain_name")
+    elif config.multi_region.enabled:
+        # Browsers call the latency-routed domain, which answers from the closest region
+        backend_uri = pulumi.Output.from_input(config.multi_region.api_domain)
+    elif config.common.layer:
+        backend_uri = layer_stacks.output("app", "backend_service_url")
+    elif "backend" not in components:
+        backend_uri = pulumi.StackReference(last_update).get_output("backend_service_url")
+    frontend = Frontend("frontend", config, backend_uri, open_id_provider_arn)
+    if config.frontend.cdn_enabled:
+        pulumi.export("frontend_url", frontend.distribution_domain_name.apply(lambda domain: f"https://{domain}"))
+
+# Dashboard and alarms
+if config.monitoring.enabled and "monitoring" in components:
+    from monitoring import Monitoring
+
+    monitoring = Monitoring(
+        "monitoring",
+        config,
+        service_metrics=backend.service_metrics,
+        max_instances=backend.capacity_plan.max_instances,
+        cluster_identifier=database.cluster_identifier,
+        nat_gateway_ids=networking.nat_gateway_ids,
+        distribution_id=frontend.distribution_id,
+    )
+    pulumi.export("monitoring_dashboard_name", monitoring.dashboard.dashboard_name)
+    pulumi.export("monitoring_alarm_topic_arn", monitoring.alarm_topic.arn)
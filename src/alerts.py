@@ -0,0 +1,195 @@
+"""An AWS Python Pulumi program - Alert evaluation pipeline: EventBridge Scheduler, SQS and Lambda fan-out"""
+
+import json
+
+import pulumi
+import pulumi_aws as aws
+
+from component import Component
+from iam_policy import Principal, Statement, policy_document
+
+LAMBDA_VPC_ACCESS_POLICY_ARN = "arn:aws:iam::aws:policy/service-role/AWSLambdaVPCAccessExecutionRole"
+DISPATCHER_TIMEOUT_SECONDS = 60
+# AWS recommends a queue visibility timeout of at least six times the consumer's timeout.
+VISIBILITY_TIMEOUT_FACTOR = 6
+
+
+class AlertEvaluation(Component):
+    def __init__(self, name, config, subnet_ids, vpc_default_sg_id, backend_environment, opts=None):
+        super().__init__(name, opts)
+        self.alerts_config = config.alerts
+        self.ecr_uri = config.backend.ecr_uri
+        self.image_architecture = config.backend.image_architecture
+        self.queue = None
+        self.worker_role = None
+
+        self.create_pipeline(subnet_ids, vpc_default_sg_id, backend_environment)
+        self.worker_role_name = self.worker_role.name
+        self.register_outputs(
+            {
+                "queue_url": self.queue.url,
+                "dead_letter_queue_url": self.dead_letter_queue.url,
+                "worker_role_name": self.worker_role_name,
+            }
+        )
+
+    # environment tells the backend that alert sweeps run in the pipeline instead of its in-process cron
+    @staticmethod
+    def environment():
+        return {"ALERTS_PIPELINE_ENABLED": "true"}
+
+    def create_queues(self):
+        dead_letter_queue = aws.sqs.Queue(
+            "weather-alerting-alerts-dlq",
+            message_retention_seconds=14 * 24 * 3600,
+            opts=self.child_opts(),
+        )
+        self.queue = aws.sqs.Queue(
+            "weather-alerting-alerts",
+            visibility_timeout_seconds=self.alerts_config.worker_timeout_seconds * VISIBILITY_TIMEOUT_FACTOR,
+            redrive_policy=dead_letter_queue.arn.apply(
+                lambda arn: json.dumps(
+                    {"deadLetterTargetArn": arn, "maxReceiveCount": self.alerts_config.max_receive_count}
+                )
+            ),
+            opts=self.child_opts(),
+        )
+        return self.queue, dead_letter_queue
+
+    def create_lambda_role(self, name, queue_actions):
+        role = aws.iam.Role(
+            resource_name=name,
+            name=name,
+            assume_role_policy=policy_document(
+                statements=[
+                    Statement(
+                        actions=("sts:AssumeRole",),
+                        effect="Allow",
+                        principals=(Principal(type="Service", identifiers=("lambda.amazonaws.com",)),),
+                    )
+                ]
+            ),
+            opts=self.child_opts(),
+        )
+        # Logs and the network interfaces needed to run in the private subnets
+        aws.iam.RolePolicyAttachment(
+            f"{name}VPCAccess", role=role, policy_arn=LAMBDA_VPC_ACCESS_POLICY_ARN, opts=self.child_opts()
+        )
+        aws.iam.RolePolicy(
+            f"{name}QueueAccess",
+            role=role.id,
+            policy=policy_document(
+                statements=[Statement(actions=queue_actions, effect="Allow", resources=(self.queue.arn,))]
+            ),
+            opts=self.child_opts(),
+        )
+        return role
+
+    def create_function(self, name, role, command, environment, subnet_ids, vpc_default_sg_id, memory, timeout):
+        # The backend image provides both handlers, so alert evaluation runs the same code, and architecture, as
+        # the API
+        return aws.lambda_.Function(
+            name,
+            name=name,
+            package_type="Image",
+            image_uri=f"{self.ecr_uri}:latest",
+            image_config=aws.lambda_.FunctionImageConfigArgs(commands=[command]),
+            architectures=[self.image_architecture],
+            role=role.arn,
+            memory_size=memory,
+            timeout=timeout,
+            environment=aws.lambda_.FunctionEnvironmentArgs(variables=environment),
+            vpc_config=aws.lambda_.FunctionVpcConfigArgs(
+                subnet_ids=subnet_ids,
+                security_group_ids=[vpc_default_sg_id],
+            ),
+            opts=self.child_opts(),
+        )
+
+    # create_pipeline wires the schedule to a dispatcher that shards subscriptions into batches of
+    # alerts:batch_size and enqueues them; workers evaluate the batches in parallel, bounded by
+    # alerts:worker_concurrency, and batches that keep failing end up in the dead-letter queue.
+    def create_pipeline(self, subnet_ids, vpc_default_sg_id, backend_environment):
+        queue, dead_letter_queue = self.create_queues()
+        environment = pulumi.Output.all(backend_environment, queue.url).apply(
+            lambda args: {
+                **args[0],
+                "ALERTS_QUEUE_URL": args[1],
+                "ALERTS_BATCH_SIZE": str(self.alerts_config.batch_size),
+            }
+        )
+
+        dispatcher = self.create_function(
+            "AlertDispatcher",
+            role=self.create_lambda_role("AlertDispatcherRole", ("sqs:SendMessage", "sqs:GetQueueAttributes")),
+            command=self.alerts_config.dispatcher_command,
+            environment=environment,
+            subnet_ids=subnet_ids,
+            vpc_default_sg_id=vpc_default_sg_id,
+            memory=256,
+            timeout=DISPATCHER_TIMEOUT_SECONDS,
+        )
+        self.worker_role = self.create_lambda_role(
+            "AlertWorkerRole",
+            ("sqs:ReceiveMessage", "sqs:DeleteMessage", "sqs:ChangeMessageVisibility", "sqs:GetQueueAttributes"),
+        )
+        worker = self.create_function(
+            "AlertWorker",
+            role=self.worker_role,
+            command=self.alerts_config.worker_command,
+            environment=environment,
+            subnet_ids=subnet_ids,
+            vpc_default_sg_id=vpc_default_sg_id,
+            memory=self.alerts_config.worker_memory,
+            timeout=self.alerts_config.worker_timeout_seconds,
+        )
+        aws.lambda_.EventSourceMapping(
+            "AlertWorkerQueueMapping",
+            event_source_arn=queue.arn,
+            function_name=worker.arn,
+            # One message is one shard of subscriptions
+            batch_size=1,
+            function_response_types=["ReportBatchItemFailures"],
+            scaling_config=aws.lambda_.EventSourceMappingScalingConfigArgs(
+                maximum_concurrency=self.alerts_config.worker_concurrency,
+            ),
+            opts=self.child_opts(),
+        )
+        self.create_schedule(dispatcher)
+        self.dead_letter_queue = dead_letter_queue
+        return dispatcher, worker
+
+    def create_schedule(self, dispatcher):
+        scheduler_role = aws.iam.Role(
+            resource_name="AlertSchedulerRole",
+            name="AlertSchedulerRole",
+            assume_role_policy=policy_document(
+                statements=[
+                    Statement(
+                        actions=("sts:AssumeRole",),
+                        effect="Allow",
+                        principals=(Principal(type="Service", identifiers=("scheduler.amazonaws.com",)),),
+                    )
+                ]
+            ),
+            opts=self.child_opts(),
+        )
+        aws.iam.RolePolicy(
+            "AlertSchedulerInvokeDispatcher",
+            role=scheduler_role.id,
+            policy=policy_document(
+                statements=[Statement(actions=("lambda:InvokeFunction",), effect="Allow", resources=(dispatcher.arn,))]
+            ),
+            opts=self.child_opts(),
+        )
+        return aws.scheduler.Schedule(
+            "AlertSweepSchedule",
+            schedule_expression=self.alerts_config.schedule_expression,
+            flexible_time_window=aws.scheduler.ScheduleFlexibleTimeWindowArgs(mode="OFF"),
+            target=aws.scheduler.ScheduleTargetArgs(
+                arn=dispatcher.arn,
+                role_arn=scheduler_role.arn,
+                retry_policy=aws.scheduler.ScheduleTargetRetryPolicyArgs(maximum_retry_attempts=0),
+            ),
+            opts=self.child_opts(),
+        )
@@ -0,0 +1,123 @@
+"""An AWS Python Pulumi program - CloudFront edge caching of read-only backend API responses"""
+
+import pulumi
+import pulumi_aws as aws
+
+from component import Component
+
+# AWS managed policies, the same in every account.
+CACHING_DISABLED_POLICY_ID = "4135ea2d-6df8-44a3-9df3-4b5a84be39ad"
+ALL_VIEWER_EXCEPT_HOST_HEADER_POLICY_ID = "b689b0a8-53d0-40ab-baf2-68738e2966ac"
+ORIGIN_ID = "Backend"
+# Seconds CloudFront keeps idle connections to the backend open for reuse, and waits for a response.
+ORIGIN_KEEPALIVE_TIMEOUT_SECONDS = 60
+ORIGIN_READ_TIMEOUT_SECONDS = 30
+
+
+class ApiEdge(Component):
+    domain_name: pulumi.Output[str]
+    distribution_id: pulumi.Output[str]
+
+    # ApiEdge puts a CloudFront distribution in front of the backend at backend_uri. Routes of
+    # api_edge:cached_routes are cached per path and location query strings; every other route, including
+    # authenticated and mutating ones, passes through uncached with the viewer's headers and JWT.
+    def __init__(self, name, config, backend_uri, opts=None):
+        super().__init__(name, opts)
+        self.api_edge_config = config.api_edge
+        self.distribution = self.create_distribution(backend_uri)
+
+        self.domain_name = self.distribution.domain_name
+        self.distribution_id = self.distribution.id
+        self.register_outputs({"domain_name": self.domain_name, "distribution_id": self.distribution_id})
+
+    # create_cache_policy keys the cache on the path, the route's query strings and the Origin header, whose
+    # CORS response differs per frontend origin. Authorization and cookies are not part of the key, and as the
+    # route has no origin request policy they are not forwarded either: cached routes must not need the JWT.
+    def create_cache_policy(self, index, route):
+        query_strings = (
+            aws.cloudfront.CachePolicyParametersInCacheKeyAndForwardedToOriginQueryStringsConfigQueryStringsArgs(
+                items=list(route.query_strings),
+            )
+        )
+        query_strings_config = aws.cloudfront.CachePolicyParametersInCacheKeyAndForwardedToOriginQueryStringsConfigArgs(
+            query_string_behavior="whitelist" if route.query_strings else "none",
+            query_strings=query_strings if route.query_strings else None,
+        )
+        headers_config = aws.cloudfront.CachePolicyParametersInCacheKeyAndForwardedToOriginHeadersConfigArgs(
+            header_behavior="whitelist",
+            headers=aws.cloudfront.CachePolicyParametersInCacheKeyAndForwardedToOriginHeadersConfigHeadersArgs(
+                items=["Origin"],
+            ),
+        )
+        cookies_config = aws.cloudfront.CachePolicyParametersInCacheKeyAndForwardedToOriginCookiesConfigArgs(
+            cookie_behavior="none",
+        )
+        cache_key_parameters = aws.cloudfront.CachePolicyParametersInCacheKeyAndForwardedToOriginArgs(
+            cookies_config=cookies_config,
+            headers_config=headers_config,
+            query_strings_config=query_strings_config,
+            enable_accept_encoding_brotli=True,
+            enable_accept_encoding_gzip=True,
+        )
+        return aws.cloudfront.CachePolicy(
+            f"ApiCachePolicy-{index}",
+            comment=f"Weather Alerting API - {route.path}",
+            min_ttl=0,
+            default_ttl=route.ttl_seconds,
+            max_ttl=route.ttl_seconds,
+            parameters_in_cache_key_and_forwarded_to_origin=cache_key_parameters,
+            opts=self.child_opts(),
+        )
+
+    def create_distribution(self, backend_uri):
+        cached_behaviors = [
+            aws.cloudfront.DistributionOrderedCacheBehaviorArgs(
+                path_pattern=route.path,
+                target_origin_id=ORIGIN_ID,
+                viewer_protocol_policy="https-only",
+                # Preflight requests reach the backend, but only reads are cached
+                allowed_methods=["GET", "HEAD", "OPTIONS"],
+                cached_methods=["GET", "HEAD"],
+                cache_policy_id=self.create_cache_policy(index, route).id,
+                compress=True,
+            )
+            for index, route in enumerate(self.api_edge_config.cached_routes)
+        ]
+        return aws.cloudfront.Distribution(
+            "ApiDistribution",
+            enabled=True,
+            comment="Weather Alerting backend API",
+            http_version="http2and3",
+            is_ipv6_enabled=True,
+            price_class=self.api_edge_config.price_class,
+            origins=[
+                aws.cloudfront.DistributionOriginArgs(
+                    origin_id=ORIGIN_ID,
+                    domain_name=backend_uri,
+                    custom_origin_config=aws.cloudfront.DistributionOriginCustomOriginConfigArgs(
+                        http_port=80,
+                        https_port=443,
+                        origin_protocol_policy="https-only",
+                        origin_ssl_protocols=["TLSv1.2"],
+                        origin_keepalive_timeout=ORIGIN_KEEPALIVE_TIMEOUT_SECONDS,
+                        origin_read_timeout=ORIGIN_READ_TIMEOUT_SECONDS,
+                    ),
+                )
+            ],
+            # The origin must see its own Host, so every other viewer header is forwarded, the JWT included
+            default_cache_behavior=aws.cloudfront.DistributionDefaultCacheBehaviorArgs(
+                target_origin_id=ORIGIN_ID,
+                viewer_protocol_policy="https-only",
+                allowed_methods=["GET", "HEAD", "OPTIONS", "PUT", "POST", "PATCH", "DELETE"],
+                cached_methods=["GET", "HEAD"],
+                cache_policy_id=CACHING_DISABLED_POLICY_ID,
+                origin_request_policy_id=ALL_VIEWER_EXCEPT_HOST_HEADER_POLICY_ID,
+                compress=True,
+            ),
+            ordered_cache_behaviors=cached_behaviors,
+            restrictions=aws.cloudfront.DistributionRestrictionsArgs(
+                geo_restriction=aws.cloudfront.DistributionRestrictionsGeoRestrictionArgs(restriction_type="none"),
+            ),
+            viewer_certificate=aws.cloudfront.DistributionViewerCertificateArgs(cloudfront_default_certificate=True),
+            opts=self.child_opts(),
+        )
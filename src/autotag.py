@@ -1,22 +1,34 @@
 import pulumi
 
+AWS_TYPE_PREFIX = "aws:"
+
 
 # registerAutoTags registers a global stack transformation that merges a set
 # of tags with whatever was also explicitly added to the resource definition.
+# When the AWS provider already applies the tags through its `defaultTags`
+# config, no transformation is registered and resources skip the Python callback.
 def register_auto_tags(auto_tags):
+    if provider_applies_tags(auto_tags):
+        return
     pulumi.runtime.register_stack_transformation(lambda args: auto_tag(args, auto_tags))
 
 
+# provider_applies_tags returns true if `aws:defaultTags` already contains every auto tag.
+def provider_applies_tags(auto_tags):
+    default_tags = (pulumi.Config("aws").get_object("defaultTags") or {}).get("tags") or {}
+    return auto_tags.items() <= default_tags.items()
+
+
 # auto_tag applies the given tags to the resource properties if applicable.
 def auto_tag(args, auto_tags):
     if is_taggable(args.type_):
-        args.props["tags"] = {**(args.props["tags"] or {}), **auto_tags}
+        args.props["tags"] = {**(args.props.get("tags") or {}), **auto_tags}
         return pulumi.ResourceTransformationResult(args.props, args.opts)
 
 
 # isTaggable returns true if the given resource type is an AWS resource that supports tags.
 def is_taggable(t):
-    return t in taggable_resource_types
+    return t.startswith(AWS_TYPE_PREFIX) and t in _taggable_resource_index
 
 
 # taggable_resource_types is a list of known AWS type tokens that are taggable.
@@ -249,3 +261,6 @@ taggable_resource_types = [
     "aws:workspaces/directory:Directory",
     "aws:workspaces/ipGroup:IpGroup",
 ]
+
+# _taggable_resource_index is a set built once at import for O(1) lookups in is_taggable.
+_taggable_resource_index = frozenset(taggable_resource_types)
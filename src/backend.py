@@ -1,65 +1,215 @@
-"""An AWS Python Pulumi program - App runner for Backend"""
+"""An AWS Python Pulumi program - App runner or ECS Fargate for Backend"""
 
-import time
+import json
+from dataclasses import dataclass
 
 import pulumi
 import pulumi_aws as aws
 
+from component import Component
+from iam_policy import Condition, Principal, Statement, policy_document
+from iam_propagation import wait_for_role_propagation
+from sizing import CapacityPlan, backend_capacity_plan, requests_per_target
 
-class Backend:
-    def __init__(self, list_of_vpc_subnets, vpc_default_sg):
-        self.common_config = pulumi.Config("WeatherAlerting")
-        self.backend_config = pulumi.Config("backend")
-        self.account_id = self.common_config.require_secret_int("account_id")
+XRAY_WRITE_POLICY_ARN = "arn:aws:iam::aws:policy/AWSXRayDaemonWriteAccess"
+ECS_TASK_EXECUTION_POLICY_ARN = "arn:aws:iam::aws:policy/service-role/AmazonECSTaskExecutionRolePolicy"
+CONTAINER_NAME = "backend"
+HTTP_PORT = 80
+HTTPS_PORT = 443
+TLS_POLICY = "ELBSecurityPolicy-TLS13-1-2-2021-06"
+# Time a new task gets to pass the load balancer health checks before ECS replaces it.
+HEALTH_CHECK_GRACE_PERIOD_SECONDS = 60
+LOG_RETENTION_DAYS = 30
+# Open files per task, every connection to a client, DocumentDB or WeatherAPI holds one.
+OPEN_FILES_LIMIT = 65536
+# Actions App Runner needs the ECR access role for to pull the image.
+ECR_IMAGE_ACTIONS = (
+    "ecr:GetDownloadUrlForLayer",
+    "ecr:BatchGetImage",
+    "ecr:DescribeImages",
+    "ecr:GetAuthorizationToken",
+    "ecr:BatchCheckLayerAvailability",
+)
+
+
+@dataclass(frozen=True)
+class MetricSource:
+    namespace: str
+    metric_name: str
+    dimensions: dict
+
+    def metric_args(self):
+        return {"namespace": self.namespace, "metric_name": self.metric_name, "dimensions": self.dimensions}
+
+
+# ServiceMetrics are the CloudWatch metrics of the backend on its compute platform, used by the monitoring.
+@dataclass(frozen=True)
+class ServiceMetrics:
+    label: str
+    alarm_prefix: str
+    latency: MetricSource
+    latency_unit: str
+    errors: MetricSource
+    requests: MetricSource
+    instances: MetricSource
+
+    def sources(self):
+        return {"latency": self.latency, "errors": self.errors, "requests": self.requests, "instances": self.instances}
+
+    def dimensions(self):
+        return {role: source.dimensions for role, source in self.sources().items()}
+
+
+# service_metrics are the metrics of the backend on backend:compute, from the dimensions of each metric of
+# ServiceMetrics.sources. Stacks split into layers rebuild them from the dimensions the app layer publishes.
+def service_metrics(compute, dimensions):
+    if compute == "ecs_fargate":
+        return ServiceMetrics(
+            label="Fargate",
+            alarm_prefix="Fargate",
+            latency=MetricSource("AWS/ApplicationELB", "TargetResponseTime", dimensions["latency"]),
+            latency_unit="s",
+            errors=MetricSource("AWS/ApplicationELB", "HTTPCode_Target_5XX_Count", dimensions["errors"]),
+            requests=MetricSource("AWS/ApplicationELB", "RequestCount", dimensions["requests"]),
+            instances=MetricSource("ECS/ContainerInsights", "RunningTaskCount", dimensions["instances"]),
+        )
+    return ServiceMetrics(
+        label="App Runner",
+        alarm_prefix="AppRunner",
+        latency=MetricSource("AWS/AppRunner", "RequestLatency", dimensions["latency"]),
+        latency_unit="ms",
+        errors=MetricSource("AWS/AppRunner", "5xxStatusResponses", dimensions["errors"]),
+        requests=MetricSource("AWS/AppRunner", "Requests", dimensions["requests"]),
+        instances=MetricSource("AWS/AppRunner", "ActiveInstances", dimensions["instances"]),
+    )
+
+
+class Backend(Component):
+    app_runner_uri: pulumi.Output[str]
+    service_name: pulumi.Output[str]
+    service_id: pulumi.Output[str]
+    runtime_environment: pulumi.Output[dict]
+    instance_role_name: pulumi.Output[str]
+    capacity_plan: CapacityPlan
+    service_arn: pulumi.Output[str]
+    service_metrics: ServiceMetrics
+    auto_scaling_configuration_arn: pulumi.Output[str]
+
+    # A Backend with a region serves that secondary region. Its image comes from the ECR replica in the region,
+    # and the GitHub Actions role is only created with the primary Backend.
+    # With backend:compute ecs_fargate the image runs on ECS Fargate behind a load balancer, which is placed
+    # in load_balancer_subnet_ids of vpc_id; app_runner_uri is then backend:api_domain.
+    def __init__(
+        self,
+        name,
+        config,
+        list_of_vpc_subnets,
+        vpc_default_sg_id,
+        github_open_id_provider_arn,
+        database_uri,
+        database_username,
+        database_password,
+        database_reader_uri,
+        database_connection_string,
+        extra_environment=None,
+        load_balancer_subnet_ids=None,
+        vpc_id=None,
+        region=None,
+        opts=None,
+    ):
+        super().__init__(name, opts, region)
+        self.backend_config = config.backend
+        self.region = region or config.networking.region
+        self.ecr_uri = self.backend_config.ecr_uri
+        if region is not None:
+            self.ecr_uri = self.ecr_uri.replace(f".ecr.{config.networking.region}.", f".ecr.{region}.")
+        self.tracing = config.monitoring.enabled and config.monitoring.tracing
+        # The warm capacity scaler swaps the auto scaling configuration of the primary service on a schedule
+        self.scheduled_scaling = config.warm_capacity.enabled and region is None
+        self.account_id = config.common.account_id
         self.app_runner_uri = None
+        self.capacity_plan = None
+        self.runtime_environment = None
+        self.instance_role = None
+        self.app_runner_service = None
+        self.auto_scaling_configuration_arn = None
         self.list_of_vpc_subnets = list_of_vpc_subnets
-        self.vpc_default_sg = vpc_default_sg
+        self.vpc_default_sg_id = vpc_default_sg_id
+
+        if github_open_id_provider_arn is not None:
+            self.grant_access_rights_for_gh_actions(
+                repo_name="Backend", github_open_id_provider_arn=github_open_id_provider_arn
+            )
+        service_inputs = dict(
+            database_uri=database_uri,
+            database_username=database_username,
+            database_password=database_password,
+            database_reader_uri=database_reader_uri,
+            database_connection_string=database_connection_string,
+            extra_environment=extra_environment,
+        )
+        if self.backend_config.compute == "ecs_fargate":
+            self.create_fargate_service(
+                **service_inputs, load_balancer_subnet_ids=load_balancer_subnet_ids, vpc_id=vpc_id
+            )
+        else:
+            self.create_app_runner(**service_inputs)
+        self.instance_role_name = self.instance_role.name
+        self.register_outputs(
+            {
+                "service_url": self.app_runner_uri,
+                "service_name": self.service_name,
+                "service_id": self.service_id,
+                "instance_role_name": self.instance_role_name,
+            }
+        )
 
-    def grant_access_rights_for_gh_actions(self, repo_name, github_open_id_provider):
+    def grant_access_rights_for_gh_actions(self, repo_name, github_open_id_provider_arn):
         backend_deployer_role = aws.iam.Role(
             f"{repo_name}GithubActionsRole",
             name=f"{repo_name}GithubActionsRole",
-            assume_role_policy=aws.iam.get_policy_document(
+            assume_role_policy=policy_document(
                 statements=[
-                    aws.iam.GetPolicyDocumentStatementArgs(
-                        actions=["sts:AssumeRoleWithWebIdentity"],
+                    Statement(
+                        actions=("sts:AssumeRoleWithWebIdentity",),
                         effect="Allow",
-                        principals=[
-                            aws.iam.GetPolicyDocumentStatementPrincipalArgs(
+                        principals=(
+                            Principal(
                                 type="Federated",
-                                identifiers=[github_open_id_provider.arn],
-                            )
-                        ],
-                        conditions=[
-                            aws.iam.GetPolicyDocumentStatementConditionArgs(
+                                identifiers=(github_open_id_provider_arn,),
+                            ),
+                        ),
+                        conditions=(
+                            Condition(
                                 test="StringLike",
                                 variable="token.actions.githubusercontent.com:sub",
-                                values=[f"repo:{self.backend_config.require('repository')}:*"],
-                            )
-                        ],
+                                values=(f"repo:{self.backend_config.repository}:*",),
+                            ),
+                        ),
                     )
                 ]
-            ).json,
+            ),
+            opts=self.child_opts(),
         )
 
         # Policy for pushing image to ECR
-        ecr_push_image_policy = aws.iam.get_policy_document(
+        ecr_push_image_policy = policy_document(
             statements=[
-                aws.iam.GetPolicyDocumentStatementArgs(
-                    actions=[
+                Statement(
+                    actions=(
                         "ecr:CompleteLayerUpload",
                         "ecr:GetAuthorizationToken",
                         "ecr:UploadLayerPart",
                         "ecr:InitiateLayerUpload",
                         "ecr:BatchCheckLayerAvailability",
                         "ecr:PutImage",
-                    ],
+                    ),
                     effect="Allow",
-                    resources=["*"],
+                    resources=("*",),
                 )
             ],
             policy_id="PushImagesToECR",
-        ).json
+        )
 
         # Attach ecr_push_image_policy to backend_deployer_role
         aws.iam.RolePolicyAttachment(
@@ -68,141 +218,214 @@ class Backend:
             policy_arn=aws.iam.Policy(
                 resource_name="PushImagesToECR",
                 policy=ecr_push_image_policy,
+                opts=self.child_opts(),
             ).arn,
+            opts=self.child_opts(),
         )
 
+    # create_ecr_access_role resolves to the role's ARN once App Runner can pull the image with it.
     def create_ecr_access_role(self):
         role = aws.iam.Role(
-            resource_name="AppRunnerAccessToECR",
-            name="AppRunnerAccessToECR",
-            assume_role_policy=aws.iam.get_policy_document(
+            resource_name=self.resource_name("AppRunnerAccessToECR"),
+            name=self.resource_name("AppRunnerAccessToECR"),
+            assume_role_policy=policy_document(
                 statements=[
-                    aws.iam.GetPolicyDocumentStatementArgs(
-                        actions=["sts:AssumeRole"],
+                    Statement(
+                        actions=("sts:AssumeRole",),
                         effect="Allow",
-                        principals=[
-                            aws.iam.GetPolicyDocumentStatementPrincipalArgs(
+                        principals=(
+                            Principal(
                                 type="Service",
-                                identifiers=["build.apprunner.amazonaws.com"],
-                            )
-                        ],
+                                identifiers=("build.apprunner.amazonaws.com",),
+                            ),
+                        ),
                     )
                 ]
-            ).json,
+            ),
+            opts=self.child_opts(),
         )
         # Attach Policy to ECR access role.
-        aws.iam.RolePolicyAttachment(
-            resource_name="GetECRImagesPolicy",
+        attachment = aws.iam.RolePolicyAttachment(
+            resource_name=self.resource_name("GetECRImagesPolicy"),
             role=role,
             policy_arn=aws.iam.Policy(
-                resource_name="GetECRImagesPolicy",
-                policy=aws.iam.get_policy_document(
+                resource_name=self.resource_name("GetECRImagesPolicy"),
+                policy=policy_document(
                     statements=[
-                        aws.iam.GetPolicyDocumentStatementArgs(
+                        Statement(
                             effect="Allow",
-                            actions=[
-                                "ecr:GetDownloadUrlForLayer",
-                                "ecr:BatchGetImage",
-                                "ecr:DescribeImages",
-                                "ecr:GetAuthorizationToken",
-                                "ecr:BatchCheckLayerAvailability",
-                            ],
-                            resources=["*"],
+                            actions=ECR_IMAGE_ACTIONS,
+                            resources=("*",),
                         )
                     ],
-                ).json,
+                ),
+                opts=self.child_opts(),
             ).arn,
+            opts=self.child_opts(),
+        )
+        # Workaround due to pulumi-aws bug: https://github.com/pulumi/pulumi-aws/issues/1697
+        return pulumi.Output.all(role.arn, attachment.id).apply(
+            lambda args: wait_for_role_propagation(args[0], actions=ECR_IMAGE_ACTIONS, region=self.region)
         )
-        return role
 
     def create_app_runner_vpc_connector(self):
         return aws.apprunner.VpcConnector(
-            "AppRunnerVPCConnector",
+            self.resource_name("AppRunnerVPCConnector"),
             vpc_connector_name="AppRunnerVPCConnector",
-            security_groups=[self.vpc_default_sg],
+            security_groups=[self.vpc_default_sg_id],
             subnets=self.list_of_vpc_subnets,
+            opts=self.child_opts(),
         )
 
     def create_instance_role_arn(self):
         role = aws.iam.Role(
-            resource_name="AppRunnerAccessToInstance",
-            name="AppRunnerAccessToInstance",
-            assume_role_policy=aws.iam.get_policy_document(
+            resource_name=self.resource_name("AppRunnerAccessToInstance"),
+            name=self.resource_name("AppRunnerAccessToInstance"),
+            assume_role_policy=policy_document(
                 statements=[
-                    aws.iam.GetPolicyDocumentStatementArgs(
-                        actions=["sts:AssumeRole"],
+                    Statement(
+                        actions=("sts:AssumeRole",),
                         effect="Allow",
-                        principals=[
-                            aws.iam.GetPolicyDocumentStatementPrincipalArgs(
+                        principals=(
+                            Principal(
                                 type="Service",
-                                identifiers=["tasks.apprunner.amazonaws.com"],
-                            )
-                        ],
+                                identifiers=("tasks.apprunner.amazonaws.com",),
+                            ),
+                        ),
                     )
                 ]
-            ).json,
+            ),
+            opts=self.child_opts(),
         )
         # Attach AppRunner Policy to Instance role.
         aws.iam.RolePolicyAttachment(
-            resource_name="AppRunnerAccessPolicy",
+            resource_name=self.resource_name("AppRunnerAccessPolicy"),
             role=role,
             policy_arn="arn:aws:iam::aws:policy/AWSAppRunnerFullAccess",
+            opts=self.child_opts(),
         )
+        if self.tracing:
+            aws.iam.RolePolicyAttachment(
+                resource_name=self.resource_name("AppRunnerXRayWritePolicy"),
+                role=role,
+                policy_arn=XRAY_WRITE_POLICY_ARN,
+                opts=self.child_opts(),
+            )
         return role
 
-    def create_app_runner(self, database_uri, database_username, database_password):
+    def create_observability_configuration(self):
+        if not self.tracing:
+            return None
+        observability_configuration = aws.apprunner.ObservabilityConfiguration(
+            resource_name=self.resource_name("AppRunnerObservabilityConfig"),
+            observability_configuration_name="AppRunnerObservabilityConfig",
+            trace_configuration=aws.apprunner.ObservabilityConfigurationTraceConfigurationArgs(vendor="AWSXRAY"),
+            opts=self.child_opts(),
+        )
+        return aws.apprunner.ServiceObservabilityConfigurationArgs(
+            observability_enabled=True,
+            observability_configuration_arn=observability_configuration.arn,
+        )
+
+    def plan_capacity(self):
+        return backend_capacity_plan(self.backend_config)
+
+    def create_runtime_environment(
+        self,
+        database_uri,
+        database_username,
+        database_password,
+        database_reader_uri,
+        database_connection_string,
+        extra_environment=None,
+    ):
+        environment = pulumi.Output.all(
+            database_uri,
+            database_username,
+            database_password,
+            self.backend_config.weatherapi_apikey,
+            self.backend_config.hash_salt,
+            self.backend_config.jwt_secret,
+            self.backend_config.smtp_user,
+            self.backend_config.smtp_password,
+            database_reader_uri,
+            database_connection_string,
+        ).apply(
+            lambda args: {
+                "DB_HOST": f"{args[0]}",
+                "DB_USERNAME": f"{args[1]}",
+                "DB_PASSWORD": f"{args[2]}",
+                "DB_READER_HOST": f"{args[8]}",
+                "DB_CONNECTION_STRING": f"{args[9]}",
+                "DB_SSL": "true",
+                "DB_SSL_CA_FILE_PATH": "/etc/ssl/rds-combined-ca-bundle.pem",
+                "WEATHERAPI_APIKEY": f"{args[3]}",
+                "LOG_LEVEL": f"{self.backend_config.log_level}",
+                "HASH_SALT": f"{args[4]}",
+                "JWT_SECRET": f"{args[5]}",
+                "SMTP_HOST": f"{self.backend_config.smtp_host}",
+                "SMTP_PORT": f"{self.backend_config.smtp_port}",
+                "SMTP_USER": f"{args[6]}",
+                "SMTP_PASSWORD": f"{args[7]}",
+                "SMTP_SECURE": str(self.backend_config.smtp_secure).lower(),
+                "SMTP_REQUIRE_TLS": str(self.backend_config.smtp_require_tls).lower(),
+                "CRON_CONFIG": f"{self.backend_config.cron_config}",
+                "SEND_EMAILS": str(self.backend_config.send_emails).lower(),
+            }
+        )
+        if not extra_environment:
+            return environment
+        return pulumi.Output.all(environment, pulumi.Output.all(**extra_environment)).apply(
+            lambda environments: {**environments[0], **environments[1]}
+        )
+
+    def create_app_runner(
+        self,
+        database_uri,
+        database_username,
+        database_password,
+        database_reader_uri,
+        database_connection_string,
+        extra_environment=None,
+    ):
+        self.capacity_plan = self.plan_capacity()
+        self.instance_role = self.create_instance_role_arn()
+        self.runtime_environment = self.create_runtime_environment(
+            database_uri,
+            database_username,
+            database_password,
+            database_reader_uri,
+            database_connection_string,
+            extra_environment,
+        )
+        self.auto_scaling_configuration_arn = aws.apprunner.AutoScalingConfigurationVersion(
+            resource_name=self.resource_name("AppRunnerAutoScalingConfig"),
+            auto_scaling_configuration_name="AppRunnerAutoScalingConfig",
+            min_size=self.capacity_plan.min_instances,
+            max_size=self.capacity_plan.max_instances,
+            max_concurrency=self.capacity_plan.max_concurrency,
+            # The service may still use a replaced revision, the warm capacity scaler deletes it once unused
+            opts=self.child_opts(retain_on_delete=self.scheduled_scaling),
+        ).arn
+        # The warm capacity scaler moves the service to a new base configuration when it is created
+        ignore_changes = ["auto_scaling_configuration_arn"] if self.scheduled_scaling else None
         app_runner = aws.apprunner.Service(
-            resource_name="AppRunnerService",
+            resource_name=self.resource_name("AppRunnerService"),
             service_name="AppRunnerService",
-            auto_scaling_configuration_arn=aws.apprunner.AutoScalingConfigurationVersion(
-                resource_name="AppRunnerAutoScalingConfig",
-                auto_scaling_configuration_name="AppRunnerAutoScalingConfig",
-                min_size=1,
-                max_size=self.backend_config.require_int("auto_scaling_max_instances"),
-            ).arn,
+            auto_scaling_configuration_arn=self.auto_scaling_configuration_arn,
             source_configuration=aws.apprunner.ServiceSourceConfigurationArgs(
                 authentication_configuration=aws.apprunner.ServiceSourceConfigurationAuthenticationConfigurationArgs(
-                    # Workaround due to pulumi-aws bug: https://github.com/pulumi/pulumi-aws/issues/1697
-                    access_role_arn=self.create_ecr_access_role().arn.apply(lambda arn: time.sleep(10) or arn)
+                    access_role_arn=self.create_ecr_access_role()
                 ),
                 image_repository=aws.apprunner.ServiceSourceConfigurationImageRepositoryArgs(
-                    image_identifier=f"{self.backend_config.require('ecr_uri')}:latest",
+                    image_identifier=f"{self.ecr_uri}:latest",
                     image_repository_type="ECR",
                     image_configuration=aws.apprunner.ServiceSourceConfigurationImageRepositoryImageConfigurationArgs(
-                        port=self.backend_config.require_int("port"),
-                        runtime_environment_variables=pulumi.Output.all(
-                            database_uri,
-                            database_username,
-                            database_password,
-                            self.backend_config.require_secret("weatherapi_apikey"),
-                            self.backend_config.require_secret("hash_salt"),
-                            self.backend_config.require_secret("jwt_secret"),
-                            self.backend_config.require_secret("smtp_user"),
-                            self.backend_config.require_secret("smtp_password"),
-                        ).apply(
-                            lambda args: {
-                                "DB_HOST": f"{args[0]}",
-                                "DB_USERNAME": f"{args[1]}",
-                                "DB_PASSWORD": f"{args[2]}",
-                                "DB_SSL": "true",
-                                "DB_SSL_CA_FILE_PATH": "/etc/ssl/rds-combined-ca-bundle.pem",
-                                "WEATHERAPI_APIKEY": f"{args[3]}",
-                                "LOG_LEVEL": f"{self.backend_config.require('log_level')}",
-                                "HASH_SALT": f"{args[4]}",
-                                "JWT_SECRET": f"{args[5]}",
-                                "SMTP_HOST": f"{self.backend_config.require('smtp_host')}",
-                                "SMTP_PORT": f"{self.backend_config.require('smtp_port')}",
-                                "SMTP_USER": f"{args[6]}",
-                                "SMTP_PASSWORD": f"{args[7]}",
-                                "SMTP_SECURE": f"{self.backend_config.require('smtp_secure')}",
-                                "SMTP_REQUIRE_TLS": f"{self.backend_config.require('smtp_require_tls')}",
-                                "CRON_CONFIG": f"{self.backend_config.require('cron_config')}",
-                                "SEND_EMAILS": f"{self.backend_config.require('send_emails')}",
-                            }
-                        ),
+                        port=self.backend_config.port,
+                        runtime_environment_variables=self.runtime_environment,
                     ),
                 ),
-                auto_deployments_enabled=self.backend_config.require_bool("app_runner_auto_deployment"),
+                auto_deployments_enabled=self.backend_config.app_runner_auto_deployment,
             ),
             network_configuration=aws.apprunner.ServiceNetworkConfigurationArgs(
                 egress_configuration=aws.apprunner.ServiceNetworkConfigurationEgressConfigurationArgs(
@@ -211,9 +434,340 @@ class Backend:
                 )
             ),
             instance_configuration=aws.apprunner.ServiceInstanceConfigurationArgs(
-                cpu=self.backend_config.require_int("app_runner_cpu"),
-                memory=self.backend_config.require_int("app_runner_memory"),
-                instance_role_arn=self.create_instance_role_arn().arn,
+                cpu=self.capacity_plan.cpu,
+                memory=self.capacity_plan.memory,
+                instance_role_arn=self.instance_role.arn,
             ),
+            observability_configuration=self.create_observability_configuration(),
+            opts=self.child_opts(ignore_changes=ignore_changes),
         )
+        self.app_runner_service = app_runner
         self.app_runner_uri = app_runner.service_url
+        self.service_name = app_runner.service_name
+        self.service_id = app_runner.service_id
+        self.service_arn = app_runner.arn
+        dimensions = {"ServiceName": app_runner.service_name, "ServiceID": app_runner.service_id}
+        self.service_metrics = service_metrics(
+            "app_runner", {"latency": dimensions, "errors": dimensions, "requests": dimensions, "instances": dimensions}
+        )
+
+    # create_fargate_service takes the inputs of create_app_runner and runs the image as ARM64 Fargate tasks in
+    # the private subnets, behind an Application Load Balancer that serves backend:api_domain over HTTPS.
+    def create_fargate_service(
+        self,
+        database_uri,
+        database_username,
+        database_password,
+        database_reader_uri,
+        database_connection_string,
+        extra_environment=None,
+        load_balancer_subnet_ids=None,
+        vpc_id=None,
+    ):
+        self.capacity_plan = self.plan_capacity()
+        self.instance_role = self.create_fargate_task_role()
+        self.runtime_environment = self.create_runtime_environment(
+            database_uri,
+            database_username,
+            database_password,
+            database_reader_uri,
+            database_connection_string,
+            extra_environment,
+        )
+        # Container Insights publishes the running task count the monitoring alarms on
+        cluster = aws.ecs.Cluster(
+            self.resource_name("BackendCluster"),
+            settings=[aws.ecs.ClusterSettingArgs(name="containerInsights", value="enabled")],
+            opts=self.child_opts(),
+        )
+        target_group = self.create_target_group(vpc_id)
+        load_balancer, listener = self.create_load_balancer(load_balancer_subnet_ids, vpc_id, target_group)
+        service = aws.ecs.Service(
+            self.resource_name("BackendService"),
+            name="BackendService",
+            cluster=cluster.arn,
+            task_definition=self.create_task_definition().arn,
+            launch_type="FARGATE",
+            desired_count=self.capacity_plan.min_instances,
+            network_configuration=aws.ecs.ServiceNetworkConfigurationArgs(
+                subnets=self.list_of_vpc_subnets,
+                security_groups=[self.vpc_default_sg_id],
+                assign_public_ip=False,
+            ),
+            load_balancers=[
+                aws.ecs.ServiceLoadBalancerArgs(
+                    target_group_arn=target_group.arn,
+                    container_name=CONTAINER_NAME,
+                    container_port=self.backend_config.port,
+                )
+            ],
+            health_check_grace_period_seconds=HEALTH_CHECK_GRACE_PERIOD_SECONDS,
+            deployment_minimum_healthy_percent=100,
+            deployment_maximum_percent=200,
+            deployment_circuit_breaker=aws.ecs.ServiceDeploymentCircuitBreakerArgs(enable=True, rollback=True),
+            # The target group only accepts targets once a listener forwards to it, and the task count
+            # belongs to Application Auto Scaling after the first update
+            opts=self.child_opts(depends_on=[listener], ignore_changes=["desired_count"]),
+        )
+        self.create_fargate_scaling(cluster, service, load_balancer, target_group)
+
+        self.app_runner_uri = self.create_api_record(load_balancer)
+        self.service_name = service.name
+        self.service_id = service.id
+        self.service_arn = service.id
+        load_balancer_dimensions = {"LoadBalancer": load_balancer.arn_suffix, "TargetGroup": target_group.arn_suffix}
+        self.service_metrics = service_metrics(
+            "ecs_fargate",
+            {
+                "latency": load_balancer_dimensions,
+                "errors": load_balancer_dimensions,
+                "requests": load_balancer_dimensions,
+                "instances": {"ClusterName": cluster.name, "ServiceName": service.name},
+            },
+        )
+
+    def create_fargate_task_role(self):
+        return aws.iam.Role(
+            resource_name=self.resource_name("FargateTaskRole"),
+            name=self.resource_name("FargateTaskRole"),
+            assume_role_policy=_ecs_tasks_assume_role_policy(),
+            opts=self.child_opts(),
+        )
+
+    def create_fargate_execution_role(self):
+        role = aws.iam.Role(
+            resource_name=self.resource_name("FargateExecutionRole"),
+            name=self.resource_name("FargateExecutionRole"),
+            assume_role_policy=_ecs_tasks_assume_role_policy(),
+            opts=self.child_opts(),
+        )
+        # Pulls the image from ECR and writes the container logs
+        aws.iam.RolePolicyAttachment(
+            resource_name=self.resource_name("FargateExecutionPolicy"),
+            role=role,
+            policy_arn=ECS_TASK_EXECUTION_POLICY_ARN,
+            opts=self.child_opts(),
+        )
+        return role
+
+    # create_task_definition sizes the task from the capacity plan; the App Runner tiers are valid Fargate sizes.
+    # The image must be built for linux/arm64.
+    def create_task_definition(self):
+        log_group = aws.cloudwatch.LogGroup(
+            self.resource_name("BackendLogGroup"),
+            name=f"/ecs/{self.resource_name('weather-alerting-backend')}",
+            retention_in_days=LOG_RETENTION_DAYS,
+            opts=self.child_opts(),
+        )
+        container_definitions = pulumi.Output.all(self.runtime_environment, log_group.name).apply(
+            lambda args: json.dumps(
+                [
+                    {
+                        "name": CONTAINER_NAME,
+                        "image": f"{self.ecr_uri}:latest",
+                        "essential": True,
+                        "portMappings": [{"containerPort": self.backend_config.port, "protocol": "tcp"}],
+                        "environment": [{"name": key, "value": value} for key, value in sorted(args[0].items())],
+                        "ulimits": [{"name": "nofile", "softLimit": OPEN_FILES_LIMIT, "hardLimit": OPEN_FILES_LIMIT}],
+                        "logConfiguration": {
+                            "logDriver": "awslogs",
+                            "options": {
+                                "awslogs-group": args[1],
+                                "awslogs-region": self.region,
+                                "awslogs-stream-prefix": CONTAINER_NAME,
+                            },
+                        },
+                    }
+                ]
+            )
+        )
+        return aws.ecs.TaskDefinition(
+            self.resource_name("BackendTaskDefinition"),
+            family=self.resource_name("weather-alerting-backend"),
+            requires_compatibilities=["FARGATE"],
+            network_mode="awsvpc",
+            cpu=str(self.capacity_plan.cpu),
+            memory=str(self.capacity_plan.memory),
+            runtime_platform=aws.ecs.TaskDefinitionRuntimePlatformArgs(
+                cpu_architecture=self.backend_config.image_architecture.upper(),
+                operating_system_family="LINUX",
+            ),
+            execution_role_arn=self.create_fargate_execution_role().arn,
+            task_role_arn=self.instance_role.arn,
+            container_definitions=container_definitions,
+            opts=self.child_opts(),
+        )
+
+    # create_target_group routes each request to the task with the fewest in-flight requests. Draining tasks
+    # get backend:deregistration_delay_seconds to finish theirs, instead of the load balancer's 300 seconds.
+    def create_target_group(self, vpc_id):
+        return aws.lb.TargetGroup(
+            self.resource_name("BackendTargetGroup"),
+            port=self.backend_config.port,
+            protocol="HTTP",
+            target_type="ip",
+            vpc_id=vpc_id,
+            load_balancing_algorithm_type="least_outstanding_requests",
+            deregistration_delay=self.backend_config.deregistration_delay_seconds,
+            health_check=aws.lb.TargetGroupHealthCheckArgs(
+                path=self.backend_config.health_check_path,
+                matcher="200-399",
+                interval=10,
+                timeout=5,
+                healthy_threshold=2,
+                unhealthy_threshold=3,
+            ),
+            opts=self.child_opts(),
+        )
+
+    # create_load_balancer places the load balancer in the public subnets. It is also in the VPC default
+    # security group, which lets it reach the tasks; its own group only admits HTTP and HTTPS.
+    def create_load_balancer(self, load_balancer_subnet_ids, vpc_id, target_group):
+        security_group = aws.ec2.SecurityGroup(
+            self.resource_name("BackendLoadBalancerSG"),
+            vpc_id=vpc_id,
+            description="HTTP and HTTPS from the internet to the backend load balancer",
+            ingress=[
+                aws.ec2.SecurityGroupIngressArgs(
+                    protocol="tcp",
+                    from_port=port,
+                    to_port=port,
+                    cidr_blocks=["0.0.0.0/0"],
+                    ipv6_cidr_blocks=["::/0"],
+                )
+                for port in (HTTP_PORT, HTTPS_PORT)
+            ],
+            opts=self.child_opts(),
+        )
+        load_balancer = aws.lb.LoadBalancer(
+            self.resource_name("BackendLoadBalancer"),
+            load_balancer_type="application",
+            subnets=load_balancer_subnet_ids,
+            security_groups=[security_group.id, self.vpc_default_sg_id],
+            drop_invalid_header_fields=True,
+            opts=self.child_opts(),
+        )
+        listener = aws.lb.Listener(
+            self.resource_name("BackendHttpsListener"),
+            load_balancer_arn=load_balancer.arn,
+            port=HTTPS_PORT,
+            protocol="HTTPS",
+            ssl_policy=TLS_POLICY,
+            certificate_arn=self.create_certificate(),
+            default_actions=[aws.lb.ListenerDefaultActionArgs(type="forward", target_group_arn=target_group.arn)],
+            opts=self.child_opts(),
+        )
+        aws.lb.Listener(
+            self.resource_name("BackendHttpListener"),
+            load_balancer_arn=load_balancer.arn,
+            port=HTTP_PORT,
+            protocol="HTTP",
+            default_actions=[
+                aws.lb.ListenerDefaultActionArgs(
+                    type="redirect",
+                    redirect=aws.lb.ListenerDefaultActionRedirectArgs(
+                        port=str(HTTPS_PORT), protocol="HTTPS", status_code="HTTP_301"
+                    ),
+                )
+            ],
+            opts=self.child_opts(),
+        )
+        return load_balancer, listener
+
+    # create_certificate returns the ARN of a DNS-validated ACM certificate for backend:api_domain.
+    def create_certificate(self):
+        certificate = aws.acm.Certificate(
+            self.resource_name("BackendCertificate"),
+            domain_name=self.backend_config.api_domain,
+            validation_method="DNS",
+            opts=self.child_opts(),
+        )
+        validation_option = certificate.domain_validation_options[0]
+        validation_record = aws.route53.Record(
+            self.resource_name("BackendCertificateValidation"),
+            zone_id=self.backend_config.hosted_zone_id,
+            name=validation_option.resource_record_name,
+            type=validation_option.resource_record_type,
+            records=[validation_option.resource_record_value],
+            ttl=300,
+            allow_overwrite=True,
+            opts=self.child_opts(),
+        )
+        return aws.acm.CertificateValidation(
+            self.resource_name("BackendCertificateValidation"),
+            certificate_arn=certificate.arn,
+            validation_record_fqdns=[validation_record.fqdn],
+            opts=self.child_opts(),
+        ).certificate_arn
+
+    def create_api_record(self, load_balancer):
+        record = aws.route53.Record(
+            self.resource_name("BackendApiRecord"),
+            zone_id=self.backend_config.hosted_zone_id,
+            name=self.backend_config.api_domain,
+            type="A",
+            aliases=[
+                aws.route53.RecordAliasArgs(
+                    name=load_balancer.dns_name,
+                    zone_id=load_balancer.zone_id,
+                    evaluate_target_health=True,
+                )
+            ],
+            opts=self.child_opts(),
+        )
+        return record.fqdn
+
+    # create_fargate_scaling tracks both the tasks' CPU and the requests per task: Application Auto Scaling
+    # scales out when either is above its target and only scales in when both allow it.
+    def create_fargate_scaling(self, cluster, service, load_balancer, target_group):
+        scaling_target = aws.appautoscaling.Target(
+            self.resource_name("BackendScalingTarget"),
+            service_namespace="ecs",
+            scalable_dimension="ecs:service:DesiredCount",
+            resource_id=pulumi.Output.concat("service/", cluster.name, "/", service.name),
+            min_capacity=self.capacity_plan.min_instances,
+            max_capacity=self.capacity_plan.max_instances,
+            opts=self.child_opts(),
+        )
+        metrics = {
+            "Cpu": ("ECSServiceAverageCPUUtilization", None, self.backend_config.cpu_target_percent),
+            "RequestCount": (
+                "ALBRequestCountPerTarget",
+                pulumi.Output.concat(load_balancer.arn_suffix, "/", target_group.arn_suffix),
+                requests_per_target(self.backend_config),
+            ),
+        }
+        for name, (metric_type, resource_label, target_value) in metrics.items():
+            metric_specification = (
+                aws.appautoscaling.PolicyTargetTrackingScalingPolicyConfigurationPredefinedMetricSpecificationArgs(
+                    predefined_metric_type=metric_type,
+                    resource_label=resource_label,
+                )
+            )
+            scaling_policy_configuration = aws.appautoscaling.PolicyTargetTrackingScalingPolicyConfigurationArgs(
+                predefined_metric_specification=metric_specification,
+                target_value=target_value,
+                scale_in_cooldown=300,
+                scale_out_cooldown=60,
+            )
+            aws.appautoscaling.Policy(
+                self.resource_name(f"Backend{name}ScalingPolicy"),
+                policy_type="TargetTrackingScaling",
+                service_namespace=scaling_target.service_namespace,
+                scalable_dimension=scaling_target.scalable_dimension,
+                resource_id=scaling_target.resource_id,
+                target_tracking_scaling_policy_configuration=scaling_policy_configuration,
+                opts=self.child_opts(),
+            )
+
+
+def _ecs_tasks_assume_role_policy():
+    return policy_document(
+        statements=[
+            Statement(
+                actions=("sts:AssumeRole",),
+                effect="Allow",
+                principals=(Principal(type="Service", identifiers=("ecs-tasks.amazonaws.com",)),),
+            )
+        ]
+    )
@@ -0,0 +1,72 @@
+"""An AWS Python Pulumi program - ElastiCache response cache for WeatherAPI lookups"""
+
+import pulumi_aws as aws
+
+from component import Component
+
+CACHE_PORT = 6379
+
+
+class Cache(Component):
+    def __init__(self, name, config, subnet_ids, vpc_id, vpc_default_sg_id, opts=None):
+        super().__init__(name, opts)
+        self.cache_config = config.cache
+        self.cache_url = None
+
+        self.create_cache(subnet_ids, vpc_id, vpc_default_sg_id)
+        self.register_outputs({"cache_url": self.cache_url})
+
+    def create_cache_security_group(self, vpc_id, vpc_default_sg_id):
+        # Only members of the VPC default security group (the App Runner VPC connector) may connect
+        return aws.ec2.SecurityGroup(
+            "weather-alerting-cache-sg",
+            description="Access to the WeatherAPI response cache",
+            vpc_id=vpc_id,
+            ingress=[
+                aws.ec2.SecurityGroupIngressArgs(
+                    protocol="tcp",
+                    from_port=CACHE_PORT,
+                    to_port=CACHE_PORT,
+                    security_groups=[vpc_default_sg_id],
+                )
+            ],
+            opts=self.child_opts(),
+        )
+
+    def create_cache(self, subnet_ids, vpc_id, vpc_default_sg_id):
+        subnet_group = aws.elasticache.SubnetGroup(
+            "weather-alerting-cache-subnet-group", subnet_ids=subnet_ids, opts=self.child_opts()
+        )
+        replicated = self.cache_config.nodes_number > 1
+        replication_group = aws.elasticache.ReplicationGroup(
+            "WeatherApiCache",
+            description="Cache of WeatherAPI responses",
+            engine=self.cache_config.engine,
+            engine_version=self.cache_config.engine_version,
+            node_type=self.cache_config.node_type,
+            num_cache_clusters=self.cache_config.nodes_number,
+            automatic_failover_enabled=replicated,
+            multi_az_enabled=replicated,
+            port=CACHE_PORT,
+            subnet_group_name=subnet_group.name,
+            security_group_ids=[self.create_cache_security_group(vpc_id, vpc_default_sg_id).id],
+            at_rest_encryption_enabled=True,
+            transit_encryption_enabled=True,
+            apply_immediately=True,
+            opts=self.child_opts(),
+        )
+        self.cache_url = replication_group.primary_endpoint_address.apply(
+            lambda address: f"rediss://{address}:{CACHE_PORT}"
+        )
+        return replication_group
+
+    def environment(self):
+        return cache_environment(self.cache_config, self.cache_url)
+
+
+# cache_environment is the backend environment of the cache at cache_url, also read from the data layer's stack.
+def cache_environment(cache_config, cache_url):
+    return {
+        "CACHE_URL": cache_url,
+        "CACHE_TTL_SECONDS": str(cache_config.ttl_seconds),
+    }
@@ -0,0 +1,105 @@
+"""An AWS Python Pulumi program - Capacity consistency checks between App Runner, DocumentDB and the VPC"""
+
+from dataclasses import dataclass
+
+from sizing import backend_capacity_plan
+
+# Maximum connections per DocumentDB instance, by instance class, from the DocumentDB quotas documentation.
+DOCUMENTDB_MAX_CONNECTIONS = {
+    "db.t3.medium": 500,
+    "db.t4g.medium": 500,
+    "db.r5.large": 1700,
+    "db.r5.xlarge": 3400,
+    "db.r5.2xlarge": 6800,
+    "db.r5.4xlarge": 13600,
+    "db.r5.8xlarge": 30000,
+    "db.r5.12xlarge": 30000,
+    "db.r5.16xlarge": 30000,
+    "db.r5.24xlarge": 30000,
+    "db.r6g.large": 1700,
+    "db.r6g.xlarge": 3400,
+    "db.r6g.2xlarge": 6800,
+    "db.r6g.4xlarge": 13600,
+    "db.r6g.8xlarge": 30000,
+    "db.r6g.12xlarge": 30000,
+    "db.r6g.16xlarge": 30000,
+}
+# A NAT gateway holds at most this many simultaneous connections to one destination IP, port and protocol.
+NAT_GATEWAY_CONNECTIONS_PER_DESTINATION = 55000
+# Share of a limit above which a check warns, leaving room for deployments, retries and bursts.
+WARNING_UTILIZATION = 0.8
+
+
+@dataclass(frozen=True)
+class CapacityCheck:
+    name: str
+    demand: float
+    limit: float
+    detail: str
+
+    @property
+    def utilization(self):
+        return self.demand / self.limit
+
+    @property
+    def status(self):
+        if self.utilization > 1:
+            return "exceeded"
+        if self.utilization > WARNING_UTILIZATION:
+            return "warning"
+        return "ok"
+
+    def report_line(self):
+        return f"{self.status:<8} {self.name:<32} {self.demand:>8.0f} / {self.limit:<8.0f} {self.detail}"
+
+
+# check_capacity compares the peak demand the stack config allows against the AWS limits it runs into.
+# It returns the checks, and warnings about settings it can not check or that only slow requests down.
+def check_capacity(config):
+    checks, warnings = [], []
+    plan = backend_capacity_plan(config.backend)
+
+    # With a replica set connection string the driver keeps a pool to every instance of the cluster, and backends
+    # in secondary regions also connect to the primary cluster, so each instance sees every client's pool.
+    clients = len(config.multi_region.regions) * plan.max_instances
+    client_description = f"{clients} App Runner instances"
+    if config.alerts.enabled:
+        clients += config.alerts.worker_concurrency + 1
+        client_description += f" + {config.alerts.worker_concurrency + 1} alert Lambdas"
+    max_connections = DOCUMENTDB_MAX_CONNECTIONS.get(config.database.instance_class)
+    if max_connections is None:
+        warnings.append(f"database:instance_class {config.database.instance_class} has no known connection limit")
+    else:
+        checks.append(
+            CapacityCheck(
+                name="DocumentDB connections/instance",
+                demand=clients * config.database.max_pool_size,
+                limit=max_connections,
+                detail=f"{client_description} x database:max_pool_size {config.database.max_pool_size}, "
+                f"{config.database.instance_class}",
+            )
+        )
+    if config.database.max_pool_size < plan.max_concurrency:
+        warnings.append(
+            f"database:max_pool_size {config.database.max_pool_size} is below the {plan.max_concurrency} concurrent "
+            "requests per App Runner instance, requests beyond it wait for a connection"
+        )
+
+    # Every in-flight request may hold connections to the same external API, shared by the region's NAT gateways
+    nat_gateways_number = config.networking.nat_gateways_number
+    checks.append(
+        CapacityCheck(
+            name="NAT connections/destination",
+            demand=plan.max_instances * plan.max_concurrency * config.networking.egress_connections_per_request,
+            limit=nat_gateways_number * NAT_GATEWAY_CONNECTIONS_PER_DESTINATION,
+            detail=f"{plan.max_instances} instances x {plan.max_concurrency} concurrent requests x "
+            f"networking:egress_connections_per_request {config.networking.egress_connections_per_request}, "
+            f"{nat_gateways_number} NAT gateway(s)",
+        )
+    )
+    return checks, warnings
+
+
+def capacity_report(checks, warnings):
+    lines = ["Capacity report:", *(f"  {check.report_line()}" for check in checks)]
+    return "\n".join(lines + [f"  note     {warning}" for warning in warnings])
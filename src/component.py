@@ -0,0 +1,25 @@
+"""An AWS Python Pulumi program - Base class of the stack's component resources"""
+
+import pulumi
+
+COMPONENT_TYPE_PREFIX = "weather-alerting:components"
+
+
+class Component(pulumi.ComponentResource):
+    # region is set on the copies of a component built in secondary regions, whose resource names get it as suffix.
+    def __init__(self, name, opts=None, region=None):
+        super().__init__(f"{COMPONENT_TYPE_PREFIX}:{type(self).__name__}", name, None, opts)
+        self.name_suffix = f"-{region}" if region else ""
+
+    # child_opts parents a resource to this component. The alias is the URN the resource had when it was
+    # registered at the top level of the stack, so moving it under the component does not replace it.
+    def child_opts(self, **options):
+        return pulumi.ResourceOptions(
+            parent=self,
+            aliases=[pulumi.Alias(parent=pulumi.ROOT_STACK_RESOURCE)],
+            **options,
+        )
+
+    # resource_name keeps resource names unique between the copies of a component in several regions.
+    def resource_name(self, name):
+        return f"{name}{self.name_suffix}"
@@ -1,46 +1,145 @@
 """An AWS Python Pulumi program - MongoDB Database for backend operations"""
 
+from urllib.parse import quote_plus, urlencode
 
 import pulumi
 import pulumi_aws as aws
 
+from component import Component
+from stack_config import DOCUMENTDB_PARAMETER_GROUP_FAMILIES
 
-class Database:
-    def __init__(self):
-        self.common_config = pulumi.Config("WeatherAlerting")
-        self.database_config = pulumi.Config("database")
-        self.database_username = self.database_config.require_secret("username")
-        self.database_password = self.database_config.require_secret("password")
+DOCUMENTDB_PORT = 27017
+DOCUMENTDB_REPLICA_SET = "rs0"
+DOCUMENTDB_CA_FILE_PATH = "/etc/ssl/rds-combined-ca-bundle.pem"
+# Cluster parameters managed by the stack, overridable with database:cluster_parameters.
+DEFAULT_CLUSTER_PARAMETERS = {
+    "audit_logs": "disabled",
+    "profiler": "enabled",
+    "profiler_threshold_ms": "100",
+    "profiler_sampling_rate": "1.0",
+    "tls": "enabled",
+    "ttl_monitor": "enabled",
+}
+# Parameters that only take effect after the instances reboot.
+STATIC_CLUSTER_PARAMETERS = {"tls"}
+
+
+class Database(Component):
+    database_uri: pulumi.Output[str]
+    database_reader_uri: pulumi.Output[str]
+    database_connection_string: pulumi.Output[str]
+    cluster_identifier: pulumi.Output[str]
+    cluster_arn: pulumi.Output[str]
+
+    # A Database with global_cluster_identifier is a read-only secondary cluster of that DocumentDB global cluster.
+    def __init__(self, name, config, subnet_ids, region=None, global_cluster_identifier=None, opts=None):
+        super().__init__(name, opts, region)
+        self.database_config = config.database
+        self.multi_region = config.multi_region.enabled
+        self.global_cluster_identifier = global_cluster_identifier
+        self.database_username = self.database_config.username
+        self.database_password = self.database_config.password
         self.database_uri = None
-        self.database_subnet_group = None
+        self.database_reader_uri = None
+        self.database_connection_string = None
+        self.db_cluster = None
+
+        db_cluster = self.create_documentDB(self.create_db_subnet_group(subnet_ids))
+        self.cluster_identifier = db_cluster.cluster_identifier
+        self.cluster_arn = db_cluster.arn
+        self.register_outputs(
+            {
+                "endpoint": self.database_uri,
+                "reader_endpoint": self.database_reader_uri,
+                "cluster_identifier": self.cluster_identifier,
+            }
+        )
 
     def create_db_subnet_group(self, subnet_ids):
-        subnet_group = aws.docdb.SubnetGroup("weather-alerting-subnet-group", subnet_ids=subnet_ids)
+        subnet_group = aws.docdb.SubnetGroup(
+            self.resource_name("weather-alerting-subnet-group"), subnet_ids=subnet_ids, opts=self.child_opts()
+        )
         return subnet_group.name
 
+    def create_cluster_parameter_group(self):
+        parameters = {**DEFAULT_CLUSTER_PARAMETERS, **self.database_config.cluster_parameters}
+        parameter_group = aws.docdb.ClusterParameterGroup(
+            self.resource_name("MongoDbClusterParameterGroup"),
+            family=DOCUMENTDB_PARAMETER_GROUP_FAMILIES[self.database_config.mongodb_version],
+            description="Weather Alerting DocumentDB cluster parameters",
+            parameters=[
+                aws.docdb.ClusterParameterGroupParameterArgs(
+                    name=name,
+                    value=str(value),
+                    apply_method="pending-reboot" if name in STATIC_CLUSTER_PARAMETERS else "immediate",
+                )
+                for name, value in sorted(parameters.items())
+            ],
+            opts=self.child_opts(),
+        )
+        log_exports = []
+        if parameters["profiler"] == "enabled":
+            log_exports.append("profiler")
+        if parameters["audit_logs"] != "disabled":
+            log_exports.append("audit")
+        return parameter_group, log_exports
+
     def create_documentDB(self, db_subnet_group_name):
+        parameter_group, log_exports = self.create_cluster_parameter_group()
+        secondary = self.global_cluster_identifier is not None
+        # The primary cluster joins the global cluster when it is created from it, outside of this resource
+        ignore_changes = ["global_cluster_identifier"] if self.multi_region and not secondary else None
         db_cluster = aws.docdb.Cluster(
-            "MongoDbCluster",
+            self.resource_name("MongoDbCluster"),
             backup_retention_period=30,
             cluster_identifier="my-docdb-cluster",
             engine="docdb",
-            engine_version=self.database_config.require("mongodb_version"),
-            master_username=self.database_username,
-            master_password=self.database_password,
+            engine_version=self.database_config.mongodb_version,
+            # Secondary clusters replicate the primary's users
+            master_username=None if secondary else self.database_username,
+            master_password=None if secondary else self.database_password,
+            global_cluster_identifier=self.global_cluster_identifier,
             skip_final_snapshot=True,
             deletion_protection=False,
             db_subnet_group_name=db_subnet_group_name,
+            db_cluster_parameter_group_name=parameter_group.name,
+            enabled_cloudwatch_logs_exports=log_exports,
+            apply_immediately=self.database_config.apply_immediately,
+            opts=self.child_opts(ignore_changes=ignore_changes),
         )
-        cluster_instances = []
-        instances_number = self.database_config.require_int("instances_number")
-
-        for instance_index in range(instances_number):
-            cluster_instances.append(
-                aws.docdb.ClusterInstance(
-                    f"cluster-instance-{instance_index}",
-                    identifier=f"cluster-instance-{instance_index}",
-                    cluster_identifier=db_cluster.id,
-                    instance_class=self.database_config.require("instance_class"),
-                )
+        for instance_index in range(self.database_config.instances_number):
+            aws.docdb.ClusterInstance(
+                self.resource_name(f"cluster-instance-{instance_index}"),
+                identifier=f"cluster-instance-{instance_index}",
+                cluster_identifier=db_cluster.id,
+                instance_class=self.database_config.instance_class,
+                enable_performance_insights=self.database_config.performance_insights,
+                apply_immediately=self.database_config.apply_immediately,
+                opts=self.child_opts(),
             )
+        self.db_cluster = db_cluster
         self.database_uri = db_cluster.endpoint
+        self.database_reader_uri = db_cluster.reader_endpoint
+        self.database_connection_string = self.create_connection_string(db_cluster.endpoint)
+        return db_cluster
+
+    def create_connection_string(self, endpoint):
+        # Connecting through the replica set lets the driver send reads to replicas.
+        options = urlencode(
+            {
+                "tls": "true",
+                "tlsCAFile": DOCUMENTDB_CA_FILE_PATH,
+                "replicaSet": DOCUMENTDB_REPLICA_SET,
+                "readPreference": "secondaryPreferred",
+                "retryWrites": "false",
+                "maxPoolSize": self.database_config.max_pool_size,
+                "connectTimeoutMS": self.database_config.connect_timeout_ms,
+                "serverSelectionTimeoutMS": self.database_config.server_selection_timeout_ms,
+            }
+        )
+        return pulumi.Output.secret(
+            pulumi.Output.all(self.database_username, self.database_password, endpoint).apply(
+                lambda args: f"mongodb://{quote_plus(args[0])}:{quote_plus(args[1])}"
+                f"@{args[2]}:{DOCUMENTDB_PORT}/?{options}"
+            )
+        )
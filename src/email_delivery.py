@@ -0,0 +1,257 @@
+"""An AWS Python Pulumi program - Queued email delivery through SES"""
+
+import json
+import math
+import os
+
+import pulumi
+import pulumi_aws as aws
+
+from component import Component
+from iam_policy import Condition, Principal, Statement, policy_document
+
+LAMBDA_BASIC_EXECUTION_POLICY_ARN = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+SENDER_CODE_PATH = os.path.join(os.path.dirname(__file__), "functions", "email_sender")
+# Time for the sender to start and report its batch, on top of pacing the batch at the send rate.
+SENDER_TIMEOUT_MARGIN_SECONDS = 30
+# AWS recommends a queue visibility timeout of at least six times the consumer's timeout.
+VISIBILITY_TIMEOUT_FACTOR = 6
+
+
+class EmailDelivery(Component):
+    def __init__(self, name, config, opts=None):
+        super().__init__(name, opts)
+        self.email_config = config.email
+        self.send_emails = config.backend.send_emails
+        self.email_queue = None
+        self.dead_letter_queue = None
+        self.feedback_queue = None
+
+        self.create_email_delivery()
+        self.register_outputs(
+            {
+                "email_queue_url": self.email_queue.url,
+                "feedback_queue_url": self.feedback_queue.url,
+                "dkim_tokens": self.dkim_tokens,
+            }
+        )
+
+    def environment(self):
+        return {
+            "EMAIL_QUEUE_URL": self.email_queue.url,
+            "EMAIL_FEEDBACK_QUEUE_URL": self.feedback_queue.url,
+        }
+
+    # create_email_delivery provisions the SES identity, the queue the backend writes emails to and a
+    # sender Lambda draining it in batches; bounces and complaints come back on the feedback queue.
+    def create_email_delivery(self):
+        configuration_set, identity = self.create_ses_identity()
+        self.create_queues()
+        self.route_feedback(configuration_set)
+        self.create_sender(configuration_set, identity)
+        return identity
+
+    def create_ses_identity(self):
+        configuration_set = aws.sesv2.ConfigurationSet(
+            "WeatherAlertingEmails",
+            configuration_set_name="WeatherAlertingEmails",
+            # Never send again to addresses that bounced or complained
+            suppression_options=aws.sesv2.ConfigurationSetSuppressionOptionsArgs(
+                suppressed_reasons=["BOUNCE", "COMPLAINT"],
+            ),
+            opts=self.child_opts(),
+        )
+        identity = aws.sesv2.EmailIdentity(
+            "WeatherAlertingEmailIdentity",
+            email_identity=self.email_config.identity,
+            configuration_set_name=configuration_set.configuration_set_name,
+            opts=self.child_opts(),
+        )
+        self.dkim_tokens = identity.dkim_signing_attributes.tokens
+        return configuration_set, identity
+
+    def create_queues(self):
+        self.dead_letter_queue = aws.sqs.Queue(
+            "weather-alerting-email-dlq", message_retention_seconds=14 * 24 * 3600, opts=self.child_opts()
+        )
+        self.email_queue = aws.sqs.Queue(
+            "weather-alerting-email",
+            visibility_timeout_seconds=self.sender_timeout() * VISIBILITY_TIMEOUT_FACTOR,
+            redrive_policy=self.dead_letter_queue.arn.apply(
+                lambda arn: json.dumps(
+                    {"deadLetterTargetArn": arn, "maxReceiveCount": self.email_config.max_receive_count}
+                )
+            ),
+            opts=self.child_opts(),
+        )
+        self.feedback_queue = aws.sqs.Queue(
+            "weather-alerting-email-feedback",
+            message_retention_seconds=14 * 24 * 3600,
+            opts=self.child_opts(),
+        )
+        return self.email_queue, self.feedback_queue
+
+    def route_feedback(self, configuration_set):
+        topic = aws.sns.Topic("weather-alerting-email-feedback", opts=self.child_opts())
+        aws.sns.TopicPolicy(
+            "EmailFeedbackTopicPolicy",
+            arn=topic.arn,
+            policy=policy_document(
+                statements=[
+                    Statement(
+                        actions=("sns:Publish",),
+                        effect="Allow",
+                        resources=(topic.arn,),
+                        principals=(Principal(type="Service", identifiers=("ses.amazonaws.com",)),),
+                        conditions=(
+                            Condition(test="ArnLike", variable="AWS:SourceArn", values=(configuration_set.arn,)),
+                        ),
+                    )
+                ]
+            ),
+            opts=self.child_opts(),
+        )
+        aws.sesv2.ConfigurationSetEventDestination(
+            "EmailFeedbackEventDestination",
+            configuration_set_name=configuration_set.configuration_set_name,
+            event_destination_name="bounces-and-complaints",
+            event_destination=aws.sesv2.ConfigurationSetEventDestinationEventDestinationArgs(
+                enabled=True,
+                matching_event_types=["BOUNCE", "COMPLAINT"],
+                sns_destination=aws.sesv2.ConfigurationSetEventDestinationEventDestinationSnsDestinationArgs(
+                    topic_arn=topic.arn,
+                ),
+            ),
+            opts=self.child_opts(),
+        )
+        aws.sqs.QueuePolicy(
+            "EmailFeedbackQueuePolicy",
+            queue_url=self.feedback_queue.url,
+            policy=policy_document(
+                statements=[
+                    Statement(
+                        actions=("sqs:SendMessage",),
+                        effect="Allow",
+                        resources=(self.feedback_queue.arn,),
+                        principals=(Principal(type="Service", identifiers=("sns.amazonaws.com",)),),
+                        conditions=(Condition(test="ArnEquals", variable="aws:SourceArn", values=(topic.arn,)),),
+                    )
+                ]
+            ),
+            opts=self.child_opts(),
+        )
+        return aws.sns.TopicSubscription(
+            "EmailFeedbackSubscription",
+            topic=topic.arn,
+            protocol="sqs",
+            endpoint=self.feedback_queue.arn,
+            raw_message_delivery=True,
+            opts=self.child_opts(),
+        )
+
+    def create_sender_role(self, configuration_set, identity):
+        role = aws.iam.Role(
+            resource_name="EmailSenderRole",
+            name="EmailSenderRole",
+            assume_role_policy=policy_document(
+                statements=[
+                    Statement(
+                        actions=("sts:AssumeRole",),
+                        effect="Allow",
+                        principals=(Principal(type="Service", identifiers=("lambda.amazonaws.com",)),),
+                    )
+                ]
+            ),
+            opts=self.child_opts(),
+        )
+        aws.iam.RolePolicyAttachment(
+            "EmailSenderLogs", role=role, policy_arn=LAMBDA_BASIC_EXECUTION_POLICY_ARN, opts=self.child_opts()
+        )
+        aws.iam.RolePolicy(
+            "EmailSenderAccess",
+            role=role.id,
+            policy=policy_document(
+                statements=[
+                    Statement(
+                        actions=("ses:SendEmail",),
+                        effect="Allow",
+                        resources=(identity.arn, configuration_set.arn),
+                    ),
+                    Statement(
+                        actions=(
+                            "sqs:ReceiveMessage",
+                            "sqs:DeleteMessage",
+                            "sqs:ChangeMessageVisibility",
+                            "sqs:GetQueueAttributes",
+                        ),
+                        effect="Allow",
+                        resources=(self.email_queue.arn,),
+                    ),
+                    # The sender moves malformed messages to the dead-letter queue itself
+                    Statement(actions=("sqs:SendMessage",), effect="Allow", resources=(self.dead_letter_queue.arn,)),
+                ]
+            ),
+            opts=self.child_opts(),
+        )
+        return role
+
+    # Each concurrent sender gets an equal share of the SES send rate.
+    def sender_send_rate(self):
+        return self.email_config.max_send_rate / self.email_config.sender_concurrency
+
+    def sender_timeout(self):
+        return math.ceil(self.email_config.batch_size / self.sender_send_rate()) + SENDER_TIMEOUT_MARGIN_SECONDS
+
+    def create_sender(self, configuration_set, identity):
+        # SES and SQS are reached over their public endpoints, so the sender runs outside the VPC
+        sender = aws.lambda_.Function(
+            "EmailSender",
+            name="EmailSender",
+            runtime="python3.11",
+            architectures=["arm64"],
+            handler="handler.handler",
+            code=pulumi.FileArchive(SENDER_CODE_PATH),
+            role=self.create_sender_role(configuration_set, identity).arn,
+            memory_size=128,
+            timeout=self.sender_timeout(),
+            environment=aws.lambda_.FunctionEnvironmentArgs(
+                variables={
+                    "EMAIL_FROM_ADDRESS": self.email_config.from_address,
+                    "SES_CONFIGURATION_SET": configuration_set.configuration_set_name,
+                    "SES_MAX_SEND_RATE": str(self.sender_send_rate()),
+                    "SEND_EMAILS": str(self.send_emails).lower(),
+                    "DEAD_LETTER_QUEUE_URL": self.dead_letter_queue.url,
+                }
+            ),
+            opts=self.child_opts(),
+        )
+        aws.lambda_.EventSourceMapping(
+            "EmailSenderQueueMapping",
+            event_source_arn=self.email_queue.arn,
+            function_name=sender.arn,
+            batch_size=self.email_config.batch_size,
+            function_response_types=["ReportBatchItemFailures"],
+            scaling_config=aws.lambda_.EventSourceMappingScalingConfigArgs(
+                maximum_concurrency=self.email_config.sender_concurrency,
+            ),
+            opts=self.child_opts(),
+        )
+        return sender
+
+    # grant_queue_access lets the given role enqueue emails and consume bounce and complaint events
+    def grant_queue_access(self, name, role_name):
+        return aws.iam.RolePolicy(
+            f"{name}EmailQueueAccess",
+            role=role_name,
+            policy=policy_document(
+                statements=[
+                    Statement(actions=("sqs:SendMessage",), effect="Allow", resources=(self.email_queue.arn,)),
+                    Statement(
+                        actions=("sqs:ReceiveMessage", "sqs:DeleteMessage", "sqs:GetQueueAttributes"),
+                        effect="Allow",
+                        resources=(self.feedback_queue.arn,),
+                    ),
+                ]
+            ),
+            opts=self.child_opts(),
+        )
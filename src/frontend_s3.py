@@ -4,17 +4,50 @@ import json
 import pulumi
 import pulumi_aws as aws
 
+from component import Component
+from iam_policy import Condition, Principal, Statement, policy_document
 
-class Frontend:
-    def __init__(self):
-        self.frontend_config = pulumi.Config("frontend")
+# Angular build output carries a content hash in these file names, so they can be cached for a year.
+HASHED_ASSET_PATTERNS = ("*.js", "*.css", "*.woff2")
+HASHED_ASSET_TTL_SECONDS = 365 * 24 * 60 * 60
+# Keys written by scripts/publish_frontend_assets.py for itself, and the manifest key it used before.
+PUBLISH_KEYS = ("_publish/*", ".publish-manifest.json")
+
+
+class Frontend(Component):
+    bucket_name: pulumi.Output[str]
+    distribution_id: pulumi.Output[str]
+    distribution_domain_name: pulumi.Output[str]
+
+    def __init__(self, name, config, backend_uri, github_open_id_provider_arn, opts=None):
+        super().__init__(name, opts)
+        self.frontend_config = config.frontend
         self.s3_bucket = None
+        self.distribution = None
+
+        self.create_frontend_bucket()
+        if self.frontend_config.cdn_enabled:
+            self.create_cdn()
+        self.attach_policies()
+        self.render_config_to_s3_bucket(backend_uri=backend_uri)
+        self.authorize_github_to_deploy(github_open_id_provider_arn=github_open_id_provider_arn)
+
+        self.bucket_name = self.s3_bucket.bucket
+        self.distribution_id = self.distribution.id if self.distribution is not None else None
+        self.distribution_domain_name = self.distribution.domain_name if self.distribution is not None else None
+        self.register_outputs(
+            {
+                "bucket_name": self.bucket_name,
+                "distribution_id": self.distribution_id,
+                "distribution_domain_name": self.distribution_domain_name,
+            }
+        )
 
     # Create an AWS resource (S3 Bucket)
     def create_frontend_bucket(self):
         bucket = aws.s3.Bucket(
-            self.frontend_config.require("bucket_name"),
-            bucket=self.frontend_config.require("bucket_name"),
+            self.frontend_config.bucket_name,
+            bucket=self.frontend_config.bucket_name,
             website=aws.s3.BucketWebsiteArgs(
                 index_document="index.html",
                 error_document="index.html",
@@ -28,7 +61,8 @@ class Frontend:
                     }]
                     """,
             ),
-            force_destroy=self.frontend_config.require_bool("s3_force_destroy"),
+            force_destroy=self.frontend_config.s3_force_destroy,
+            opts=self.child_opts(),
         )
         # Set ownership controls for the new bucket
         aws.s3.BucketOwnershipControls(
@@ -37,23 +71,130 @@ class Frontend:
             rule=aws.s3.BucketOwnershipControlsRuleArgs(
                 object_ownership="ObjectWriter",
             ),
+            opts=self.child_opts(),
         )
+        # With the CDN in front, the bucket is only readable by CloudFront
+        block_public_access = self.frontend_config.cdn_enabled
         aws.s3.BucketPublicAccessBlock(
             "FrontendBucketPublicAccessBlock",
             bucket=bucket.id,
-            block_public_acls=False,
-            block_public_policy=False,
-            ignore_public_acls=False,
-            restrict_public_buckets=False,
+            block_public_acls=block_public_access,
+            block_public_policy=block_public_access,
+            ignore_public_acls=block_public_access,
+            restrict_public_buckets=block_public_access,
+            opts=self.child_opts(),
         )
         self.s3_bucket = bucket
         return bucket
 
+    def create_cache_policy(self, name, ttl_seconds):
+        # Only the path is part of the cache key; compressed variants are cached separately per encoding
+        cookies_config = aws.cloudfront.CachePolicyParametersInCacheKeyAndForwardedToOriginCookiesConfigArgs(
+            cookie_behavior="none",
+        )
+        headers_config = aws.cloudfront.CachePolicyParametersInCacheKeyAndForwardedToOriginHeadersConfigArgs(
+            header_behavior="none",
+        )
+        query_strings_config = aws.cloudfront.CachePolicyParametersInCacheKeyAndForwardedToOriginQueryStringsConfigArgs(
+            query_string_behavior="none",
+        )
+        cache_key_parameters = aws.cloudfront.CachePolicyParametersInCacheKeyAndForwardedToOriginArgs(
+            cookies_config=cookies_config,
+            headers_config=headers_config,
+            query_strings_config=query_strings_config,
+            enable_accept_encoding_brotli=True,
+            enable_accept_encoding_gzip=True,
+        )
+        return aws.cloudfront.CachePolicy(
+            name,
+            comment=f"Weather Alerting frontend - {name}",
+            min_ttl=0,
+            default_ttl=ttl_seconds,
+            max_ttl=ttl_seconds,
+            parameters_in_cache_key_and_forwarded_to_origin=cache_key_parameters,
+            opts=self.child_opts(),
+        )
+
+    def create_cdn(self):
+        origin_id = "FrontendBucket"
+        origin_access_control = aws.cloudfront.OriginAccessControl(
+            "FrontendOriginAccessControl",
+            description="CloudFront access to the frontend bucket",
+            origin_access_control_origin_type="s3",
+            signing_behavior="always",
+            signing_protocol="sigv4",
+            opts=self.child_opts(),
+        )
+        html_cache_policy = self.create_cache_policy("FrontendHtmlCachePolicy", self.frontend_config.html_ttl_seconds)
+        hashed_assets_cache_policy = self.create_cache_policy(
+            "FrontendHashedAssetsCachePolicy", HASHED_ASSET_TTL_SECONDS
+        )
+        config_cache_policy = self.create_cache_policy(
+            "FrontendConfigCachePolicy", self.frontend_config.config_ttl_seconds
+        )
+
+        def cache_behavior(path_pattern, cache_policy):
+            return aws.cloudfront.DistributionOrderedCacheBehaviorArgs(
+                path_pattern=path_pattern,
+                target_origin_id=origin_id,
+                viewer_protocol_policy="redirect-to-https",
+                allowed_methods=["GET", "HEAD"],
+                cached_methods=["GET", "HEAD"],
+                cache_policy_id=cache_policy.id,
+                compress=True,
+            )
+
+        distribution = aws.cloudfront.Distribution(
+            "FrontendDistribution",
+            enabled=True,
+            comment="Weather Alerting frontend",
+            default_root_object="index.html",
+            http_version="http2and3",
+            is_ipv6_enabled=True,
+            price_class=self.frontend_config.cdn_price_class,
+            origins=[
+                aws.cloudfront.DistributionOriginArgs(
+                    origin_id=origin_id,
+                    domain_name=self.s3_bucket.bucket_regional_domain_name,
+                    origin_access_control_id=origin_access_control.id,
+                )
+            ],
+            default_cache_behavior=aws.cloudfront.DistributionDefaultCacheBehaviorArgs(
+                target_origin_id=origin_id,
+                viewer_protocol_policy="redirect-to-https",
+                allowed_methods=["GET", "HEAD"],
+                cached_methods=["GET", "HEAD"],
+                cache_policy_id=html_cache_policy.id,
+                compress=True,
+            ),
+            # config.json is listed first, as the first matching behavior wins
+            ordered_cache_behaviors=[cache_behavior("assets/config.json", config_cache_policy)]
+            + [cache_behavior(pattern, hashed_assets_cache_policy) for pattern in HASHED_ASSET_PATTERNS],
+            # SPA fallback: a private bucket answers unknown keys with 403, so serve index.html like the website did
+            custom_error_responses=[
+                aws.cloudfront.DistributionCustomErrorResponseArgs(
+                    error_code=error_code,
+                    response_code=200,
+                    response_page_path="/index.html",
+                    error_caching_min_ttl=10,
+                )
+                for error_code in (403, 404)
+            ],
+            restrictions=aws.cloudfront.DistributionRestrictionsArgs(
+                geo_restriction=aws.cloudfront.DistributionRestrictionsGeoRestrictionArgs(restriction_type="none"),
+            ),
+            viewer_certificate=aws.cloudfront.DistributionViewerCertificateArgs(cloudfront_default_certificate=True),
+            opts=self.child_opts(),
+        )
+        self.distribution = distribution
+        return distribution
+
     def attach_policies(self):
         aws.s3.BucketPolicy(
             "publicReadPolicy",
             bucket=self.s3_bucket.id,
             policy=self.create_s3_frontend_policy(),
+            opts=self.child_opts(),
         )
 
     def render_config_to_s3_bucket(self, backend_uri):
@@ -62,85 +203,124 @@ class Frontend:
             resource_name="assets/config.json",
             bucket=self.s3_bucket,
             content=config_content,
+            opts=self.child_opts(),
         )
 
     def create_s3_frontend_policy(self):
-        frontend_public_get_object_policy = aws.iam.get_policy_document(
+        if self.distribution is not None:
+            return policy_document(
+                statements=[
+                    Statement(
+                        sid="CloudFrontReadGetObject",
+                        actions=("s3:GetObject",),
+                        effect="Allow",
+                        principals=(Principal(type="Service", identifiers=("cloudfront.amazonaws.com",)),),
+                        resources=(f"arn:aws:s3:::{self.frontend_config.bucket_name}/*",),
+                        conditions=(
+                            Condition(
+                                test="StringEquals",
+                                variable="AWS:SourceArn",
+                                values=(self.distribution.arn,),
+                            ),
+                        ),
+                    ),
+                    self.deny_publish_keys(Principal(type="Service", identifiers=("cloudfront.amazonaws.com",))),
+                ]
+            )
+        frontend_public_get_object_policy = policy_document(
             statements=[
-                aws.iam.GetPolicyDocumentStatementArgs(
+                Statement(
                     sid="PublicReadGetObject",
-                    actions=[
-                        "s3:GetObject",
-                    ],
+                    actions=("s3:GetObject",),
                     effect="Allow",
-                    principals=[aws.iam.GetPolicyDocumentStatementPrincipalArgs(type="*", identifiers=["*"])],
-                    resources=[f"arn:aws:s3:::{self.frontend_config.require('bucket_name')}/*"],
-                )
+                    principals=(Principal(type="*", identifiers=("*",)),),
+                    resources=(f"arn:aws:s3:::{self.frontend_config.bucket_name}/*",),
+                ),
+                # Anonymous requests carry no principal ARN, the publisher's signed requests do
+                self.deny_publish_keys(
+                    Principal(type="*", identifiers=("*",)),
+                    conditions=(Condition(test="Null", variable="aws:PrincipalArn", values=("true",)),),
+                ),
             ]
-        ).json
+        )
         return frontend_public_get_object_policy
 
-    def authorize_github_to_deploy(self, github_open_id_provider):
+    # deny_publish_keys keeps the readers of the site from the keys the publisher writes for itself.
+    def deny_publish_keys(self, principal, conditions=()):
+        return Statement(
+            sid="DenyReadPublishKeys",
+            actions=("s3:GetObject",),
+            effect="Deny",
+            principals=(principal,),
+            resources=tuple(f"arn:aws:s3:::{self.frontend_config.bucket_name}/{key}" for key in PUBLISH_KEYS),
+            conditions=conditions,
+        )
+
+    def authorize_github_to_deploy(self, github_open_id_provider_arn):
         # Policy config allowing to Deploy to S3 Frontend Bucket (Put Object)
-        deploy_policy_json = aws.iam.get_policy_document(
+        deploy_policy_json = policy_document(
             statements=[
-                aws.iam.GetPolicyDocumentStatementArgs(
+                Statement(
                     sid="GithubActionsPutToFrontendBucket",
-                    actions=[
+                    actions=(
                         "s3:PutObject",
+                        "s3:GetObject",
                         "s3:ListBucket",
-                    ],
+                    ),
                     effect="Allow",
-                    resources=[
-                        f"arn:aws:s3:::{self.frontend_config.require('bucket_name')}",
-                        f"arn:aws:s3:::{self.frontend_config.require('bucket_name')}/*",
-                    ],
+                    resources=(
+                        f"arn:aws:s3:::{self.frontend_config.bucket_name}",
+                        f"arn:aws:s3:::{self.frontend_config.bucket_name}/*",
+                    ),
                 )
             ],
             policy_id="AmazonS3PutFrontendBucket",
-        ).json
+        )
 
         deploy_policy_resource = aws.iam.Policy(
             "AmazonS3PutFrontendBucket",
             description="Allows to put files into 163636840347-weather-alerting-frontend S3 Bucket."
             " Policy made for github actions - deploy job",
             policy=deploy_policy_json,
+            opts=self.child_opts(),
         )
 
         # Trusted entity policy config (answering who can assume a role)
-        assume_role_policy = aws.iam.get_policy_document(
+        assume_role_policy = policy_document(
             statements=[
-                aws.iam.GetPolicyDocumentStatementArgs(
+                Statement(
                     sid="GithubActionsPutToFrontendBucket",
-                    actions=[
-                        "sts:AssumeRoleWithWebIdentity",
-                    ],
+                    actions=("sts:AssumeRoleWithWebIdentity",),
                     effect="Allow",
-                    principals=[
-                        aws.iam.GetPolicyDocumentStatementPrincipalArgs(
+                    principals=(
+                        Principal(
                             type="Federated",
-                            identifiers=[github_open_id_provider.arn],
-                        )
-                    ],
-                    conditions=[
-                        aws.iam.GetPolicyDocumentStatementConditionArgs(
+                            identifiers=(github_open_id_provider_arn,),
+                        ),
+                    ),
+                    conditions=(
+                        Condition(
                             test="StringLike",
                             variable="token.actions.githubusercontent.com:sub",
-                            values=[f"repo:{self.frontend_config.require('repository')}:*"],
-                        )
-                    ],
+                            values=(f"repo:{self.frontend_config.repository}:*",),
+                        ),
+                    ),
                 )
             ],
             policy_id="AmazonS3PutFrontendBucket",
-        ).json
+        )
 
         frontend_deployer_role = aws.iam.Role(
             "GithubActionsFrontendBucketDeployer",
             name="GithubActionsFrontendBucketDeployer",
             assume_role_policy=assume_role_policy,
+            opts=self.child_opts(),
         )
 
         # Attach the created policy to the role
         aws.iam.RolePolicyAttachment(
-            "S3PutObjectPolicyAttachment", role=frontend_deployer_role.name, policy_arn=deploy_policy_resource.arn
+            "S3PutObjectPolicyAttachment",
+            role=frontend_deployer_role.name,
+            policy_arn=deploy_policy_resource.arn,
+            opts=self.child_opts(),
         )
@@ -0,0 +1,103 @@
+"""Lambda handler draining the email queue into SES.
+
+Every SQS message body is one email: {"to": [...], "subject": "...", "html": "...", "text": "..."}.
+Sending is paced to SES_MAX_SEND_RATE emails per second for this worker. Each message is handled on its own, so
+a failing one never makes SQS redeliver the emails of its batch that were already sent. Messages SES throttles
+or rejects temporarily, and messages failing with any other error, are reported back to SQS as batch item
+failures and retried; after the queue's maxReceiveCount they move to the dead-letter queue. Malformed messages
+would fail on every retry, so they are moved to the dead-letter queue right away. Permanently rejected emails
+are logged and dropped.
+"""
+
+import json
+import logging
+import os
+import time
+
+import boto3
+from botocore.exceptions import ClientError
+
+RETRYABLE_ERRORS = {"TooManyRequestsException", "LimitExceededException", "SendingPausedException"}
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+ses = boto3.client("sesv2")
+sqs = boto3.client("sqs")
+
+
+class MalformedEmailError(Exception):
+    pass
+
+
+def handler(event, context):
+    send_emails = os.environ["SEND_EMAILS"] == "true"
+    min_interval = 1 / float(os.environ["SES_MAX_SEND_RATE"])
+    failures = []
+    last_sent_at = 0.0
+    for record in event["Records"]:
+        try:
+            email = parse(record["body"])
+            if not send_emails:
+                logger.info("SEND_EMAILS is false, dropping email to %s: %s", email["to"], email["subject"])
+                continue
+            wait = last_sent_at + min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            last_sent_at = time.monotonic()
+            send(email)
+        except MalformedEmailError as error:
+            logger.error("Message %s is malformed, moving it to the dead-letter queue: %s", record["messageId"], error)
+            if not move_to_dead_letter_queue(record):
+                failures.append({"itemIdentifier": record["messageId"]})
+        except ClientError as error:
+            if error.response["Error"]["Code"] in RETRYABLE_ERRORS:
+                logger.warning("SES did not send email to %s, retrying: %s", email["to"], error)
+                failures.append({"itemIdentifier": record["messageId"]})
+            else:
+                # Permanent rejections, e.g. an invalid address, would fail again on every retry
+                logger.error("SES rejected email to %s: %s", email["to"], error)
+        except Exception:
+            logger.exception("Sending message %s failed, retrying", record["messageId"])
+            failures.append({"itemIdentifier": record["messageId"]})
+    return {"batchItemFailures": failures}
+
+
+# parse reads the email of a message body, which must name its recipients and subject.
+def parse(body):
+    try:
+        email = json.loads(body)
+    except json.JSONDecodeError as error:
+        raise MalformedEmailError(f"body is not JSON: {error}")
+    if not isinstance(email, dict):
+        raise MalformedEmailError("body is not a JSON object")
+    if not isinstance(email.get("to"), list) or not email["to"]:
+        raise MalformedEmailError("to must be a non-empty list of addresses")
+    if not isinstance(email.get("subject"), str):
+        raise MalformedEmailError("subject must be a string")
+    return email
+
+
+def send(email):
+    body = {}
+    if email.get("html"):
+        body["Html"] = {"Data": email["html"], "Charset": "UTF-8"}
+    if email.get("text"):
+        body["Text"] = {"Data": email["text"], "Charset": "UTF-8"}
+    ses.send_email(
+        FromEmailAddress=os.environ["EMAIL_FROM_ADDRESS"],
+        Destination={"ToAddresses": email["to"]},
+        Content={"Simple": {"Subject": {"Data": email["subject"], "Charset": "UTF-8"}, "Body": body}},
+        ConfigurationSetName=os.environ["SES_CONFIGURATION_SET"],
+    )
+
+
+# move_to_dead_letter_queue copies a message to the dead-letter queue. It is then not reported as a failure, so
+# SQS deletes it from the email queue; a message that could not be copied is left to the queue's redrive policy.
+def move_to_dead_letter_queue(record):
+    try:
+        sqs.send_message(QueueUrl=os.environ["DEAD_LETTER_QUEUE_URL"], MessageBody=record["body"])
+    except ClientError:
+        logger.exception("Moving message %s to the dead-letter queue failed", record["messageId"])
+        return False
+    return True
@@ -0,0 +1,79 @@
+"""Lambda handler swapping the App Runner service between its warm and base auto scaling configurations.
+
+EventBridge Scheduler invokes it with {"configuration": "warm"} at the start of each warm window and
+{"configuration": "base"} at its end. The stack invokes it with {"configuration": "current"} whenever it replaces
+one of the configurations, which moves the service to the latest revision of the one it uses. The service accepts
+no update while an operation such as a deployment is in progress, so the handler waits for it to finish; if it
+does not finish in time the invocation fails and is retried. A service already on the requested configuration is
+left alone. The stack keeps replaced revisions, as the service may still use them, and the handler deletes those no
+service uses anymore.
+"""
+
+import os
+import time
+
+import boto3
+
+# Seconds kept for the update call once the service is running, and between two status checks.
+UPDATE_MARGIN_SECONDS = 10
+POLL_INTERVAL_SECONDS = 10
+
+apprunner = boto3.client("apprunner")
+
+
+def handler(event, context):
+    configuration_arns = {
+        "warm": os.environ["WARM_CONFIGURATION_ARN"],
+        "base": os.environ["BASE_CONFIGURATION_ARN"],
+    }
+    service_arn = os.environ["SERVICE_ARN"]
+    service = wait_until_running(service_arn, context)
+    current_arn = service["AutoScalingConfigurationSummary"]["AutoScalingConfigurationArn"]
+    configuration = event["configuration"]
+    if configuration == "current":
+        warm_name = configuration_name(configuration_arns["warm"])
+        configuration = "warm" if configuration_name(current_arn) == warm_name else "base"
+    configuration_arn = configuration_arns[configuration]
+
+    updated = current_arn != configuration_arn
+    if updated:
+        apprunner.update_service(ServiceArn=service_arn, AutoScalingConfigurationArn=configuration_arn)
+        print(f"{service_arn} switched to the {configuration} configuration {configuration_arn}")
+    else:
+        print(f"{service_arn} already uses the {configuration} configuration")
+    delete_unused_revisions(configuration_arns.values())
+    return {"updated": updated}
+
+
+def wait_until_running(service_arn, context):
+    while True:
+        service = apprunner.describe_service(ServiceArn=service_arn)["Service"]
+        if service["Status"] == "RUNNING":
+            return service
+        remaining_seconds = context.get_remaining_time_in_millis() / 1000
+        if remaining_seconds < POLL_INTERVAL_SECONDS + UPDATE_MARGIN_SECONDS:
+            raise RuntimeError(f"{service_arn} is {service['Status']}, the swap is retried")
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+
+# configuration_name is the name in an ARN like
+# arn:aws:apprunner:eu-central-1:123456789012:autoscalingconfiguration/AppRunnerAutoScalingConfig/2/0123abcd.
+def configuration_name(configuration_arn):
+    return configuration_arn.split("/")[1]
+
+
+# delete_unused_revisions deletes the revisions of the stack's configurations that the stack replaced and no
+# service uses. A revision the service is still moving away from is deleted by a later invocation.
+def delete_unused_revisions(latest_arns):
+    latest_arns = set(latest_arns)
+    for name in sorted({configuration_name(arn) for arn in latest_arns}):
+        summaries = apprunner.list_auto_scaling_configurations(AutoScalingConfigurationName=name, LatestOnly=False)
+        for summary in summaries["AutoScalingConfigurationSummaryList"]:
+            revision_arn = summary["AutoScalingConfigurationArn"]
+            if revision_arn in latest_arns or summary.get("HasAssociatedService", True):
+                continue
+            try:
+                apprunner.delete_auto_scaling_configuration(AutoScalingConfigurationArn=revision_arn)
+                print(f"Deleted the replaced configuration {revision_arn}")
+            except apprunner.exceptions.InvalidRequestException as error:
+                print(f"Kept the replaced configuration {revision_arn}: {error}")
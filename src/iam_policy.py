@@ -0,0 +1,133 @@
+"""An AWS Python Pulumi program - Local IAM policy documents
+
+Renders the same JSON as the `aws.iam.get_policy_document` invoke without a round-trip to the provider plugin.
+"""
+
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+
+import pulumi
+
+POLICY_VERSION = "2012-10-17"
+
+
+@dataclass(frozen=True)
+class Principal:
+    type: str
+    identifiers: tuple
+
+
+@dataclass(frozen=True)
+class Condition:
+    test: str
+    variable: str
+    values: tuple
+
+
+@dataclass(frozen=True)
+class Statement:
+    actions: tuple = ()
+    effect: str = "Allow"
+    sid: str = None
+    resources: tuple = ()
+    principals: tuple = ()
+    conditions: tuple = ()
+
+
+# policy_document returns the policy JSON, or an Output of it when any statement value is an Output.
+def policy_document(statements, policy_id=None):
+    document = (tuple(statements), policy_id)
+    if not _contains_output(document):
+        return render_policy_document(*document)
+    resolved_document = pulumi.Output.from_input(_to_input(document))
+    return resolved_document.apply(lambda resolved: render_policy_document(*_freeze(resolved)))
+
+
+# render_policy_document memoizes rendering, so identical documents are serialized only once per run.
+@lru_cache(maxsize=None)
+def render_policy_document(statements, policy_id=None):
+    document = {"Version": POLICY_VERSION}
+    if policy_id:
+        document["Id"] = policy_id
+    document["Statement"] = [_statement_json(statement) for statement in statements]
+    # Match Go's json.MarshalIndent, which escapes HTML characters.
+    rendered = json.dumps(document, indent=2, ensure_ascii=False)
+    return rendered.replace("<", "\\u003c").replace(">", "\\u003e").replace("&", "\\u0026")
+
+
+def _statement_json(statement):
+    rendered = {}
+    if statement.sid:
+        rendered["Sid"] = statement.sid
+    rendered["Effect"] = statement.effect
+    if statement.actions:
+        rendered["Action"] = _string_list(statement.actions)
+    if statement.resources:
+        rendered["Resource"] = _string_list(statement.resources)
+    if statement.principals:
+        rendered["Principal"] = _principals_json(statement.principals)
+    if statement.conditions:
+        rendered["Condition"] = _conditions_json(statement.conditions)
+    return rendered
+
+
+# The provider renders single values as strings and sets as reverse-sorted lists.
+def _string_list(values):
+    if len(values) == 1:
+        return values[0]
+    return sorted(set(values), reverse=True)
+
+
+def _principals_json(principals):
+    if len(principals) == 1 and principals[0].type == "*":
+        return "*"
+    rendered = {}
+    for principal in principals:
+        rendered.setdefault(principal.type, []).extend(_as_list(_string_list(principal.identifiers)))
+    return {key: rendered[key][0] if len(rendered[key]) == 1 else rendered[key] for key in sorted(rendered)}
+
+
+def _conditions_json(conditions):
+    rendered = {}
+    for condition in conditions:
+        variables = rendered.setdefault(condition.test, {})
+        variables.setdefault(condition.variable, []).extend(_as_list(_string_list(condition.values)))
+    return {
+        test: {
+            variable: values[0] if len(values) == 1 else values for variable, values in sorted(rendered[test].items())
+        }
+        for test in sorted(rendered)
+    }
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def _contains_output(value):
+    if isinstance(value, pulumi.Output):
+        return True
+    if isinstance(value, (Statement, Principal, Condition)):
+        return any(_contains_output(item) for item in vars(value).values())
+    if isinstance(value, (tuple, list)):
+        return any(_contains_output(item) for item in value)
+    return False
+
+
+# _to_input converts the document into nested lists and dicts that pulumi.Output.from_input can resolve.
+def _to_input(value):
+    if isinstance(value, (Statement, Principal, Condition)):
+        return {"__kind": type(value).__name__, **{key: _to_input(item) for key, item in vars(value).items()}}
+    if isinstance(value, (tuple, list)):
+        return [_to_input(item) for item in value]
+    return value
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        kind = {cls.__name__: cls for cls in (Statement, Principal, Condition)}[value["__kind"]]
+        return kind(**{key: _freeze(item) for key, item in value.items() if key != "__kind"})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
@@ -0,0 +1,89 @@
+"""An AWS Python Pulumi program - Waiting for IAM role propagation"""
+
+import asyncio
+from datetime import datetime, timezone
+
+import pulumi
+
+# Time a new role needs before a service principal can assume it. Reading the role back only shows that one IAM
+# replica serves it, while App Runner assumes it through STS, which catches up later (pulumi-aws#1697), and the
+# trust of a service principal can not be tested by the deploying principal.
+ROLE_SETTLE_SECONDS = 10
+
+
+class RolePropagationTimeoutError(Exception):
+    pass
+
+
+# wait_for_role_propagation resolves to role_arn once the role can be assumed for actions: IAM serves the role,
+# it is at least ROLE_SETTLE_SECONDS old and iam:SimulatePrincipalPolicy allows it every action, so the policies
+# attached to it are in effect. Checks are retried with exponential backoff until the deadline, and roles
+# created long ago resolve after a single check. The IAM client uses the credentials of the AWS provider of
+# region, unless iam_client is passed, e.g. one built with endpoint_url to poll a local stand-in.
+async def wait_for_role_propagation(
+    role_arn,
+    actions=(),
+    region=None,
+    iam_client=None,
+    deadline_seconds=60,
+    settle_seconds=ROLE_SETTLE_SECONDS,
+    initial_delay_seconds=0.5,
+    max_delay_seconds=8,
+):
+    if pulumi.runtime.is_dry_run():
+        return role_arn
+
+    iam_client = iam_client or provider_iam_client(region)
+    role_name = role_arn.split("/")[-1]
+    loop = asyncio.get_running_loop()
+    give_up_at = loop.time() + deadline_seconds
+    delay = initial_delay_seconds
+
+    while True:
+        role = await asyncio.to_thread(_get_role, iam_client, role_name)
+        if role is not None:
+            wait_seconds = settle_seconds - _role_age_seconds(role)
+            if wait_seconds > 0 and loop.time() + wait_seconds <= give_up_at:
+                pulumi.log.debug(f"Waiting {wait_seconds:.1f}s for new IAM role {role_name} to settle")
+                await asyncio.sleep(wait_seconds)
+                wait_seconds = 0
+            if wait_seconds <= 0:
+                denied_actions = await asyncio.to_thread(_denied_actions, iam_client, role_arn, actions)
+                if not denied_actions:
+                    return role_arn
+                pulumi.log.debug(f"IAM role {role_name} is not yet allowed {', '.join(denied_actions)}")
+
+        if loop.time() + delay > give_up_at:
+            raise RolePropagationTimeoutError(f"IAM role {role_arn} did not propagate within {deadline_seconds}s")
+        pulumi.log.debug(f"Waiting {delay}s for IAM role {role_name} to propagate")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, max_delay_seconds)
+
+
+# provider_iam_client reads the credentials the AWS provider of region uses: the aws:profile of the stack config,
+# which the secondary region providers are given as well, and the region of the provider.
+def provider_iam_client(region=None):
+    # boto3 is only needed during updates, so previews do not pay for importing it
+    import boto3
+
+    aws_config = pulumi.Config("aws")
+    session = boto3.Session(profile_name=aws_config.get("profile"), region_name=region or aws_config.get("region"))
+    return session.client("iam")
+
+
+def _get_role(iam_client, role_name):
+    try:
+        return iam_client.get_role(RoleName=role_name)["Role"]
+    except iam_client.exceptions.NoSuchEntityException:
+        return None
+
+
+def _denied_actions(iam_client, role_arn, actions):
+    if not actions:
+        return []
+    results = iam_client.simulate_principal_policy(PolicySourceArn=role_arn, ActionNames=list(actions))
+    return [result["EvalActionName"] for result in results["EvaluationResults"] if result["EvalDecision"] != "allowed"]
+
+
+def _role_age_seconds(role):
+    return (datetime.now(timezone.utc) - role["CreateDate"]).total_seconds()
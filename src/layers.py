@@ -0,0 +1,79 @@
+"""An AWS Python Pulumi program - Outputs shared between the stacks of a stack split into layers"""
+
+from types import SimpleNamespace
+
+import pulumi
+
+from stack_config import LAYERS
+
+# Outputs of each component that the stacks of higher layers read, published as one stack output per component.
+PUBLISHED_OUTPUTS = {
+    "networking": (
+        "vpc_id",
+        "private_subnet_ids",
+        "public_subnet_ids",
+        "default_security_group_id",
+        "nat_gateway_ids",
+    ),
+    "database": (
+        "database_uri",
+        "database_username",
+        "database_password",
+        "database_reader_uri",
+        "database_connection_string",
+        "cluster_identifier",
+    ),
+    "cache": ("cache_url",),
+    "backend": ("service_dimensions",),
+    "github": ("open_id_provider_arn",),
+}
+# Layers publishing the outputs of resources outside the components.
+SHARED_OUTPUT_LAYERS = {"github": "network"}
+
+
+def layer_of(component_name):
+    if component_name in SHARED_OUTPUT_LAYERS:
+        return SHARED_OUTPUT_LAYERS[component_name]
+    return next(layer for layer, components in LAYERS.items() if component_name in components)
+
+
+# publish exports the outputs of component_name that higher layers read, from the attributes of source or
+# from the outputs passed by name.
+def publish(component_name, source=None, **outputs):
+    for name in set(PUBLISHED_OUTPUTS[component_name]) - set(outputs):
+        outputs[name] = getattr(source, name)
+    pulumi.export(f"{component_name}_outputs", outputs)
+
+
+class LayerStacks:
+    # LayerStacks reads the outputs of the stacks of the other layers. A layer's stack is
+    # WeatherAlerting:layer_stacks[layer], by default this stack's name with the layer as suffix, e.g.
+    # dev-network, dev-data, dev-app and dev-frontend for the dev stack.
+    def __init__(self, common_config):
+        self.common_config = common_config
+        self.references = {}
+
+    def stack_name(self, layer):
+        if layer in self.common_config.layer_stacks:
+            return self.common_config.layer_stacks[layer]
+        stack = pulumi.get_stack().removesuffix(f"-{self.common_config.layer}")
+        return f"{pulumi.get_organization()}/{pulumi.get_project()}/{stack}-{layer}"
+
+    # reference registers one StackReference per layer, however many outputs are read from it.
+    def reference(self, layer):
+        if layer not in self.references:
+            self.references[layer] = pulumi.StackReference(self.stack_name(layer))
+        return self.references[layer]
+
+    def output(self, layer, name):
+        return self.reference(layer).get_output(name)
+
+    # outputs reads the outputs published for component_name, with one attribute per output like the component.
+    def outputs(self, component_name):
+        published = self.reference(layer_of(component_name)).require_output(f"{component_name}_outputs")
+        return SimpleNamespace(
+            **{
+                name: published.apply(lambda outputs, name=name: outputs[name])
+                for name in PUBLISHED_OUTPUTS[component_name]
+            }
+        )
@@ -0,0 +1,236 @@
+"""An AWS Python Pulumi program - CloudWatch dashboard and alarms for the whole stack"""
+
+import json
+
+import pulumi
+import pulumi_aws as aws
+
+from component import Component
+
+DASHBOARD_NAME = "WeatherAlerting"
+# Latency metric units per millisecond, to compare monitoring:app_runner_p99_latency_ms with the metric.
+LATENCY_UNITS_PER_MS = {"ms": 1, "s": 0.001}
+
+
+class Monitoring(Component):
+    def __init__(
+        self,
+        name,
+        config,
+        service_metrics,
+        max_instances,
+        cluster_identifier,
+        nat_gateway_ids,
+        distribution_id=None,
+        opts=None,
+    ):
+        super().__init__(name, opts)
+        self.monitoring_config = config.monitoring
+        self.documentdb_connections = config.monitoring.documentdb_connections_threshold(config.database.instance_class)
+        self.region = config.networking.region
+        self.alarm_topic = None
+        self.dashboard = None
+
+        self.create_monitoring(service_metrics, max_instances, cluster_identifier, nat_gateway_ids, distribution_id)
+        self.register_outputs(
+            {"dashboard_name": self.dashboard.dashboard_name, "alarm_topic_arn": self.alarm_topic.arn}
+        )
+
+    # create_monitoring builds the dashboard and the threshold alarms from the outputs of the other components.
+    # service_metrics are the backend's metrics on the compute platform it runs on, App Runner or ECS Fargate.
+    def create_monitoring(
+        self, service_metrics, max_instances, cluster_identifier, nat_gateway_ids, distribution_id=None
+    ):
+        self.alarm_topic = self.create_alarm_topic()
+        cluster_dimensions = {"DBClusterIdentifier": cluster_identifier}
+        prefix = service_metrics.alarm_prefix
+
+        self.create_alarm(
+            f"{prefix}P99Latency",
+            **service_metrics.latency.metric_args(),
+            extended_statistic="p99",
+            comparison_operator="GreaterThanThreshold",
+            threshold=self.monitoring_config.app_runner_p99_latency_ms
+            * LATENCY_UNITS_PER_MS[service_metrics.latency_unit],
+        )
+        self.create_alarm(
+            f"{prefix}5xxResponses",
+            **service_metrics.errors.metric_args(),
+            statistic="Sum",
+            comparison_operator="GreaterThanThreshold",
+            threshold=self.monitoring_config.app_runner_5xx_responses,
+        )
+        # Running at the instance limit means the backend can no longer absorb more load. A single instance
+        # always runs at its limit, so the alarm is only created when the backend can scale out.
+        if max_instances > 1:
+            self.create_alarm(
+                f"{prefix}InstancesAtLimit",
+                **service_metrics.instances.metric_args(),
+                statistic="Maximum",
+                comparison_operator="GreaterThanThreshold",
+                threshold=max_instances - 1,
+            )
+        self.create_alarm(
+            "DocumentDBCPUUtilization",
+            namespace="AWS/DocDB",
+            metric_name="CPUUtilization",
+            dimensions=cluster_dimensions,
+            statistic="Average",
+            comparison_operator="GreaterThanThreshold",
+            threshold=self.monitoring_config.documentdb_cpu_percent,
+        )
+        if self.documentdb_connections is not None:
+            self.create_alarm(
+                "DocumentDBConnections",
+                namespace="AWS/DocDB",
+                metric_name="DatabaseConnections",
+                dimensions=cluster_dimensions,
+                statistic="Maximum",
+                comparison_operator="GreaterThanThreshold",
+                threshold=self.documentdb_connections,
+            )
+        self.create_alarm(
+            "DocumentDBBufferCacheHitRatio",
+            namespace="AWS/DocDB",
+            metric_name="BufferCacheHitRatio",
+            dimensions=cluster_dimensions,
+            statistic="Average",
+            comparison_operator="LessThanThreshold",
+            threshold=self.monitoring_config.documentdb_buffer_cache_hit_ratio,
+        )
+        for index, nat_gateway_id in enumerate(nat_gateway_ids):
+            self.create_alarm(
+                f"NatGatewayPortAllocationErrors-{index}",
+                namespace="AWS/NATGateway",
+                metric_name="ErrorPortAllocation",
+                dimensions={"NatGatewayId": nat_gateway_id},
+                statistic="Sum",
+                comparison_operator="GreaterThanThreshold",
+                threshold=self.monitoring_config.nat_port_allocation_errors,
+            )
+
+        self.dashboard = self.create_dashboard(service_metrics, cluster_identifier, nat_gateway_ids, distribution_id)
+        return self.dashboard
+
+    def create_alarm_topic(self):
+        topic = aws.sns.Topic("weather-alerting-alarms", opts=self.child_opts())
+        if self.monitoring_config.alarm_email:
+            aws.sns.TopicSubscription(
+                "weather-alerting-alarms-email",
+                topic=topic.arn,
+                protocol="email",
+                endpoint=self.monitoring_config.alarm_email,
+                opts=self.child_opts(),
+            )
+        return topic
+
+    def create_alarm(self, name, threshold, **metric):
+        return aws.cloudwatch.MetricAlarm(
+            name,
+            name=name,
+            period=self.monitoring_config.period_seconds,
+            evaluation_periods=self.monitoring_config.evaluation_periods,
+            threshold=threshold,
+            treat_missing_data="notBreaching",
+            alarm_actions=[self.alarm_topic.arn],
+            ok_actions=[self.alarm_topic.arn],
+            opts=self.child_opts(),
+            **metric,
+        )
+
+    def create_dashboard(self, service_metrics, cluster_identifier, nat_gateway_ids, distribution_id):
+        dashboard_body = pulumi.Output.all(
+            pulumi.Output.from_input(service_metrics.dimensions()),
+            cluster_identifier,
+            distribution_id,
+            *nat_gateway_ids,
+        ).apply(lambda args: json.dumps({"widgets": self.dashboard_widgets(service_metrics, *args)}))
+        return aws.cloudwatch.Dashboard(
+            "WeatherAlertingDashboard",
+            dashboard_name=DASHBOARD_NAME,
+            dashboard_body=dashboard_body,
+            opts=self.child_opts(),
+        )
+
+    # dashboard_widgets receives the resolved dimensions of every service metric, by the metric's role.
+    def dashboard_widgets(
+        self, service_metrics, service_dimensions, cluster_identifier, distribution_id, *nat_gateway_ids
+    ):
+        service = {
+            role: [source.namespace, source.metric_name, *_flatten(service_dimensions[role])]
+            for role, source in service_metrics.sources().items()
+        }
+        cluster = ["AWS/DocDB", "DBClusterIdentifier", cluster_identifier]
+        label = service_metrics.label
+        widgets = [
+            self.metric_widget(
+                f"{label} request latency ({service_metrics.latency_unit})",
+                [_source_metric(service["latency"], stat="p50"), _source_metric(service["latency"], stat="p99")],
+            ),
+            self.metric_widget(f"{label} active instances", [_source_metric(service["instances"], stat="Maximum")]),
+            self.metric_widget(
+                f"{label} requests and 5xx responses",
+                [_source_metric(service["requests"], stat="Sum"), _source_metric(service["errors"], stat="Sum")],
+            ),
+            self.metric_widget("DocumentDB CPU (%)", [_metric(cluster, "CPUUtilization", stat="Average")]),
+            self.metric_widget("DocumentDB connections", [_metric(cluster, "DatabaseConnections", stat="Maximum")]),
+            self.metric_widget(
+                "DocumentDB buffer cache hit ratio (%)", [_metric(cluster, "BufferCacheHitRatio", stat="Average")]
+            ),
+            self.metric_widget(
+                "NAT gateway bytes",
+                [
+                    _metric(["AWS/NATGateway", "NatGatewayId", nat_gateway_id], metric_name, stat="Sum")
+                    for nat_gateway_id in nat_gateway_ids
+                    for metric_name in ("BytesOutToDestination", "BytesInFromDestination")
+                ],
+            ),
+            self.metric_widget(
+                "NAT gateway port allocation errors",
+                [
+                    _metric(["AWS/NATGateway", "NatGatewayId", nat_gateway_id], "ErrorPortAllocation", stat="Sum")
+                    for nat_gateway_id in nat_gateway_ids
+                ],
+            ),
+        ]
+        if distribution_id is not None:
+            # CloudFront publishes its metrics in us-east-1 only
+            distribution = ["AWS/CloudFront", "DistributionId", distribution_id, "Region", "Global"]
+            widgets.append(
+                self.metric_widget(
+                    "Frontend CloudFront error rates (%)",
+                    [
+                        _metric(distribution, "4xxErrorRate", stat="Average"),
+                        _metric(distribution, "5xxErrorRate", stat="Average"),
+                    ],
+                    region="us-east-1",
+                )
+            )
+        return widgets
+
+    def metric_widget(self, title, metrics, region=None):
+        return {
+            "type": "metric",
+            "width": 8,
+            "height": 6,
+            "properties": {
+                "title": title,
+                "metrics": metrics,
+                "period": self.monitoring_config.period_seconds,
+                "region": region or self.region,
+                "view": "timeSeries",
+            },
+        }
+
+
+def _metric(namespace_and_dimensions, metric_name, stat):
+    namespace, *dimensions = namespace_and_dimensions
+    return [namespace, metric_name, *dimensions, {"stat": stat}]
+
+
+def _source_metric(namespace_metric_and_dimensions, stat):
+    return [*namespace_metric_and_dimensions, {"stat": stat}]
+
+
+def _flatten(dimensions):
+    return [item for name, value in dimensions.items() for item in (name, value)]
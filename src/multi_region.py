@@ -0,0 +1,204 @@
+"""An AWS Python Pulumi program - Secondary regions with a DocumentDB global cluster and latency-based routing"""
+
+import pulumi
+import pulumi_aws as aws
+
+from backend import Backend
+from component import Component
+from database import Database
+from networking import Networking
+
+GLOBAL_CLUSTER_IDENTIFIER = "weather-alerting-global"
+API_RECORD_TTL_SECONDS = 60
+HTTPS_PORT = 443
+VALIDATION_RECORD_TTL_SECONDS = 300
+# Statuses of a custom domain association App Runner did not accept.
+FAILED_DOMAIN_STATUSES = {"create_failed", "delete_failed"}
+
+
+class MultiRegion(Component):
+    api_domain: str
+    service_urls: dict
+    instance_role_names: dict
+    certificate_validation_records: pulumi.Output
+
+    # MultiRegion copies networking, the database and the backend of the primary region into every region of
+    # multi_region:secondary_regions, and routes multi_region:api_domain to the App Runner service closest to
+    # the caller. The primary region's components are passed in and keep serving from there.
+    def __init__(self, name, config, networking, database, backend, extra_environment, opts=None):
+        super().__init__(name, opts)
+        self.multi_region_config = config.multi_region
+        self.backend_config = config.backend
+        self.providers = {self.multi_region_config.primary_region: None}
+        self.backends = {self.multi_region_config.primary_region: backend}
+
+        self.create_image_replication()
+        global_cluster = self.create_global_cluster(database)
+        for region in self.multi_region_config.secondary_regions:
+            # Explicit providers do not read the aws: stack config, so the profile and default tags are passed on
+            self.providers[region] = aws.Provider(
+                f"aws-{region}",
+                region=region,
+                profile=pulumi.Config("aws").get("profile"),
+                default_tags=pulumi.Config("aws").get_object("defaultTags"),
+                opts=self.child_opts(),
+            )
+            regional_opts = pulumi.ResourceOptions(parent=self, providers=[self.providers[region]])
+            regional_networking = Networking(f"networking-{region}", config, region=region, opts=regional_opts)
+            regional_networking.accept_peering(networking.request_peering(regional_networking))
+            regional_database = Database(
+                f"database-{region}",
+                config,
+                regional_networking.private_subnet_ids,
+                region=region,
+                global_cluster_identifier=global_cluster.id,
+                opts=regional_opts,
+            )
+            self.backends[region] = Backend(
+                f"backend-{region}",
+                config,
+                regional_networking.private_subnet_ids,
+                regional_networking.default_security_group_id,
+                github_open_id_provider_arn=None,
+                # Secondary clusters are read-only: writes go to the primary cluster over VPC peering, and reads
+                # that tolerate replication lag use the cluster in the region
+                database_uri=database.database_uri,
+                database_username=database.database_username,
+                database_password=database.database_password,
+                database_reader_uri=regional_database.database_reader_uri,
+                database_connection_string=database.database_connection_string,
+                extra_environment=extra_environment,
+                region=region,
+                opts=regional_opts,
+            )
+        self.certificate_validation_records = self.create_latency_routing()
+        self.create_validation_records()
+
+        self.api_domain = self.multi_region_config.api_domain
+        self.service_urls = {region: backend.app_runner_uri for region, backend in self.backends.items()}
+        self.instance_role_names = {
+            region: backend.instance_role_name
+            for region, backend in self.backends.items()
+            if region != self.multi_region_config.primary_region
+        }
+        self.register_outputs({"api_domain": self.api_domain, "service_urls": self.service_urls})
+
+    # create_image_replication copies the backend images pushed to ECR into the secondary regions, where
+    # App Runner pulls them from. Only pushes made after the rule exists are replicated.
+    def create_image_replication(self):
+        registry_id = self.backend_config.ecr_uri.split(".")[0]
+        repository_name = self.backend_config.ecr_uri.split("/", 1)[1]
+        return aws.ecr.ReplicationConfiguration(
+            "BackendImageReplication",
+            replication_configuration=aws.ecr.ReplicationConfigurationReplicationConfigurationArgs(
+                rules=[
+                    aws.ecr.ReplicationConfigurationReplicationConfigurationRuleArgs(
+                        destinations=[
+                            aws.ecr.ReplicationConfigurationReplicationConfigurationRuleDestinationArgs(
+                                region=region,
+                                registry_id=registry_id,
+                            )
+                            for region in self.multi_region_config.secondary_regions
+                        ],
+                        repository_filters=[
+                            aws.ecr.ReplicationConfigurationReplicationConfigurationRuleRepositoryFilterArgs(
+                                filter=repository_name,
+                                filter_type="PREFIX_MATCH",
+                            )
+                        ],
+                    )
+                ]
+            ),
+            opts=self.child_opts(),
+        )
+
+    # create_global_cluster turns the existing primary cluster into the primary of a global cluster, which
+    # keeps its data and endpoints.
+    def create_global_cluster(self, database):
+        return aws.docdb.GlobalCluster(
+            "MongoDbGlobalCluster",
+            global_cluster_identifier=GLOBAL_CLUSTER_IDENTIFIER,
+            source_db_cluster_identifier=database.cluster_arn,
+            deletion_protection=False,
+            opts=self.child_opts(),
+        )
+
+    # create_latency_routing associates api_domain with the service of every region and returns the certificate
+    # validation records App Runner asks for, one per record name.
+    def create_latency_routing(self):
+        validation_records = []
+        domain_name = pulumi.Output.from_input(self.multi_region_config.api_domain)
+        for region, backend in self.backends.items():
+            custom_domain = aws.apprunner.CustomDomainAssociation(
+                f"ApiCustomDomain-{region}",
+                domain_name=domain_name,
+                service_arn=backend.service_arn,
+                enable_www_subdomain=False,
+                opts=self.child_opts(provider=self.providers[region]),
+            )
+            validation_records.append(custom_domain.certificate_validation_records)
+            # Every service serves the same domain, so each region is only associated once App Runner accepted
+            # it for the region before, and a region it rejects is named in the error
+            domain_name = custom_domain.status.apply(lambda status, region=region: self.accepted_domain(region, status))
+            health_check = aws.route53.HealthCheck(
+                f"ApiHealthCheck-{region}",
+                fqdn=backend.app_runner_uri,
+                port=HTTPS_PORT,
+                type="HTTPS",
+                resource_path=self.multi_region_config.health_check_path,
+                failure_threshold=3,
+                request_interval=30,
+                opts=self.child_opts(),
+            )
+            # An unhealthy region drops out of the latency routing until its health check passes again
+            aws.route53.Record(
+                f"ApiLatencyRecord-{region}",
+                zone_id=self.multi_region_config.hosted_zone_id,
+                name=self.multi_region_config.api_domain,
+                type="CNAME",
+                ttl=API_RECORD_TTL_SECONDS,
+                records=[custom_domain.dns_target],
+                set_identifier=region,
+                latency_routing_policies=[aws.route53.RecordLatencyRoutingPolicyArgs(region=region)],
+                health_check_id=health_check.id,
+                opts=self.child_opts(),
+            )
+
+        return pulumi.Output.all(*validation_records).apply(self.unique_validation_records)
+
+    def accepted_domain(self, region, status):
+        if status in FAILED_DOMAIN_STATUSES:
+            raise ValueError(
+                f"App Runner did not accept {self.multi_region_config.api_domain} on the service in {region}: {status}"
+            )
+        return self.multi_region_config.api_domain
+
+    # unique_validation_records merges the records of all regions: the certificates of one domain in one
+    # account share their validation record, which Route 53 only accepts once.
+    def unique_validation_records(self, regional_records):
+        records = {}
+        for record in (record for region_records in regional_records for record in region_records or []):
+            records[record["name"]] = {"name": record["name"], "type": record["type"], "value": record["value"]}
+        configured = {record.name for record in self.multi_region_config.certificate_validation_records}
+        missing = sorted(set(records) - configured)
+        if missing:
+            pulumi.log.warn(
+                f"Certificate validation records {missing} are not in multi_region:certificate_validation_records, "
+                "copy them from the stack output api_certificate_validation_records and run pulumi up again"
+            )
+        return list(records.values())
+
+    # create_validation_records creates the records of multi_region:certificate_validation_records. App Runner
+    # only returns them once the custom domains are associated, so they are copied into the config between a
+    # first and a second update instead of being created from the association's outputs.
+    def create_validation_records(self):
+        for record in self.multi_region_config.certificate_validation_records:
+            aws.route53.Record(
+                f"ApiCertificateValidation-{record.name.rstrip('.')}",
+                zone_id=self.multi_region_config.hosted_zone_id,
+                name=record.name,
+                type=record.type,
+                ttl=VALIDATION_RECORD_TTL_SECONDS,
+                records=[record.value],
+                opts=self.child_opts(),
+            )
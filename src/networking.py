@@ -1,36 +1,111 @@
-"""An AWS Python Pulumi program - VPC, NAT"""
+"""An AWS Python Pulumi program - VPC, NAT, VPC endpoints"""
 
 import pulumi
 import pulumi_aws as aws
 import pulumi_awsx as awsx
 
+from component import Component
+from database import DOCUMENTDB_PORT
+from stack_config import AVAILABILITY_ZONES_NUMBER
 
-class Networking:
-    def __init__(self):
-        self.common_config = pulumi.Config("WeatherAlerting")
+NAT_GATEWAY_STRATEGIES = {
+    "single": awsx.ec2.NatGatewayStrategy.SINGLE,
+    "one_per_az": awsx.ec2.NatGatewayStrategy.ONE_PER_AZ,
+}
+HTTPS_PORT = 443
+# awsx creates a public and a private subnet per availability zone, each with its own route table.
+ROUTE_TABLES_NUMBER = 2 * AVAILABILITY_ZONES_NUMBER
+
+
+# cidr_block is the VPC CIDR block of the region at region_index in multi_region.regions. The primary
+# region keeps awsx's default block; VPCs are peered, so the blocks must not overlap.
+def cidr_block(region_index):
+    return f"10.{region_index}.0.0/16"
+
+
+class Networking(Component):
+    vpc_id: pulumi.Output[str]
+    private_subnet_ids: pulumi.Output[list]
+    public_subnet_ids: pulumi.Output[list]
+    default_security_group_id: pulumi.Output[str]
+    nat_gateway_ids: list
+    vpc_endpoint_ids: dict
+    route_table_ids: pulumi.Output[list]
+
+    def __init__(self, name, config, region=None, opts=None):
+        super().__init__(name, opts, region)
+        self.common_config = config.common
+        self.networking_config = config.networking
+        self.region = region or self.networking_config.region
+        regions = config.multi_region.regions
+        self.cidr_block = cidr_block(regions.index(self.region))
+        # The primary VPC is peered with every secondary VPC, and a secondary VPC only with the primary one
+        self.is_primary = self.region == regions[0]
+        self.peer_cidr_blocks = (
+            [cidr_block(index) for index in range(1, len(regions))] if self.is_primary else [cidr_block(0)]
+        )
+        self.vpc_endpoints = {}
+
+        vpc = self.create_vpc()
+        self.route_table_ids = vpc.route_tables.apply(
+            lambda route_tables: pulumi.Output.all(*[route_table.id for route_table in route_tables])
+        )
+        vpc_default_sg = self.create_dafault_sg()
+        if self.networking_config.vpc_endpoints:
+            self.create_vpc_endpoints(vpc_default_sg)
+
+        self.vpc_id = vpc.vpc_id
+        self.private_subnet_ids = vpc.private_subnet_ids
+        self.public_subnet_ids = vpc.public_subnet_ids
+        self.default_security_group_id = vpc_default_sg.id
+        self.nat_gateway_ids = self.create_nat_gateway_ids()
+        self.vpc_endpoint_ids = {service: endpoint.id for service, endpoint in self.vpc_endpoints.items()}
+        self.register_outputs(
+            {
+                "vpc_id": self.vpc_id,
+                "private_subnet_ids": self.private_subnet_ids,
+                "public_subnet_ids": self.public_subnet_ids,
+                "default_security_group_id": self.default_security_group_id,
+                "vpc_endpoint_ids": self.vpc_endpoint_ids,
+            }
+        )
 
     def create_vpc(self):
         vpc = awsx.ec2.Vpc(
-            "weather-alerting",
+            self.resource_name("weather-alerting"),
+            cidr_block=self.cidr_block,
+            number_of_availability_zones=AVAILABILITY_ZONES_NUMBER,
             nat_gateways=awsx.ec2.NatGatewayConfigurationArgs(
-                strategy=awsx.ec2.NatGatewayStrategy.SINGLE,
+                strategy=NAT_GATEWAY_STRATEGIES[self.networking_config.nat_strategy],
             ),
+            opts=self.child_opts(),
         )
         self.vpc = vpc
         return vpc
 
     def create_dafault_sg(self):
-        default = aws.ec2.DefaultSecurityGroup(
-            "weather-alerting-vpc-default-sg",
-            vpc_id=self.vpc.vpc_id,
-            ingress=[
+        ingress = [
+            aws.ec2.DefaultSecurityGroupIngressArgs(
+                protocol="-1",
+                self=True,
+                from_port=0,
+                to_port=0,
+            )
+        ]
+        if self.is_primary and len(self.peer_cidr_blocks) > 0:
+            # Backends in secondary regions write to the primary DocumentDB cluster over VPC peering
+            ingress.append(
                 aws.ec2.DefaultSecurityGroupIngressArgs(
-                    protocol="-1",
-                    self=True,
-                    from_port=0,
-                    to_port=0,
+                    protocol="tcp",
+                    from_port=DOCUMENTDB_PORT,
+                    to_port=DOCUMENTDB_PORT,
+                    cidr_blocks=self.peer_cidr_blocks,
                 )
-            ],
+            )
+        default = aws.ec2.DefaultSecurityGroup(
+            self.resource_name("weather-alerting-vpc-default-sg"),
+            vpc_id=self.vpc.vpc_id,
+            ingress=ingress,
             egress=[
                 aws.ec2.DefaultSecurityGroupEgressArgs(
                     from_port=0,
@@ -39,5 +114,93 @@ class Networking:
                     cidr_blocks=["0.0.0.0/0"],
                 )
             ],
+            opts=self.child_opts(),
         )
         return default
+
+    # create_vpc_endpoints keeps AWS service traffic (S3, ECR, STS, CloudWatch Logs) inside the VPC,
+    # so only traffic to external hosts goes through the NAT gateways.
+    def create_vpc_endpoints(self, vpc_default_sg):
+        self.vpc_endpoints["s3"] = aws.ec2.VpcEndpoint(
+            self.resource_name("weather-alerting-s3-endpoint"),
+            vpc_id=self.vpc.vpc_id,
+            service_name=self.service_name("s3"),
+            vpc_endpoint_type="Gateway",
+            route_table_ids=self.route_table_ids,
+            opts=self.child_opts(),
+        )
+
+        interface_endpoints_sg = self.create_interface_endpoints_sg(vpc_default_sg)
+        for service in self.networking_config.interface_endpoints:
+            self.vpc_endpoints[service] = aws.ec2.VpcEndpoint(
+                self.resource_name(f"weather-alerting-{service.replace('.', '-')}-endpoint"),
+                vpc_id=self.vpc.vpc_id,
+                service_name=self.service_name(service),
+                vpc_endpoint_type="Interface",
+                private_dns_enabled=True,
+                subnet_ids=self.vpc.private_subnet_ids,
+                security_group_ids=[interface_endpoints_sg.id],
+                opts=self.child_opts(),
+            )
+        return self.vpc_endpoints
+
+    def create_interface_endpoints_sg(self, vpc_default_sg):
+        # Interface endpoints only accept HTTPS from members of the VPC default security group
+        return aws.ec2.SecurityGroup(
+            self.resource_name("weather-alerting-vpc-endpoints-sg"),
+            description="HTTPS access to AWS service interface endpoints",
+            vpc_id=self.vpc.vpc_id,
+            ingress=[
+                aws.ec2.SecurityGroupIngressArgs(
+                    protocol="tcp",
+                    from_port=HTTPS_PORT,
+                    to_port=HTTPS_PORT,
+                    security_groups=[vpc_default_sg.id],
+                )
+            ],
+            opts=self.child_opts(),
+        )
+
+    def create_nat_gateway_ids(self):
+        return [
+            self.vpc.nat_gateways.apply(lambda nat_gateways, index=index: nat_gateways[index].id)
+            for index in range(self.networking_config.nat_gateways_number)
+        ]
+
+    def service_name(self, service):
+        return f"com.amazonaws.{self.region}.{service}"
+
+    # request_peering peers this (primary) VPC with the VPC of a secondary region, whose side accepts it
+    # with accept_peering.
+    def request_peering(self, peer):
+        peering_connection = aws.ec2.VpcPeeringConnection(
+            f"weather-alerting-peering-{peer.region}",
+            vpc_id=self.vpc_id,
+            peer_vpc_id=peer.vpc_id,
+            peer_region=peer.region,
+            opts=self.child_opts(),
+        )
+        self.create_peer_routes(peer.region, peer.cidr_block, peering_connection.id)
+        return peering_connection
+
+    def accept_peering(self, peering_connection):
+        accepter = aws.ec2.VpcPeeringConnectionAccepter(
+            self.resource_name("weather-alerting-peering"),
+            vpc_peering_connection_id=peering_connection.id,
+            auto_accept=True,
+            opts=self.child_opts(),
+        )
+        self.create_peer_routes("primary", cidr_block(0), accepter.id)
+        return accepter
+
+    def create_peer_routes(self, peer_name, peer_cidr_block, peering_connection_id):
+        return [
+            aws.ec2.Route(
+                self.resource_name(f"weather-alerting-peer-route-{peer_name}-{index}"),
+                route_table_id=self.route_table_ids.apply(lambda route_table_ids, index=index: route_table_ids[index]),
+                destination_cidr_block=peer_cidr_block,
+                vpc_peering_connection_id=peering_connection_id,
+                opts=self.child_opts(),
+            )
+            for index in range(ROUTE_TABLES_NUMBER)
+        ]
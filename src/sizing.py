@@ -0,0 +1,110 @@
+"""An AWS Python Pulumi program - App Runner capacity planning from a declared load profile"""
+
+import math
+from dataclasses import dataclass
+
+# Valid App Runner CPU units with the memory sizes (MB) each of them can be paired with.
+APP_RUNNER_TIERS = {
+    256: (512, 1024),
+    512: (1024,),
+    1024: (2048, 3072, 4096),
+    2048: (4096, 6144),
+    4096: (8192, 10240, 12288),
+}
+APP_RUNNER_MAX_INSTANCES = 25
+APP_RUNNER_MAX_CONCURRENCY = 200
+# Fraction of an instance's vCPU time the plan is allowed to use at peak.
+TARGET_CPU_UTILIZATION = 0.7
+# Memory every instance needs before serving any request.
+BASE_MEMORY_MB = 384
+# App Runner's default number of concurrent requests per instance.
+DEFAULT_MAX_CONCURRENCY = 100
+# Requests per task and minute at which Fargate scales out when no load profile is declared.
+DEFAULT_REQUESTS_PER_TARGET = 1000
+
+
+@dataclass(frozen=True)
+class LoadProfile:
+    peak_rps: float
+    p95_latency_ms: float
+    cpu_ms_per_request: float
+    baseline_rps: float = 0
+    memory_mb_per_request: float = 2
+
+
+@dataclass(frozen=True)
+class CapacityPlan:
+    min_instances: int
+    max_instances: int
+    max_concurrency: int
+    cpu: int
+    memory: int
+
+    def as_output(self):
+        return {
+            "min_instances": self.min_instances,
+            "max_instances": self.max_instances,
+            "max_concurrency": self.max_concurrency,
+            "cpu": self.cpu,
+            "memory": self.memory,
+        }
+
+
+class CapacityPlanError(Exception):
+    pass
+
+
+# plan_capacity picks the smallest App Runner tier that serves the peak load within the instance limit.
+def plan_capacity(profile):
+    for cpu, memory_sizes in APP_RUNNER_TIERS.items():
+        requests_per_second = instance_throughput(cpu, profile.cpu_ms_per_request)
+        max_instances = max(1, math.ceil(profile.peak_rps / requests_per_second))
+        if max_instances > APP_RUNNER_MAX_INSTANCES:
+            continue
+        # Little's law: requests in flight = arrival rate x time in system.
+        max_concurrency = max(1, math.ceil(requests_per_second * profile.p95_latency_ms / 1000))
+        if max_concurrency > APP_RUNNER_MAX_CONCURRENCY:
+            continue
+        required_memory = BASE_MEMORY_MB + max_concurrency * profile.memory_mb_per_request
+        memory = next((size for size in memory_sizes if size >= required_memory), None)
+        if memory is None:
+            continue
+        min_instances = max(1, math.ceil(profile.baseline_rps / requests_per_second))
+        return CapacityPlan(
+            min_instances=min(min_instances, max_instances),
+            max_instances=max_instances,
+            max_concurrency=max_concurrency,
+            cpu=cpu,
+            memory=memory,
+        )
+    raise CapacityPlanError(f"No App Runner tier can serve {profile} within {APP_RUNNER_MAX_INSTANCES} instances")
+
+
+# backend_capacity_plan is the App Runner capacity of the backend config: derived from its load profile when
+# one is declared, else the configured tier and instance limit at App Runner's default concurrency.
+def backend_capacity_plan(backend_config):
+    if backend_config.load_profile is not None:
+        return plan_capacity(backend_config.load_profile)
+    return CapacityPlan(
+        min_instances=1,
+        max_instances=backend_config.auto_scaling_max_instances,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        cpu=backend_config.app_runner_cpu,
+        memory=backend_config.app_runner_memory,
+    )
+
+
+# requests_per_target is the ALB request count per Fargate task and minute that target tracking keeps the
+# service at: configured, or what a task of the planned tier serves at the target CPU utilization.
+def requests_per_target(backend_config):
+    if backend_config.requests_per_target is not None:
+        return backend_config.requests_per_target
+    if backend_config.load_profile is None:
+        return DEFAULT_REQUESTS_PER_TARGET
+    plan = plan_capacity(backend_config.load_profile)
+    return max(1, math.floor(instance_throughput(plan.cpu, backend_config.load_profile.cpu_ms_per_request) * 60))
+
+
+# instance_throughput is the requests per second one instance serves at the target CPU utilization.
+def instance_throughput(cpu, cpu_ms_per_request):
+    return (cpu / 1024) * TARGET_CPU_UTILIZATION * 1000 / cpu_ms_per_request
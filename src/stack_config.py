@@ -0,0 +1,859 @@
+"""An AWS Python Pulumi program - Typed stack configuration loaded once per run"""
+
+import re
+from dataclasses import dataclass
+from functools import cache
+
+import pulumi
+
+from capacity import DOCUMENTDB_MAX_CONNECTIONS, WARNING_UTILIZATION, capacity_report, check_capacity
+from sizing import (
+    APP_RUNNER_MAX_INSTANCES,
+    APP_RUNNER_TIERS,
+    TARGET_CPU_UTILIZATION,
+    CapacityPlanError,
+    LoadProfile,
+    backend_capacity_plan,
+    plan_capacity,
+)
+
+# Supported DocumentDB engine versions with their cluster parameter group family.
+DOCUMENTDB_PARAMETER_GROUP_FAMILIES = {
+    "3.6.0": "docdb3.6",
+    "4.0.0": "docdb4.0",
+    "5.0.0": "docdb5.0",
+}
+# awsx NAT gateway strategies, by config name.
+NAT_STRATEGIES = ("single", "one_per_az")
+# awsx spreads the subnets over this many availability zones; with one_per_az each gets a NAT gateway.
+AVAILABILITY_ZONES_NUMBER = 3
+# What a capacity limit exceeded by the config does: fail the run, only warn, or skip the capacity checks.
+CAPACITY_CHECK_MODES = ("error", "warn", "off")
+# Regions with App Runner, where DocumentDB global clusters can also place a secondary cluster.
+APP_RUNNER_REGIONS = (
+    "us-east-1",
+    "us-east-2",
+    "us-west-2",
+    "ap-south-1",
+    "ap-southeast-1",
+    "ap-southeast-2",
+    "ap-northeast-1",
+    "eu-central-1",
+    "eu-west-1",
+    "eu-west-2",
+    "eu-west-3",
+)
+# Services the backend can run on: App Runner, or ECS Fargate on ARM64 behind an Application Load Balancer.
+COMPUTE_PLATFORMS = ("app_runner", "ecs_fargate")
+# Lambda architecture of the backend image each platform runs, which the alert Lambdas run as well. App Runner
+# only runs x86_64 images.
+IMAGE_ARCHITECTURES = {"app_runner": "x86_64", "ecs_fargate": "arm64"}
+# A DocumentDB global cluster has at most five secondary clusters.
+MAX_SECONDARY_REGIONS = 5
+# CloudFront price classes, shared by the frontend and the API edge distributions.
+CLOUDFRONT_PRICE_CLASSES = ("PriceClass_100", "PriceClass_200", "PriceClass_All")
+# CloudFront accepts at most 10 query strings in a cache key and 25 cache behaviors per distribution.
+MAX_CACHE_KEY_QUERY_STRINGS = 10
+MAX_CACHED_ROUTES = 25
+# Days of an EventBridge Scheduler cron expression, e.g. MON-FRI or SAT,SUN; * is every day.
+SCHEDULE_DAY = "(SUN|MON|TUE|WED|THU|FRI|SAT)"
+SCHEDULE_DAYS = re.compile(rf"^(\*|{SCHEDULE_DAY}(-{SCHEDULE_DAY})?(,{SCHEDULE_DAY}(-{SCHEDULE_DAY})?)*)$")
+SCHEDULE_TIME = re.compile(r"^([01][0-9]|2[0-3]):[0-5][0-9]$")
+# Stack components, each with the components whose resources it consumes.
+COMPONENT_DEPENDENCIES = {
+    "networking": (),
+    "database": ("networking",),
+    "cache": ("networking",),
+    "email": (),
+    "backend": ("networking", "database", "cache", "email"),
+    "alerts": ("backend",),
+    "api_edge": ("backend",),
+    "warm_capacity": ("backend",),
+    "frontend": (),
+    "monitoring": ("networking", "database", "backend", "frontend"),
+}
+
+# Layers of a stack split into one stack per layer, lowest first, with their components. A layer reads the
+# outputs of the components of lower layers from their stacks.
+LAYERS = {
+    "network": ("networking",),
+    "data": ("database", "cache"),
+    "app": ("email", "backend", "alerts", "api_edge", "warm_capacity"),
+    "frontend": ("frontend", "monitoring"),
+}
+
+
+class StackConfigError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class CommonConfig:
+    account_id: pulumi.Output[int]
+    components: tuple = tuple(COMPONENT_DEPENDENCIES)
+    capacity_checks: str = "error"
+    layer: str = None
+    layer_stacks: dict = None
+
+    @classmethod
+    def load(cls):
+        config = pulumi.Config("WeatherAlerting")
+        layer = config.get("layer")
+        components = config.get_object("components")
+        if layer in LAYERS and components is None:
+            components = LAYERS[layer]
+        return cls(
+            account_id=config.require_secret_int("account_id"),
+            components=tuple(components or cls.components),
+            capacity_checks=config.get("capacity_checks", cls.capacity_checks),
+            layer=layer,
+            layer_stacks=config.get_object("layer_stacks") or {},
+        )
+
+    # lower_components are the components built by the stacks of the layers below this stack's layer.
+    @property
+    def lower_components(self):
+        if self.layer not in LAYERS:
+            return ()
+        lower_layers = list(LAYERS)[: list(LAYERS).index(self.layer)]
+        return tuple(component for layer in lower_layers for component in LAYERS[layer])
+
+    # unselected_components are the components of this stack that WeatherAlerting:components leaves out.
+    @property
+    def unselected_components(self):
+        all_components = LAYERS[self.layer] if self.layer in LAYERS else tuple(COMPONENT_DEPENDENCIES)
+        return tuple(component for component in all_components if component not in self.components)
+
+    def validate(self):
+        errors = []
+        unknown = set(self.components) - set(COMPONENT_DEPENDENCIES)
+        if unknown:
+            errors.append(f"WeatherAlerting:components has unknown components {sorted(unknown)}")
+        # An update without some components would delete their resources
+        if self.unselected_components and not pulumi.runtime.is_dry_run():
+            errors.append("WeatherAlerting:components can only select a subset of components in a preview")
+        if self.layer is not None and self.layer not in LAYERS:
+            errors.append(f"WeatherAlerting:layer must be one of {tuple(LAYERS)}, got {self.layer}")
+        unknown_layers = set(self.layer_stacks) - set(LAYERS)
+        if unknown_layers:
+            errors.append(f"WeatherAlerting:layer_stacks has unknown layers {sorted(unknown_layers)}")
+        if self.capacity_checks not in CAPACITY_CHECK_MODES:
+            errors.append(f"WeatherAlerting:capacity_checks must be one of {CAPACITY_CHECK_MODES}")
+        return errors
+
+    # validate_dependencies checks the selected components come with those they depend on, except the ones the
+    # stack config disables, like cache:enabled false, which the components depending on them do without.
+    def validate_dependencies(self, disabled_components):
+        errors = []
+        for component in set(self.components) & set(COMPONENT_DEPENDENCIES):
+            missing = (
+                set(COMPONENT_DEPENDENCIES[component])
+                - set(self.components)
+                - set(self.lower_components)
+                - set(disabled_components)
+            )
+            if missing:
+                errors.append(f"WeatherAlerting:components selects {component} without {sorted(missing)}")
+        return errors
+
+
+@dataclass(frozen=True)
+class NetworkingConfig:
+    region: str
+    nat_strategy: str = "single"
+    vpc_endpoints: bool = True
+    interface_endpoints: tuple = ("ecr.api", "ecr.dkr", "sts", "logs")
+    egress_connections_per_request: float = 1
+
+    @classmethod
+    def load(cls):
+        config = pulumi.Config("networking")
+        return cls(
+            region=pulumi.Config("aws").require("region"),
+            nat_strategy=config.get("nat_strategy", cls.nat_strategy),
+            vpc_endpoints=config.get_bool("vpc_endpoints", cls.vpc_endpoints),
+            interface_endpoints=tuple(config.get_object("interface_endpoints") or cls.interface_endpoints),
+            egress_connections_per_request=config.get_float(
+                "egress_connections_per_request", cls.egress_connections_per_request
+            ),
+        )
+
+    @property
+    def nat_gateways_number(self):
+        return AVAILABILITY_ZONES_NUMBER if self.nat_strategy == "one_per_az" else 1
+
+    def validate(self):
+        errors = []
+        if self.nat_strategy not in NAT_STRATEGIES:
+            errors.append(f"networking:nat_strategy must be one of {NAT_STRATEGIES}, got {self.nat_strategy}")
+        if self.egress_connections_per_request < 0:
+            errors.append("networking:egress_connections_per_request must not be negative")
+        return errors
+
+
+@dataclass(frozen=True)
+class ValidationRecord:
+    name: str
+    type: str
+    value: str
+
+
+@dataclass(frozen=True)
+class MultiRegionConfig:
+    primary_region: str
+    secondary_regions: tuple = ()
+    api_domain: str = None
+    hosted_zone_id: str = None
+    health_check_path: str = "/"
+    # Certificate validation records App Runner returned for api_domain, copied from the stack output
+    # api_certificate_validation_records after the custom domains are associated.
+    certificate_validation_records: tuple = ()
+
+    @classmethod
+    def load(cls):
+        config = pulumi.Config("multi_region")
+        return cls(
+            primary_region=pulumi.Config("aws").require("region"),
+            secondary_regions=tuple(config.get_object("secondary_regions") or cls.secondary_regions),
+            api_domain=config.get("api_domain"),
+            hosted_zone_id=config.get("hosted_zone_id"),
+            health_check_path=config.get("health_check_path", cls.health_check_path),
+            certificate_validation_records=tuple(
+                ValidationRecord(name=record.get("name"), type=record.get("type"), value=record.get("value"))
+                for record in config.get_object("certificate_validation_records") or ()
+            ),
+        )
+
+    @property
+    def enabled(self):
+        return bool(self.secondary_regions)
+
+    # regions lists the primary region first; a region's index also picks its VPC CIDR block.
+    @property
+    def regions(self):
+        return (self.primary_region, *self.secondary_regions)
+
+    def validate(self):
+        errors = []
+        if not self.enabled:
+            return errors
+        if not self.api_domain or not self.hosted_zone_id:
+            errors.append("multi_region:api_domain and multi_region:hosted_zone_id are required with secondary regions")
+        if len(set(self.regions)) != len(self.regions):
+            errors.append("multi_region:secondary_regions must be distinct and must not include aws:region")
+        unsupported = [region for region in self.regions if region not in APP_RUNNER_REGIONS]
+        if unsupported:
+            errors.append(f"multi_region:secondary_regions has regions without App Runner {unsupported}")
+        if len(self.secondary_regions) > MAX_SECONDARY_REGIONS:
+            errors.append(f"multi_region:secondary_regions accepts at most {MAX_SECONDARY_REGIONS} regions")
+        if not self.health_check_path.startswith("/"):
+            errors.append(f"multi_region:health_check_path must start with /, got {self.health_check_path}")
+        names = [record.name for record in self.certificate_validation_records]
+        if not all(
+            isinstance(field, str) and field
+            for record in self.certificate_validation_records
+            for field in (record.name, record.type, record.value)
+        ):
+            errors.append("multi_region:certificate_validation_records entries need a name, type and value")
+        elif len(set(names)) != len(names):
+            errors.append("multi_region:certificate_validation_records must not repeat a record name")
+        return errors
+
+    # validate_database checks the DocumentDB settings a global cluster needs.
+    def validate_database(self, database_config):
+        errors = []
+        if not self.enabled:
+            return errors
+        if database_config.mongodb_version == "3.6.0":
+            errors.append("database:mongodb_version must be 4.0.0 or later with multi_region:secondary_regions")
+        if database_config.instance_class.startswith("db.t"):
+            errors.append("database:instance_class must be a db.r* class with multi_region:secondary_regions")
+        return errors
+
+    # validate_layer checks the stack is not split into layers: secondary regions peer with the primary VPC and
+    # replicate the primary cluster, so they are built with the primary region's components.
+    def validate_layer(self, common_config):
+        if self.enabled and common_config.layer is not None:
+            return ["WeatherAlerting:layer can not be set with multi_region:secondary_regions"]
+        return []
+
+    # validate_backend checks the backend runs on App Runner, whose custom domains the latency routing uses.
+    def validate_backend(self, backend_config):
+        if self.enabled and backend_config.compute != "app_runner":
+            return ["backend:compute must be app_runner with multi_region:secondary_regions"]
+        return []
+
+
+@dataclass(frozen=True)
+class BackendConfig:
+    repository: str
+    ecr_uri: str
+    port: int
+    auto_scaling_max_instances: int
+    app_runner_cpu: int
+    app_runner_memory: int
+    app_runner_auto_deployment: bool
+    log_level: str
+    cron_config: str
+    send_emails: bool
+    smtp_host: str
+    smtp_port: int
+    smtp_secure: bool
+    smtp_require_tls: bool
+    smtp_user: pulumi.Output[str]
+    smtp_password: pulumi.Output[str]
+    weatherapi_apikey: pulumi.Output[str]
+    hash_salt: pulumi.Output[str]
+    jwt_secret: pulumi.Output[str]
+    load_profile: LoadProfile = None
+    compute: str = "app_runner"
+    api_domain: str = None
+    hosted_zone_id: str = None
+    health_check_path: str = "/"
+    deregistration_delay_seconds: int = 30
+    cpu_target_percent: float = round(TARGET_CPU_UTILIZATION * 100)
+    requests_per_target: int = None
+
+    @classmethod
+    def load(cls):
+        config = pulumi.Config("backend")
+        load_profile = None
+        if config.get("load_peak_rps") is not None:
+            load_profile = LoadProfile(
+                peak_rps=config.require_float("load_peak_rps"),
+                p95_latency_ms=config.require_float("load_p95_latency_ms"),
+                cpu_ms_per_request=config.require_float("load_cpu_ms_per_request"),
+                baseline_rps=config.get_float("load_baseline_rps", LoadProfile.baseline_rps),
+                memory_mb_per_request=config.get_float("load_memory_mb_per_request", LoadProfile.memory_mb_per_request),
+            )
+        return cls(
+            repository=config.require("repository"),
+            ecr_uri=config.require("ecr_uri"),
+            port=config.require_int("port"),
+            auto_scaling_max_instances=config.require_int("auto_scaling_max_instances"),
+            app_runner_cpu=config.require_int("app_runner_cpu"),
+            app_runner_memory=config.require_int("app_runner_memory"),
+            app_runner_auto_deployment=config.require_bool("app_runner_auto_deployment"),
+            log_level=config.require("log_level"),
+            cron_config=config.require("cron_config"),
+            send_emails=config.require_bool("send_emails"),
+            smtp_host=config.require("smtp_host"),
+            smtp_port=config.require_int("smtp_port"),
+            smtp_secure=config.require_bool("smtp_secure"),
+            smtp_require_tls=config.require_bool("smtp_require_tls"),
+            smtp_user=config.require_secret("smtp_user"),
+            smtp_password=config.require_secret("smtp_password"),
+            weatherapi_apikey=config.require_secret("weatherapi_apikey"),
+            hash_salt=config.require_secret("hash_salt"),
+            jwt_secret=config.require_secret("jwt_secret"),
+            load_profile=load_profile,
+            compute=config.get("compute", cls.compute),
+            api_domain=config.get("api_domain"),
+            hosted_zone_id=config.get("hosted_zone_id"),
+            health_check_path=config.get("health_check_path", cls.health_check_path),
+            deregistration_delay_seconds=config.get_int(
+                "deregistration_delay_seconds", cls.deregistration_delay_seconds
+            ),
+            cpu_target_percent=config.get_float("cpu_target_percent", cls.cpu_target_percent),
+            requests_per_target=config.get_int("requests_per_target"),
+        )
+
+    # image_architecture is the architecture the backend image is built for, linux/arm64 for ECS Fargate.
+    @property
+    def image_architecture(self):
+        return IMAGE_ARCHITECTURES[self.compute]
+
+    def validate(self):
+        errors = []
+        if self.app_runner_cpu not in APP_RUNNER_TIERS:
+            errors.append(f"backend:app_runner_cpu must be one of {tuple(APP_RUNNER_TIERS)}, got {self.app_runner_cpu}")
+        elif self.app_runner_memory not in APP_RUNNER_TIERS[self.app_runner_cpu]:
+            errors.append(
+                f"backend:app_runner_memory must be one of {APP_RUNNER_TIERS[self.app_runner_cpu]} "
+                f"for {self.app_runner_cpu} CPU units, got {self.app_runner_memory}"
+            )
+        if not 1 <= self.auto_scaling_max_instances <= APP_RUNNER_MAX_INSTANCES:
+            errors.append(f"backend:auto_scaling_max_instances must be between 1 and {APP_RUNNER_MAX_INSTANCES}")
+        profile = self.load_profile
+        if profile is not None and min(profile.peak_rps, profile.p95_latency_ms, profile.cpu_ms_per_request) <= 0:
+            errors.append("backend:load_peak_rps, load_p95_latency_ms and load_cpu_ms_per_request must be positive")
+        elif profile is not None:
+            try:
+                plan_capacity(profile)
+            except CapacityPlanError as error:
+                errors.append(f"backend:load_* {error}")
+        if not 0 < self.port < 65536:
+            errors.append(f"backend:port must be a valid TCP port, got {self.port}")
+        if self.compute not in COMPUTE_PLATFORMS:
+            errors.append(f"backend:compute must be one of {COMPUTE_PLATFORMS}, got {self.compute}")
+        if self.compute == "ecs_fargate" and (not self.api_domain or not self.hosted_zone_id):
+            errors.append("backend:api_domain and backend:hosted_zone_id are required with backend:compute ecs_fargate")
+        if not self.health_check_path.startswith("/"):
+            errors.append(f"backend:health_check_path must start with /, got {self.health_check_path}")
+        if not 0 <= self.deregistration_delay_seconds <= 3600:
+            errors.append("backend:deregistration_delay_seconds must be between 0 and 3600")
+        if not 0 < self.cpu_target_percent <= 100:
+            errors.append("backend:cpu_target_percent must be a percentage")
+        if self.requests_per_target is not None and self.requests_per_target < 1:
+            errors.append("backend:requests_per_target must be at least 1")
+        return errors
+
+
+@dataclass(frozen=True)
+class DatabaseConfig:
+    username: pulumi.Output[str]
+    password: pulumi.Output[str]
+    mongodb_version: str
+    instance_class: str
+    instances_number: int
+    max_pool_size: int = 50
+    connect_timeout_ms: int = 10000
+    server_selection_timeout_ms: int = 15000
+    cluster_parameters: dict = None
+    performance_insights: bool = True
+    apply_immediately: bool = False
+
+    @classmethod
+    def load(cls):
+        config = pulumi.Config("database")
+        return cls(
+            username=config.require_secret("username"),
+            password=config.require_secret("password"),
+            mongodb_version=config.require("mongodb_version"),
+            instance_class=config.require("instance_class"),
+            instances_number=config.require_int("instances_number"),
+            max_pool_size=config.get_int("max_pool_size", cls.max_pool_size),
+            connect_timeout_ms=config.get_int("connect_timeout_ms", cls.connect_timeout_ms),
+            server_selection_timeout_ms=config.get_int("server_selection_timeout_ms", cls.server_selection_timeout_ms),
+            cluster_parameters=config.get_object("cluster_parameters") or {},
+            performance_insights=config.get_bool("performance_insights", cls.performance_insights),
+            apply_immediately=config.get_bool("apply_immediately", cls.apply_immediately),
+        )
+
+    def validate(self):
+        errors = []
+        if self.instances_number < 1:
+            errors.append("database:instances_number must be at least 1")
+        if self.mongodb_version not in DOCUMENTDB_PARAMETER_GROUP_FAMILIES:
+            errors.append(
+                f"database:mongodb_version must be one of {tuple(DOCUMENTDB_PARAMETER_GROUP_FAMILIES)}, "
+                f"got {self.mongodb_version}"
+            )
+        if self.max_pool_size < 1:
+            errors.append("database:max_pool_size must be at least 1")
+        # The MongoDB drivers read a timeout of 0 as no timeout
+        for key in ("connect_timeout_ms", "server_selection_timeout_ms"):
+            if getattr(self, key) < 0:
+                errors.append(f"database:{key} must not be negative")
+        if not self.instance_class.startswith("db."):
+            errors.append(f"database:instance_class must be a db.* instance class, got {self.instance_class}")
+        return errors
+
+
+@dataclass(frozen=True)
+class FrontendConfig:
+    bucket_name: str
+    repository: str
+    s3_force_destroy: bool
+    cdn_enabled: bool = True
+    cdn_price_class: str = "PriceClass_100"
+    config_ttl_seconds: int = 60
+    html_ttl_seconds: int = 300
+
+    @classmethod
+    def load(cls):
+        config = pulumi.Config("frontend")
+        return cls(
+            bucket_name=config.require("bucket_name"),
+            repository=config.require("repository"),
+            s3_force_destroy=config.require_bool("s3_force_destroy"),
+            cdn_enabled=config.get_bool("cdn_enabled", cls.cdn_enabled),
+            cdn_price_class=config.get("cdn_price_class", cls.cdn_price_class),
+            config_ttl_seconds=config.get_int("config_ttl_seconds", cls.config_ttl_seconds),
+            html_ttl_seconds=config.get_int("html_ttl_seconds", cls.html_ttl_seconds),
+        )
+
+    def validate(self):
+        errors = []
+        if self.cdn_price_class not in CLOUDFRONT_PRICE_CLASSES:
+            errors.append(f"frontend:cdn_price_class is not a CloudFront price class, got {self.cdn_price_class}")
+        return errors
+
+
+@dataclass(frozen=True)
+class CachedRoute:
+    path: str
+    ttl_seconds: int
+    query_strings: tuple = ()
+
+
+@dataclass(frozen=True)
+class ApiEdgeConfig:
+    enabled: bool = False
+    price_class: str = "PriceClass_100"
+    cached_routes: tuple = (
+        CachedRoute("/weather/current*", 60, ("location", "lat", "lon")),
+        CachedRoute("/weather/forecast*", 300, ("location", "lat", "lon", "days")),
+    )
+
+    @classmethod
+    def load(cls):
+        config = pulumi.Config("api_edge")
+        cached_routes = tuple(
+            CachedRoute(
+                path=route.get("path"),
+                ttl_seconds=route.get("ttl_seconds"),
+                query_strings=tuple(route.get("query_strings", ())),
+            )
+            for route in config.get_object("cached_routes") or ()
+        )
+        return cls(
+            enabled=config.get_bool("enabled", cls.enabled),
+            price_class=config.get("price_class", cls.price_class),
+            cached_routes=cached_routes or cls.cached_routes,
+        )
+
+    def validate(self):
+        errors = []
+        if self.price_class not in CLOUDFRONT_PRICE_CLASSES:
+            errors.append(f"api_edge:price_class is not a CloudFront price class, got {self.price_class}")
+        if len(self.cached_routes) > MAX_CACHED_ROUTES:
+            errors.append(f"api_edge:cached_routes accepts at most {MAX_CACHED_ROUTES} routes")
+        for route in self.cached_routes:
+            if not isinstance(route.path, str) or not route.path.startswith("/"):
+                errors.append(f"api_edge:cached_routes path must start with /, got {route.path}")
+            if not isinstance(route.ttl_seconds, int) or route.ttl_seconds < 1:
+                errors.append(f"api_edge:cached_routes ttl_seconds of {route.path} must be a positive integer")
+            if len(route.query_strings) > MAX_CACHE_KEY_QUERY_STRINGS:
+                errors.append(
+                    f"api_edge:cached_routes {route.path} has more than {MAX_CACHE_KEY_QUERY_STRINGS} query strings"
+                )
+        return errors
+
+
+@dataclass(frozen=True)
+class CacheConfig:
+    enabled: bool = False
+    engine: str = "redis"
+    engine_version: str = "7.0"
+    node_type: str = "cache.t4g.micro"
+    nodes_number: int = 1
+    ttl_seconds: int = 600
+
+    @classmethod
+    def load(cls):
+        config = pulumi.Config("cache")
+        return cls(
+            enabled=config.get_bool("enabled", cls.enabled),
+            engine=config.get("engine", cls.engine),
+            engine_version=config.get("engine_version", cls.engine_version),
+            node_type=config.get("node_type", cls.node_type),
+            nodes_number=config.get_int("nodes_number", cls.nodes_number),
+            ttl_seconds=config.get_int("ttl_seconds", cls.ttl_seconds),
+        )
+
+    def validate(self):
+        errors = []
+        if not self.node_type.startswith("cache."):
+            errors.append(f"cache:node_type must be a cache.* node type, got {self.node_type}")
+        if not 1 <= self.nodes_number <= 6:
+            errors.append("cache:nodes_number must be between 1 and 6")
+        if self.ttl_seconds < 1:
+            errors.append("cache:ttl_seconds must be positive")
+        return errors
+
+
+@dataclass(frozen=True)
+class AlertsConfig:
+    enabled: bool = False
+    schedule_expression: str = "rate(1 minute)"
+    dispatcher_command: str = "dist/alerts/lambda.dispatch"
+    worker_command: str = "dist/alerts/lambda.evaluate"
+    batch_size: int = 100
+    worker_concurrency: int = 10
+    worker_memory: int = 512
+    worker_timeout_seconds: int = 120
+    max_receive_count: int = 3
+
+    @classmethod
+    def load(cls):
+        config = pulumi.Config("alerts")
+        return cls(
+            enabled=config.get_bool("enabled", cls.enabled),
+            schedule_expression=config.get("schedule_expression", cls.schedule_expression),
+            dispatcher_command=config.get("dispatcher_command", cls.dispatcher_command),
+            worker_command=config.get("worker_command", cls.worker_command),
+            batch_size=config.get_int("batch_size", cls.batch_size),
+            worker_concurrency=config.get_int("worker_concurrency", cls.worker_concurrency),
+            worker_memory=config.get_int("worker_memory", cls.worker_memory),
+            worker_timeout_seconds=config.get_int("worker_timeout_seconds", cls.worker_timeout_seconds),
+            max_receive_count=config.get_int("max_receive_count", cls.max_receive_count),
+        )
+
+    def validate(self):
+        errors = []
+        if not self.schedule_expression.startswith(("rate(", "cron(")):
+            errors.append(f"alerts:schedule_expression must be rate() or cron(), got {self.schedule_expression}")
+        if self.batch_size < 1:
+            errors.append("alerts:batch_size must be at least 1")
+        # SQS event source mappings accept a maximum concurrency between 2 and 1000
+        if not 2 <= self.worker_concurrency <= 1000:
+            errors.append("alerts:worker_concurrency must be between 2 and 1000")
+        if not 1 <= self.worker_timeout_seconds <= 900:
+            errors.append("alerts:worker_timeout_seconds must be between 1 and 900")
+        if self.max_receive_count < 1:
+            errors.append("alerts:max_receive_count must be at least 1")
+        return errors
+
+
+@dataclass(frozen=True)
+class EmailConfig:
+    enabled: bool = False
+    from_address: str = None
+    identity: str = None
+    batch_size: int = 10
+    max_send_rate: float = 14
+    sender_concurrency: int = 2
+    max_receive_count: int = 5
+
+    @classmethod
+    def load(cls):
+        config = pulumi.Config("email")
+        from_address = config.get("from_address")
+        # Verifying the whole sender domain lets SES sign with DKIM
+        default_identity = from_address.split("@")[-1] if from_address else None
+        return cls(
+            enabled=config.get_bool("enabled", cls.enabled),
+            from_address=from_address,
+            identity=config.get("identity", default_identity),
+            batch_size=config.get_int("batch_size", cls.batch_size),
+            max_send_rate=config.get_float("max_send_rate", cls.max_send_rate),
+            sender_concurrency=config.get_int("sender_concurrency", cls.sender_concurrency),
+            max_receive_count=config.get_int("max_receive_count", cls.max_receive_count),
+        )
+
+    def validate(self):
+        errors = []
+        if self.enabled and not self.from_address:
+            errors.append("email:from_address is required when email:enabled is true")
+        if not 1 <= self.batch_size <= 10:
+            errors.append("email:batch_size must be between 1 and 10")
+        if self.max_send_rate <= 0:
+            errors.append("email:max_send_rate must be positive")
+        # SQS event source mappings accept a maximum concurrency between 2 and 1000
+        if not 2 <= self.sender_concurrency <= 1000:
+            errors.append("email:sender_concurrency must be between 2 and 1000")
+        return errors
+
+
+@dataclass(frozen=True)
+class MonitoringConfig:
+    enabled: bool = False
+    tracing: bool = False
+    alarm_email: str = None
+    period_seconds: int = 60
+    evaluation_periods: int = 5
+    app_runner_p99_latency_ms: float = 2000
+    app_runner_5xx_responses: int = 10
+    documentdb_cpu_percent: float = 80
+    documentdb_connections: int = None
+    documentdb_buffer_cache_hit_ratio: float = 95
+    nat_port_allocation_errors: int = 0
+
+    @classmethod
+    def load(cls):
+        config = pulumi.Config("monitoring")
+        return cls(
+            enabled=config.get_bool("enabled", cls.enabled),
+            tracing=config.get_bool("tracing", cls.tracing),
+            alarm_email=config.get("alarm_email"),
+            period_seconds=config.get_int("period_seconds", cls.period_seconds),
+            evaluation_periods=config.get_int("evaluation_periods", cls.evaluation_periods),
+            app_runner_p99_latency_ms=config.get_float("app_runner_p99_latency_ms", cls.app_runner_p99_latency_ms),
+            app_runner_5xx_responses=config.get_int("app_runner_5xx_responses", cls.app_runner_5xx_responses),
+            documentdb_cpu_percent=config.get_float("documentdb_cpu_percent", cls.documentdb_cpu_percent),
+            documentdb_connections=config.get_int("documentdb_connections"),
+            documentdb_buffer_cache_hit_ratio=config.get_float(
+                "documentdb_buffer_cache_hit_ratio", cls.documentdb_buffer_cache_hit_ratio
+            ),
+            nat_port_allocation_errors=config.get_int("nat_port_allocation_errors", cls.nat_port_allocation_errors),
+        )
+
+    def validate(self):
+        errors = []
+        # CloudWatch only accepts 10, 30 or multiples of 60 seconds
+        if self.period_seconds not in (10, 30) and self.period_seconds % 60:
+            errors.append(f"monitoring:period_seconds must be 10, 30 or a multiple of 60, got {self.period_seconds}")
+        if self.evaluation_periods < 1:
+            errors.append("monitoring:evaluation_periods must be at least 1")
+        if not 0 <= self.documentdb_buffer_cache_hit_ratio <= 100:
+            errors.append("monitoring:documentdb_buffer_cache_hit_ratio must be a percentage")
+        if self.documentdb_connections is not None and self.documentdb_connections < 1:
+            errors.append("monitoring:documentdb_connections must be at least 1")
+        return errors
+
+    # documentdb_connections_threshold defaults to the share of the instance class's connection limit at which
+    # the capacity checks warn, and is None when the limit of the class is not known.
+    def documentdb_connections_threshold(self, instance_class):
+        if self.documentdb_connections is not None:
+            return self.documentdb_connections
+        max_connections = DOCUMENTDB_MAX_CONNECTIONS.get(instance_class)
+        return None if max_connections is None else round(max_connections * WARNING_UTILIZATION)
+
+
+@dataclass(frozen=True)
+class WarmWindow:
+    start: str
+    end: str
+    days: str = "MON-FRI"
+
+
+@dataclass(frozen=True)
+class WarmCapacityConfig:
+    enabled: bool = False
+    min_instances: int = 3
+    timezone: str = "UTC"
+    windows: tuple = (WarmWindow("06:00", "09:00"),)
+
+    @classmethod
+    def load(cls):
+        config = pulumi.Config("warm_capacity")
+        windows = tuple(
+            WarmWindow(start=window.get("start"), end=window.get("end"), days=window.get("days", WarmWindow.days))
+            for window in config.get_object("windows") or ()
+        )
+        return cls(
+            enabled=config.get_bool("enabled", cls.enabled),
+            min_instances=config.get_int("min_instances", cls.min_instances),
+            timezone=config.get("timezone", cls.timezone),
+            windows=windows or cls.windows,
+        )
+
+    def validate(self):
+        errors = []
+        if not 1 <= self.min_instances <= APP_RUNNER_MAX_INSTANCES:
+            errors.append(f"warm_capacity:min_instances must be between 1 and {APP_RUNNER_MAX_INSTANCES}")
+        for window in self.windows:
+            times = (window.start, window.end)
+            if not all(isinstance(time, str) and SCHEDULE_TIME.match(time) for time in times):
+                errors.append(
+                    f"warm_capacity:windows start and end must be HH:MM times, got {window.start}-{window.end}"
+                )
+            # The zero-padded times compare in time order
+            elif window.start >= window.end:
+                errors.append(
+                    f"warm_capacity:windows end must be after start on the same day, got {window.start}-{window.end}"
+                )
+            if not isinstance(window.days, str) or not SCHEDULE_DAYS.match(window.days):
+                errors.append(
+                    f"warm_capacity:windows days must be * or days like MON-FRI or SAT,SUN, got {window.days}"
+                )
+        return errors
+
+    # validate_backend checks the warm minimum fits the App Runner capacity plan of the backend.
+    def validate_backend(self, backend_config):
+        if not self.enabled:
+            return []
+        if backend_config.compute != "app_runner":
+            return ["warm_capacity:enabled needs backend:compute app_runner, ECS Fargate scales on its own schedule"]
+        try:
+            plan = backend_capacity_plan(backend_config)
+        except CapacityPlanError:
+            # Reported by BackendConfig.validate
+            return []
+        if not plan.min_instances < self.min_instances <= plan.max_instances:
+            return [
+                f"warm_capacity:min_instances must be above the {plan.min_instances} minimum and at most the "
+                f"{plan.max_instances} maximum App Runner instances of the backend"
+            ]
+        return []
+
+
+@dataclass(frozen=True)
+class StackConfig:
+    common: CommonConfig
+    networking: NetworkingConfig
+    multi_region: MultiRegionConfig
+    backend: BackendConfig
+    database: DatabaseConfig
+    frontend: FrontendConfig
+    api_edge: ApiEdgeConfig
+    cache: CacheConfig
+    alerts: AlertsConfig
+    email: EmailConfig
+    warm_capacity: WarmCapacityConfig
+    monitoring: MonitoringConfig
+
+
+# load_stack_config reads and validates every config namespace once, reporting all problems together
+# so a bad value fails the run before any resource is registered.
+@cache
+def load_stack_config():
+    loaded, errors = {}, []
+    for name, config_class in (
+        ("common", CommonConfig),
+        ("networking", NetworkingConfig),
+        ("multi_region", MultiRegionConfig),
+        ("backend", BackendConfig),
+        ("database", DatabaseConfig),
+        ("frontend", FrontendConfig),
+        ("api_edge", ApiEdgeConfig),
+        ("cache", CacheConfig),
+        ("alerts", AlertsConfig),
+        ("email", EmailConfig),
+        ("warm_capacity", WarmCapacityConfig),
+        ("monitoring", MonitoringConfig),
+    ):
+        try:
+            loaded[name] = config_class.load()
+        except (pulumi.ConfigMissingError, pulumi.ConfigTypeError) as error:
+            errors.append(str(error))
+            continue
+        errors.extend(loaded[name].validate())
+    if "common" in loaded:
+        # The configs of optional components are named after them
+        disabled_components = [
+            name
+            for name, config in loaded.items()
+            if name in COMPONENT_DEPENDENCIES and not getattr(config, "enabled", True)
+        ]
+        errors.extend(loaded["common"].validate_dependencies(disabled_components))
+    if "multi_region" in loaded and "database" in loaded:
+        errors.extend(loaded["multi_region"].validate_database(loaded["database"]))
+    if "multi_region" in loaded and "backend" in loaded:
+        errors.extend(loaded["multi_region"].validate_backend(loaded["backend"]))
+    if "warm_capacity" in loaded and "backend" in loaded:
+        errors.extend(loaded["warm_capacity"].validate_backend(loaded["backend"]))
+    if "multi_region" in loaded and "common" in loaded:
+        errors.extend(loaded["multi_region"].validate_layer(loaded["common"]))
+    if errors:
+        raise StackConfigError("Invalid stack configuration:\n  " + "\n  ".join(errors))
+    stack_config = StackConfig(**loaded)
+    errors = validate_capacity(stack_config)
+    if errors:
+        raise StackConfigError("Stack configuration exceeds AWS capacity limits:\n  " + "\n  ".join(errors))
+    return stack_config
+
+
+# validate_capacity logs the capacity report of the config and returns the limits it exceeds when
+# WeatherAlerting:capacity_checks is error; otherwise exceeded limits are only warnings.
+def validate_capacity(stack_config):
+    if stack_config.common.capacity_checks == "off":
+        return []
+    checks, warnings = check_capacity(stack_config)
+    pulumi.log.info(capacity_report(checks, warnings))
+    exceeded = [
+        f"{check.name} {check.demand:.0f} exceeds {check.limit:.0f}: {check.detail}"
+        for check in checks
+        if check.status == "exceeded"
+    ]
+    for check in checks:
+        if check.status == "warning":
+            pulumi.log.warn(f"{check.name} uses {check.utilization:.0%} of its limit: {check.detail}")
+    for warning in warnings:
+        pulumi.log.warn(warning)
+    if stack_config.common.capacity_checks == "warn":
+        for message in exceeded:
+            pulumi.log.warn(message)
+        return []
+    return exceeded
@@ -0,0 +1,189 @@
+"""An AWS Python Pulumi program - Time-of-day warm capacity for the App Runner service"""
+
+import json
+import os
+
+import pulumi
+import pulumi_aws as aws
+
+from component import Component
+from iam_policy import Principal, Statement, policy_document
+
+LAMBDA_BASIC_EXECUTION_POLICY_ARN = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+SCALER_CODE_PATH = os.path.join(os.path.dirname(__file__), "functions", "warm_capacity_scaler")
+# Time for the scaler to wait out a deployment in progress before the swap fails and is retried.
+SCALER_TIMEOUT_SECONDS = 300
+SCHEDULE_RETRY_ATTEMPTS = 2
+
+
+class WarmCapacity(Component):
+    # WarmCapacity keeps a second auto scaling configuration of the App Runner service with
+    # warm_capacity:min_instances, and swaps the service to it for each of warm_capacity:windows: instances are
+    # started before the known peaks instead of scaling out under them, and released once the window ends.
+    def __init__(self, name, config, service_arn, base_configuration_arn, capacity_plan, opts=None):
+        super().__init__(name, opts)
+        self.warm_capacity_config = config.warm_capacity
+        self.warm_configuration = self.create_warm_configuration(capacity_plan)
+        self.scaler = self.create_scaler(service_arn, base_configuration_arn)
+        self.create_schedules()
+        self.create_refresh(base_configuration_arn)
+
+        self.warm_configuration_arn = self.warm_configuration.arn
+        self.register_outputs({"warm_configuration_arn": self.warm_configuration_arn, "scaler_name": self.scaler.name})
+
+    # create_warm_configuration only raises the minimum, so a swap never changes how far the service scales out. A
+    # replaced revision is kept, as the service may still use it, and the scaler deletes it once it is unused.
+    def create_warm_configuration(self, capacity_plan):
+        return aws.apprunner.AutoScalingConfigurationVersion(
+            "AppRunnerWarmAutoScalingConfig",
+            auto_scaling_configuration_name="AppRunnerWarmAutoScalingConfig",
+            min_size=self.warm_capacity_config.min_instances,
+            max_size=capacity_plan.max_instances,
+            max_concurrency=capacity_plan.max_concurrency,
+            opts=self.child_opts(retain_on_delete=True),
+        )
+
+    def create_scaler_role(self, service_arn, base_configuration_arn):
+        role = aws.iam.Role(
+            resource_name="WarmCapacityScalerRole",
+            name="WarmCapacityScalerRole",
+            assume_role_policy=policy_document(
+                statements=[
+                    Statement(
+                        actions=("sts:AssumeRole",),
+                        effect="Allow",
+                        principals=(Principal(type="Service", identifiers=("lambda.amazonaws.com",)),),
+                    )
+                ]
+            ),
+            opts=self.child_opts(),
+        )
+        aws.iam.RolePolicyAttachment(
+            "WarmCapacityScalerLogs", role=role, policy_arn=LAMBDA_BASIC_EXECUTION_POLICY_ARN, opts=self.child_opts()
+        )
+        aws.iam.RolePolicy(
+            "WarmCapacityScalerAccess",
+            role=role.id,
+            policy=policy_document(
+                statements=[
+                    Statement(
+                        actions=("apprunner:DescribeService", "apprunner:UpdateService"),
+                        effect="Allow",
+                        resources=(service_arn,),
+                    ),
+                    Statement(
+                        actions=("apprunner:ListAutoScalingConfigurations",),
+                        effect="Allow",
+                        resources=("*",),
+                    ),
+                    Statement(
+                        actions=("apprunner:DeleteAutoScalingConfiguration",),
+                        effect="Allow",
+                        resources=(
+                            self.warm_configuration.arn.apply(configuration_revisions_arn),
+                            pulumi.Output.from_input(base_configuration_arn).apply(configuration_revisions_arn),
+                        ),
+                    ),
+                ]
+            ),
+            opts=self.child_opts(),
+        )
+        return role
+
+    def create_scaler(self, service_arn, base_configuration_arn):
+        # The App Runner API is reached over its public endpoint, so the scaler runs outside the VPC
+        return aws.lambda_.Function(
+            "WarmCapacityScaler",
+            name="WarmCapacityScaler",
+            runtime="python3.11",
+            architectures=["arm64"],
+            handler="handler.handler",
+            code=pulumi.FileArchive(SCALER_CODE_PATH),
+            role=self.create_scaler_role(service_arn, base_configuration_arn).arn,
+            memory_size=128,
+            timeout=SCALER_TIMEOUT_SECONDS,
+            environment=aws.lambda_.FunctionEnvironmentArgs(
+                variables={
+                    "SERVICE_ARN": service_arn,
+                    "WARM_CONFIGURATION_ARN": self.warm_configuration.arn,
+                    "BASE_CONFIGURATION_ARN": base_configuration_arn,
+                }
+            ),
+            opts=self.child_opts(),
+        )
+
+    # create_refresh invokes the scaler whenever a configuration is replaced: the service ignores changes of its
+    # configuration, so the scaler moves it to the latest revision of the one it uses right away instead of at the
+    # next scheduled swap.
+    def create_refresh(self, base_configuration_arn):
+        return aws.lambda_.Invocation(
+            "WarmCapacityRefresh",
+            function_name=self.scaler.name,
+            input=json.dumps({"configuration": "current"}),
+            triggers={
+                "base_configuration_arn": base_configuration_arn,
+                "warm_configuration_arn": self.warm_configuration.arn,
+            },
+            opts=self.child_opts(),
+        )
+
+    def create_schedules(self):
+        scheduler_role = aws.iam.Role(
+            resource_name="WarmCapacitySchedulerRole",
+            name="WarmCapacitySchedulerRole",
+            assume_role_policy=policy_document(
+                statements=[
+                    Statement(
+                        actions=("sts:AssumeRole",),
+                        effect="Allow",
+                        principals=(Principal(type="Service", identifiers=("scheduler.amazonaws.com",)),),
+                    )
+                ]
+            ),
+            opts=self.child_opts(),
+        )
+        aws.iam.RolePolicy(
+            "WarmCapacitySchedulerInvokeScaler",
+            role=scheduler_role.id,
+            policy=policy_document(
+                statements=[Statement(actions=("lambda:InvokeFunction",), effect="Allow", resources=(self.scaler.arn,))]
+            ),
+            opts=self.child_opts(),
+        )
+        schedules = []
+        for index, window in enumerate(self.warm_capacity_config.windows):
+            for event, time in (("Start", window.start), ("End", window.end)):
+                schedules.append(
+                    aws.scheduler.Schedule(
+                        f"WarmCapacity{event}-{index}",
+                        description=f"Weather Alerting warm capacity {window.days} {window.start}-{window.end}",
+                        schedule_expression=schedule_expression(time, window.days),
+                        schedule_expression_timezone=self.warm_capacity_config.timezone,
+                        flexible_time_window=aws.scheduler.ScheduleFlexibleTimeWindowArgs(mode="OFF"),
+                        target=aws.scheduler.ScheduleTargetArgs(
+                            arn=self.scaler.arn,
+                            role_arn=scheduler_role.arn,
+                            input=json.dumps({"configuration": "warm" if event == "Start" else "base"}),
+                            retry_policy=aws.scheduler.ScheduleTargetRetryPolicyArgs(
+                                maximum_retry_attempts=SCHEDULE_RETRY_ATTEMPTS
+                            ),
+                        ),
+                        opts=self.child_opts(),
+                    )
+                )
+        return schedules
+
+
+# schedule_expression is the EventBridge Scheduler cron expression of an HH:MM time on days like MON-FRI, where
+# only one of the day-of-month and day-of-week fields may be set.
+def schedule_expression(time, days):
+    hours, minutes = (int(field) for field in time.split(":"))
+    if days == "*":
+        return f"cron({minutes} {hours} * * ? *)"
+    return f"cron({minutes} {hours} ? * {days} *)"
+
+
+# configuration_revisions_arn matches every revision of the auto scaling configuration of a revision ARN like
+# arn:aws:apprunner:eu-central-1:123456789012:autoscalingconfiguration/AppRunnerAutoScalingConfig/2/0123abcd.
+def configuration_revisions_arn(configuration_arn):
+    return "/".join(configuration_arn.split("/")[:2]) + "/*"
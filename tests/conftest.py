@@ -0,0 +1,174 @@
+import asyncio
+import os
+import runpy
+from dataclasses import dataclass, field
+
+import pulumi
+import pytest
+from pulumi.runtime.mocks import MockMonitor
+from pulumi.runtime.proto import resource_pb2
+from pulumi.runtime.rpc import _special_secret_sig, _special_sig_key
+
+import stack_config
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# Stack configuration of the tests, shaped like Pulumi.WeatherAlerting.dev.yaml without encrypted values.
+STACK_CONFIG = {
+    "WeatherAlerting:account_id": "163636840347",
+    "aws:region": "eu-central-1",
+    "backend:app_runner_auto_deployment": "true",
+    "backend:app_runner_cpu": "1024",
+    "backend:app_runner_memory": "2048",
+    "backend:auto_scaling_max_instances": "1",
+    "backend:cron_config": "* * * * *",
+    "backend:ecr_uri": "163636840347.dkr.ecr.eu-central-1.amazonaws.com/backend",
+    "backend:hash_salt": "test",
+    "backend:jwt_secret": "test",
+    "backend:log_level": "debug",
+    "backend:port": "3000",
+    "backend:repository": "WeatherAlertingSystem/WeatherAlerting-Backend",
+    "backend:send_emails": "true",
+    "backend:smtp_host": "smtp.example.com",
+    "backend:smtp_password": "test",
+    "backend:smtp_port": "587",
+    "backend:smtp_require_tls": "true",
+    "backend:smtp_secure": "false",
+    "backend:smtp_user": "test",
+    "backend:weatherapi_apikey": "test",
+    "database:instance_class": "db.t3.medium",
+    "database:instances_number": "1",
+    "database:mongodb_version": "3.6.0",
+    "database:password": "test",
+    "database:username": "test",
+    "frontend:bucket_name": "163636840347-weather-alerting-frontend",
+    "frontend:repository": "WeatherAlertingSystem/WeatherAlerting-Frontend",
+    "frontend:s3_force_destroy": "true",
+}
+
+
+@dataclass
+class RegisteredResource:
+    type: str
+    name: str
+    inputs: dict
+
+
+@dataclass
+class Registration:
+    type: str
+    name: str
+    custom: bool
+    parent: str
+    dependencies: set
+
+
+@dataclass
+class Program:
+    resources: list = field(default_factory=list)
+    exports: dict = field(default_factory=dict)
+    # Names of the resources registered with retain_on_delete
+    retained: set = field(default_factory=set)
+    # Parent and dependencies of every resource and component, by URN
+    registrations: dict = field(default_factory=dict)
+
+    def of_type(self, resource_type):
+        return [resource for resource in self.resources if resource.type == resource_type]
+
+    def named(self, name):
+        return next(resource for resource in self.resources if resource.name == name)
+
+
+class ProgramMocks(pulumi.runtime.Mocks):
+    # outputs are extra outputs of every resource of a type, by type token.
+    def __init__(self, program, outputs):
+        self.program = program
+        self.outputs = outputs
+
+    def new_resource(self, args):
+        self.program.resources.append(RegisteredResource(args.typ, args.name, reveal(args.inputs)))
+        outputs = {key: value for key, value in args.inputs.items() if not isinstance(value, pulumi.Resource)}
+        if args.typ == "awsx:ec2:Vpc":
+            outputs = {
+                "vpcId": "vpc-test",
+                "privateSubnetIds": ["subnet-private-a", "subnet-private-b", "subnet-private-c"],
+                "publicSubnetIds": ["subnet-public-a", "subnet-public-b", "subnet-public-c"],
+                "isolatedSubnetIds": [],
+            }
+        outputs.setdefault("arn", f"arn:aws:mock:eu-central-1:163636840347:{args.name}")
+        # Endpoints the program builds the backend environment from
+        outputs.setdefault("endpoint", f"{args.name}.endpoint.example.com")
+        outputs.setdefault("readerEndpoint", f"{args.name}.reader.example.com")
+        outputs.setdefault("primaryEndpointAddress", f"{args.name}.cache.example.com")
+        outputs.setdefault("serviceUrl", f"{args.name}.awsapprunner.com")
+        outputs.update(self.outputs.get(args.typ, {}))
+        return f"{args.name}_id", outputs
+
+    def call(self, args):
+        if args.token == "aws:index/getAvailabilityZones:getAvailabilityZones":
+            return {"names": ["eu-central-1a", "eu-central-1b", "eu-central-1c"], "zoneIds": ["a", "b", "c"]}
+        return {}
+
+
+# reveal replaces the secrets in resource inputs with their values.
+def reveal(value):
+    if isinstance(value, dict):
+        if value.get(_special_sig_key) == _special_secret_sig:
+            return reveal(value["value"])
+        return {key: reveal(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [reveal(item) for item in value]
+    return value
+
+
+# Resource references make the mock monitor resolve outputs on another event loop, so they are turned off.
+class ProgramMonitor(MockMonitor):
+    def RegisterResource(self, request):
+        if request.retainOnDelete:
+            self.mocks.program.retained.add(request.name)
+        response = super().RegisterResource(request)
+        self.mocks.program.registrations[response.urn] = Registration(
+            request.type, request.name, request.custom, request.parent, set(request.dependencies)
+        )
+        return response
+
+    def SupportsFeature(self, request):
+        if request.id == "resourceReferences":
+            return type("SupportsFeatureResponse", (), {"hasSupport": False})
+        return super().SupportsFeature(request)
+
+    def GetDeploymentInfo(self, request):
+        features = [
+            feature
+            for feature in super().GetDeploymentInfo(request).supportedFeatures
+            if feature != resource_pb2.RESOURCE_MONITOR_FEATURE_RESOURCE_REFERENCES
+        ]
+        return resource_pb2.DeploymentInfo(supportedFeatures=features)
+
+
+# run_program runs src/__main__.py under Pulumi mocks with STACK_CONFIG and config on top, and returns the
+# resources it registered and its stack outputs.
+@pytest.fixture
+def run_program(monkeypatch):
+    def run(config=None, outputs=None):
+        program = Program()
+        exports = {}
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        stack_config.load_stack_config.cache_clear()
+        # A run that failed leaves a root stack resource waiting on the loop of that run
+        pulumi.runtime.settings.reset_options()
+        pulumi.runtime.set_all_config({**STACK_CONFIG, **(config or {})})
+        mocks = ProgramMocks(program, outputs or {})
+        pulumi.runtime.set_mocks(mocks, preview=True, monitor=ProgramMonitor(mocks))
+        monkeypatch.setattr(pulumi, "export", lambda name, value: exports.__setitem__(name, value))
+
+        runpy.run_path(os.path.join(SRC_DIR, "__main__.py"), run_name="__main__")
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(pulumi.runtime.stack.wait_for_rpcs())
+        for name, value in exports.items():
+            output = pulumi.Output.from_input(value)
+            program.exports[name] = loop.run_until_complete(output.future())
+        return program
+
+    yield run
+    stack_config.load_stack_config.cache_clear()
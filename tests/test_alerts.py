@@ -0,0 +1,134 @@
+import json
+
+import pytest
+
+from stack_config import StackConfigError
+
+QUEUE = "aws:sqs/queue:Queue"
+FUNCTION = "aws:lambda/function:Function"
+EVENT_SOURCE_MAPPING = "aws:lambda/eventSourceMapping:EventSourceMapping"
+SCHEDULE = "aws:scheduler/schedule:Schedule"
+ROLE_POLICY = "aws:iam/rolePolicy:RolePolicy"
+APP_RUNNER_SERVICE = "aws:apprunner/service:Service"
+TASK_DEFINITION = "aws:ecs/taskDefinition:TaskDefinition"
+QUEUE_URL = "https://sqs.eu-central-1.amazonaws.com/163636840347/weather-alerting-alerts"
+# A pool of 10 keeps the dispatcher, 10 workers and the backend within the connections of a db.t3.medium
+ALERTS_CONFIG = {"alerts:enabled": "true", "database:max_pool_size": "10"}
+QUEUE_OUTPUTS = {QUEUE: {"url": QUEUE_URL}}
+
+
+def functions(program):
+    return {function.name: function for function in program.of_type(FUNCTION)}
+
+
+def test_pipeline_is_off_by_default(run_program):
+    program = run_program()
+
+    assert program.of_type(QUEUE) == []
+    assert "AlertDispatcher" not in functions(program)
+    (service,) = program.of_type(APP_RUNNER_SERVICE)
+    environment = service.inputs["sourceConfiguration"]["imageRepository"]["imageConfiguration"]
+    assert "ALERTS_PIPELINE_ENABLED" not in environment["runtimeEnvironmentVariables"]
+
+
+def test_queue_redrives_to_the_dead_letter_queue(run_program):
+    program = run_program(ALERTS_CONFIG, QUEUE_OUTPUTS)
+
+    queue = program.named("weather-alerting-alerts")
+    dead_letter_queue = program.named("weather-alerting-alerts-dlq")
+    # Six times the worker timeout of 120 seconds
+    assert queue.inputs["visibilityTimeoutSeconds"] == 720
+    assert json.loads(queue.inputs["redrivePolicy"]) == {
+        "deadLetterTargetArn": "arn:aws:mock:eu-central-1:163636840347:weather-alerting-alerts-dlq",
+        "maxReceiveCount": 3,
+    }
+    assert dead_letter_queue.inputs["messageRetentionSeconds"] == 14 * 24 * 3600
+
+
+def test_dispatcher_and_worker_run_the_backend_image(run_program):
+    program = run_program(ALERTS_CONFIG, QUEUE_OUTPUTS)
+
+    dispatcher, worker = functions(program)["AlertDispatcher"], functions(program)["AlertWorker"]
+    assert dispatcher.inputs["imageConfig"]["commands"] == ["dist/alerts/lambda.dispatch"]
+    assert worker.inputs["imageConfig"]["commands"] == ["dist/alerts/lambda.evaluate"]
+    for function in (dispatcher, worker):
+        assert function.inputs["imageUri"] == "163636840347.dkr.ecr.eu-central-1.amazonaws.com/backend:latest"
+        variables = function.inputs["environment"]["variables"]
+        assert variables["ALERTS_QUEUE_URL"] == QUEUE_URL
+        assert variables["ALERTS_BATCH_SIZE"] == "100"
+        assert variables["ALERTS_PIPELINE_ENABLED"] == "true"
+        assert variables["SMTP_HOST"] == "smtp.example.com"
+    assert (dispatcher.inputs["timeout"], worker.inputs["timeout"]) == (60, 120)
+    assert worker.inputs["memorySize"] == 512
+
+
+def test_functions_run_the_image_architecture_of_app_runner(run_program):
+    program = run_program(ALERTS_CONFIG, QUEUE_OUTPUTS)
+
+    for function in functions(program).values():
+        if function.inputs.get("packageType") == "Image":
+            assert function.inputs["architectures"] == ["x86_64"]
+
+
+def test_functions_run_the_image_architecture_of_fargate(run_program):
+    fargate_config = {
+        "backend:compute": "ecs_fargate",
+        "backend:api_domain": "api.weather-alerting.example.com",
+        "backend:hosted_zone_id": "Z0123456789",
+    }
+    program = run_program({**ALERTS_CONFIG, **fargate_config}, QUEUE_OUTPUTS)
+
+    (task_definition,) = program.of_type(TASK_DEFINITION)
+    assert task_definition.inputs["runtimePlatform"]["cpuArchitecture"] == "ARM64"
+    for name in ("AlertDispatcher", "AlertWorker"):
+        assert functions(program)[name].inputs["architectures"] == ["arm64"]
+
+
+def test_worker_consumes_one_shard_per_invocation(run_program):
+    program = run_program({**ALERTS_CONFIG, "alerts:worker_concurrency": "25"}, QUEUE_OUTPUTS)
+
+    (mapping,) = program.of_type(EVENT_SOURCE_MAPPING)
+    assert mapping.inputs["batchSize"] == 1
+    assert mapping.inputs["functionResponseTypes"] == ["ReportBatchItemFailures"]
+    assert mapping.inputs["scalingConfig"] == {"maximumConcurrency": 25}
+    assert mapping.inputs["eventSourceArn"] == "arn:aws:mock:eu-central-1:163636840347:weather-alerting-alerts"
+
+
+def test_lambda_roles_only_get_their_queue_actions(run_program):
+    program = run_program(ALERTS_CONFIG, QUEUE_OUTPUTS)
+
+    def actions(name):
+        (statement,) = json.loads(program.named(name).inputs["policy"])["Statement"]
+        assert statement["Resource"] == "arn:aws:mock:eu-central-1:163636840347:weather-alerting-alerts"
+        return sorted(statement["Action"])
+
+    assert actions("AlertDispatcherRoleQueueAccess") == ["sqs:GetQueueAttributes", "sqs:SendMessage"]
+    assert actions("AlertWorkerRoleQueueAccess") == [
+        "sqs:ChangeMessageVisibility",
+        "sqs:DeleteMessage",
+        "sqs:GetQueueAttributes",
+        "sqs:ReceiveMessage",
+    ]
+
+
+def test_schedule_invokes_the_dispatcher_without_retries(run_program):
+    program = run_program({**ALERTS_CONFIG, "alerts:schedule_expression": "rate(5 minutes)"}, QUEUE_OUTPUTS)
+
+    (schedule,) = program.of_type(SCHEDULE)
+    assert schedule.inputs["scheduleExpression"] == "rate(5 minutes)"
+    assert schedule.inputs["target"]["arn"] == "arn:aws:mock:eu-central-1:163636840347:AlertDispatcher"
+    assert schedule.inputs["target"]["retryPolicy"] == {"maximumRetryAttempts": 0}
+
+
+@pytest.mark.parametrize(
+    "config, error",
+    [
+        ({"alerts:worker_concurrency": "1"}, "alerts:worker_concurrency must be between 2 and 1000"),
+        ({"alerts:schedule_expression": "every minute"}, "alerts:schedule_expression must be rate() or cron()"),
+        ({"alerts:worker_timeout_seconds": "901"}, "alerts:worker_timeout_seconds must be between 1 and 900"),
+    ],
+)
+def test_invalid_pipeline_config_is_rejected(run_program, config, error):
+    with pytest.raises(StackConfigError) as raised:
+        run_program({**ALERTS_CONFIG, **config})
+    assert error in str(raised.value)
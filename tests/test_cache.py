@@ -0,0 +1,23 @@
+REPLICATION_GROUP = "aws:elasticache/replicationGroup:ReplicationGroup"
+APP_RUNNER_SERVICE = "aws:apprunner/service:Service"
+
+
+def environment_variables(program):
+    (service,) = program.of_type(APP_RUNNER_SERVICE)
+    return service.inputs["sourceConfiguration"]["imageRepository"]["imageConfiguration"]["runtimeEnvironmentVariables"]
+
+
+def test_cache_is_opt_in(run_program):
+    program = run_program()
+
+    assert not program.of_type(REPLICATION_GROUP)
+    assert "CACHE_URL" not in environment_variables(program)
+
+
+def test_enabled_cache_is_passed_to_the_backend(run_program):
+    program = run_program({"cache:enabled": "true", "cache:ttl_seconds": "300"})
+
+    (replication_group,) = program.of_type(REPLICATION_GROUP)
+    variables = environment_variables(program)
+    assert replication_group.name in variables["CACHE_URL"]
+    assert variables["CACHE_TTL_SECONDS"] == "300"
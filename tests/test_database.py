@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from stack_config import StackConfigError
+
+PARAMETER_GROUP = "aws:docdb/clusterParameterGroup:ClusterParameterGroup"
+CLUSTER = "aws:docdb/cluster:Cluster"
+INSTANCE = "aws:docdb/clusterInstance:ClusterInstance"
+# The engine names the parameter group, the mocks give it this name.
+PARAMETER_GROUP_OUTPUTS = {PARAMETER_GROUP: {"name": "mongodbclusterparametergroup-1a2b3c"}}
+
+
+def parameters(program):
+    (parameter_group,) = program.of_type(PARAMETER_GROUP)
+    return {
+        parameter["name"]: (parameter["value"], parameter["applyMethod"])
+        for parameter in parameter_group.inputs["parameters"]
+    }
+
+
+def test_cluster_uses_the_managed_parameter_group(run_program):
+    program = run_program(outputs=PARAMETER_GROUP_OUTPUTS)
+
+    (parameter_group,) = program.of_type(PARAMETER_GROUP)
+    assert parameter_group.inputs["family"] == "docdb3.6"
+    assert parameters(program) == {
+        "audit_logs": ("disabled", "immediate"),
+        "profiler": ("enabled", "immediate"),
+        "profiler_sampling_rate": ("1.0", "immediate"),
+        "profiler_threshold_ms": ("100", "immediate"),
+        "tls": ("enabled", "pending-reboot"),
+        "ttl_monitor": ("enabled", "immediate"),
+    }
+    (cluster,) = program.of_type(CLUSTER)
+    assert cluster.inputs["dbClusterParameterGroupName"] == "mongodbclusterparametergroup-1a2b3c"
+    assert cluster.inputs["enabledCloudwatchLogsExports"] == ["profiler"]
+    assert cluster.inputs["applyImmediately"] is False
+
+
+def test_instances_get_performance_insights(run_program):
+    program = run_program({"database:instances_number": "2"})
+
+    instances = program.of_type(INSTANCE)
+    assert len(instances) == 2
+    assert all(instance.inputs["enablePerformanceInsights"] is True for instance in instances)
+    assert all(instance.inputs["applyImmediately"] is False for instance in instances)
+
+
+def test_cluster_parameters_override_the_defaults(run_program):
+    program = run_program(
+        {
+            "database:mongodb_version": "5.0.0",
+            "database:cluster_parameters": json.dumps({"profiler": "disabled", "audit_logs": "enabled"}),
+            "database:performance_insights": "false",
+            "database:apply_immediately": "true",
+        }
+    )
+
+    (parameter_group,) = program.of_type(PARAMETER_GROUP)
+    assert parameter_group.inputs["family"] == "docdb5.0"
+    assert parameters(program)["profiler"] == ("disabled", "immediate")
+    assert parameters(program)["audit_logs"] == ("enabled", "immediate")
+    (cluster,) = program.of_type(CLUSTER)
+    assert cluster.inputs["enabledCloudwatchLogsExports"] == ["audit"]
+    assert cluster.inputs["applyImmediately"] is True
+    assert all(instance.inputs["enablePerformanceInsights"] is False for instance in program.of_type(INSTANCE))
+
+
+def test_unsupported_engine_version_is_rejected(run_program):
+    with pytest.raises(StackConfigError, match="database:mongodb_version must be one of"):
+        run_program({"database:mongodb_version": "6.0.0"})
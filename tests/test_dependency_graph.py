@@ -0,0 +1,134 @@
+import functools
+
+import pytest
+
+from component import COMPONENT_TYPE_PREFIX
+from stack_config import COMPONENT_DEPENDENCIES
+
+# Every optional component enabled, so the graph has all of them
+ALL_COMPONENTS_CONFIG = {
+    "alerts:enabled": "true",
+    "api_edge:enabled": "true",
+    "backend:auto_scaling_max_instances": "3",
+    "cache:enabled": "true",
+    "database:max_pool_size": "10",
+    "email:enabled": "true",
+    "email:from_address": "alerts@weather-alerting.example.com",
+    "monitoring:enabled": "true",
+    "warm_capacity:enabled": "true",
+}
+# Components of WeatherAlerting:components, by the class they are built with.
+COMPONENT_CLASSES = {
+    "Networking": "networking",
+    "Database": "database",
+    "Cache": "cache",
+    "EmailDelivery": "email",
+    "Backend": "backend",
+    "AlertEvaluation": "alerts",
+    "ApiEdge": "api_edge",
+    "WarmCapacity": "warm_capacity",
+    "Frontend": "frontend",
+    "Monitoring": "monitoring",
+}
+# Resources registered at the stack root on purpose, shared by several components.
+ROOT_RESOURCES = {"GithubProvider"}
+# Dependencies outside COMPONENT_DEPENDENCIES: the email component registers the queue access policies of the
+# roles using its queues, and the frontend points its config.json at the API when it is built alongside it.
+UNDECLARED_DEPENDENCIES = {"email": {"backend", "alerts"}, "frontend": {"api_edge"}}
+# Resource types that only need their own inputs, so they must not wait on each other.
+INDEPENDENT_RESOURCE_TYPES = {"aws:s3/bucket:Bucket", "aws:docdb/cluster:Cluster", "aws:iam/role:Role"}
+
+
+class ComponentGraph:
+    def __init__(self, registrations):
+        self.registrations = registrations
+
+    # component is the component a resource is part of, None for the stack root.
+    def component(self, urn):
+        while urn in self.registrations:
+            registration = self.registrations[urn]
+            if registration.type.startswith(f"{COMPONENT_TYPE_PREFIX}:"):
+                return COMPONENT_CLASSES[registration.type.split(":")[-1]]
+            urn = registration.parent
+        return None
+
+    def urns_of(self, resource_types):
+        return [urn for urn, registration in self.registrations.items() if registration.type in resource_types]
+
+    # dependencies are the components the resources of component wait on.
+    def dependencies(self, component):
+        return {
+            self.component(dependency)
+            for urn, registration in self.registrations.items()
+            if self.component(urn) == component
+            for dependency in registration.dependencies
+            if self.component(dependency) not in (component, None)
+        }
+
+    @functools.lru_cache(maxsize=None)
+    def transitive_dependencies(self, urn):
+        dependencies = set()
+        for dependency in self.registrations[urn].dependencies:
+            if dependency in self.registrations:
+                dependencies |= {dependency} | self.transitive_dependencies(dependency)
+        return frozenset(dependencies)
+
+
+def declared_closure(component):
+    closure = set()
+    for dependency in COMPONENT_DEPENDENCIES[component]:
+        closure |= {dependency} | declared_closure(dependency)
+    return closure
+
+
+@pytest.fixture
+def graph(run_program):
+    return ComponentGraph(run_program(ALL_COMPONENTS_CONFIG).registrations)
+
+
+def test_components_are_children_of_the_stack(graph):
+    components = {
+        graph.component(urn): registration
+        for urn, registration in graph.registrations.items()
+        if registration.type.startswith(f"{COMPONENT_TYPE_PREFIX}:")
+    }
+
+    assert set(components) == set(COMPONENT_DEPENDENCIES)
+    for registration in components.values():
+        assert registration.parent.endswith("::pulumi:pulumi:Stack::project-stack")
+
+
+def test_resources_are_part_of_a_component(graph):
+    outside = [
+        registration.name
+        for urn, registration in graph.registrations.items()
+        if registration.custom and graph.component(urn) is None
+    ]
+
+    assert set(outside) == ROOT_RESOURCES
+
+
+@pytest.mark.parametrize("component", sorted(COMPONENT_DEPENDENCIES))
+def test_components_only_wait_on_their_declared_dependencies(graph, component):
+    allowed = declared_closure(component) | UNDECLARED_DEPENDENCIES.get(component, set())
+
+    assert graph.dependencies(component) <= allowed
+
+
+def test_consumers_wait_on_the_components_they_are_built_from(graph):
+    assert graph.dependencies("backend") == set(COMPONENT_DEPENDENCIES["backend"])
+    assert graph.dependencies("monitoring") == set(COMPONENT_DEPENDENCIES["monitoring"])
+
+
+def test_independent_components_do_not_wait_on_each_other(graph):
+    assert graph.dependencies("networking") == set()
+    assert graph.dependencies("database") == {"networking"}
+    assert graph.dependencies("cache") == {"networking"}
+    assert not graph.dependencies("frontend") & {"networking", "database", "cache"}
+
+
+def test_independent_resources_do_not_wait_on_each_other(graph):
+    independent = set(graph.urns_of(INDEPENDENT_RESOURCE_TYPES))
+
+    for urn in independent:
+        assert not graph.transitive_dependencies(urn) & independent, graph.registrations[urn].name
@@ -0,0 +1,152 @@
+import json
+import os
+import shutil
+import textwrap
+import threading
+from types import SimpleNamespace
+
+import pytest
+from pulumi import automation as auto
+from pulumi.automation import events
+
+import deploy_stacks
+from stack_config import LAYERS
+
+
+def resource_event(op, name):
+    metadata = events.StepEventMetadata(
+        op=op,
+        urn=f"urn:pulumi:dev::WeatherAlerting::aws:s3/bucket:Bucket::{name}",
+        type="aws:s3/bucket:Bucket",
+        provider="",
+    )
+    return events.EngineEvent(sequence=0, timestamp=0, resource_pre_event=events.ResourcePreEvent(metadata=metadata))
+
+
+# StandInStack previews and updates like a stack of the Automation API, sending a create and a same event, and
+# fails if its name is one of failing.
+class StandInStack:
+    def __init__(self, name, failing):
+        self.name = name
+        self.failing = failing
+
+    def run(self, on_event):
+        on_event(resource_event(auto.OpType.CREATE, "Bucket"))
+        on_event(resource_event(auto.OpType.SAME, "Unchanged"))
+        if self.name in self.failing:
+            raise auto.CommandError(f"code: 255\nstdout: \nstderr: error: update of {self.name} failed")
+
+    def preview(self, on_event, color):
+        self.run(on_event)
+        return SimpleNamespace(change_summary={auto.OpType.CREATE: 1, auto.OpType.SAME: 4})
+
+    def up(self, on_event, color):
+        self.run(on_event)
+        return SimpleNamespace(summary=SimpleNamespace(resource_changes={"create": 1, "same": 4}))
+
+
+# SelectedStacks are the names and workspace environments of the stacks selected, in selection order, and the
+# stacks that fail.
+class SelectedStacks(list):
+    failing = ()
+
+
+@pytest.fixture
+def selected(monkeypatch):
+    selected = SelectedStacks()
+    lock = threading.Lock()
+
+    def select_stack(stack_name, work_dir, opts):
+        with lock:
+            selected.append((stack_name, opts.env_vars))
+        return StandInStack(stack_name, selected.failing)
+
+    monkeypatch.setattr(deploy_stacks.auto, "select_stack", select_stack)
+    return selected
+
+
+def test_waves_run_the_layers_of_every_stack_lowest_first():
+    assert deploy_stacks.waves(["dev", "prod"]) == [["dev", "prod"]]
+    assert deploy_stacks.waves(["dev", "prod"], layers=True) == [[f"dev-{layer}", f"prod-{layer}"] for layer in LAYERS]
+
+
+def test_preview_reports_the_changes_of_every_stack(selected, capsys):
+    deployment = deploy_stacks.Deployment("preview", "/work", backend_url="file:///tmp/state", workers=2)
+
+    results = deployment.run(deploy_stacks.waves(["dev", "prod"]))
+
+    assert [(result.stack, result.status, result.resource_changes) for result in results] == [
+        ("dev", "succeeded", {"create": 1, "same": 4}),
+        ("prod", "succeeded", {"create": 1, "same": 4}),
+    ]
+    assert sorted(selected) == [
+        ("dev", {"PULUMI_BACKEND_URL": "file:///tmp/state"}),
+        ("prod", {"PULUMI_BACKEND_URL": "file:///tmp/state"}),
+    ]
+    output = capsys.readouterr().out
+    assert "[dev] create Bucket (aws:s3/bucket:Bucket)" in output
+    assert "Unchanged" not in output
+
+
+def test_up_reports_the_changes_of_the_update(selected):
+    results = deploy_stacks.Deployment("up", "/work", workers=1).run([["dev"]])
+
+    assert results[0].status == "succeeded"
+    assert results[0].resource_changes == {"create": 1, "same": 4}
+    assert selected == [("dev", None)]
+
+
+def test_failure_stops_the_stacks_not_yet_started(selected):
+    selected.failing = ("dev-network",)
+    deployment = deploy_stacks.Deployment("up", "/work", workers=1)
+
+    results = deployment.run(deploy_stacks.waves(["dev"], layers=True))
+
+    assert [(result.stack, result.status) for result in results] == [
+        (f"dev-{layer}", "failed" if layer == "network" else "skipped") for layer in LAYERS
+    ]
+    assert results[0].error == "stderr: error: update of dev-network failed"
+    assert [stack_name for stack_name, _ in selected] == ["dev-network"]
+    assert deployment.failed.is_set()
+
+
+@pytest.mark.skipif(shutil.which("pulumi") is None, reason="needs the Pulumi CLI")
+def test_update_against_a_file_backend(tmp_path, monkeypatch):
+    work_dir = tmp_path / "project"
+    work_dir.mkdir()
+    (work_dir / "Pulumi.yaml").write_text("name: deploy-stacks-test\nruntime: python\n")
+    (work_dir / "__main__.py").write_text(
+        textwrap.dedent(
+            """
+            import pulumi
+
+            pulumi.export("stack", pulumi.get_stack())
+            """
+        )
+    )
+    backend_url = f"file://{tmp_path / 'state'}"
+    (tmp_path / "state").mkdir()
+    monkeypatch.setenv("PULUMI_CONFIG_PASSPHRASE", "test")
+    for stack_name in ("dev", "prod"):
+        auto.create_stack(
+            stack_name,
+            work_dir=str(work_dir),
+            opts=auto.LocalWorkspaceOptions(env_vars={"PULUMI_BACKEND_URL": backend_url}),
+        )
+    report_path = tmp_path / "report.json"
+    monkeypatch.setattr(
+        "sys.argv",
+        ["deploy_stacks.py", "dev", "prod", "--up", "--backend-url", backend_url, "--work-dir", str(work_dir)]
+        + ["--report", str(report_path)],
+    )
+
+    with pytest.raises(SystemExit) as exit_info:
+        deploy_stacks.main()
+
+    assert exit_info.value.code == 0
+    report = json.loads(report_path.read_text())
+    assert [(stack["stack"], stack["status"]) for stack in report["stacks"]] == [
+        ("dev", "succeeded"),
+        ("prod", "succeeded"),
+    ]
+    assert os.path.isdir(tmp_path / "state" / ".pulumi")
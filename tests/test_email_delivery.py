@@ -0,0 +1,40 @@
+import json
+
+EMAIL_CONFIG = {"email:enabled": "true", "email:from_address": "alerts@weather-alerting.example.com"}
+QUEUE = "aws:sqs/queue:Queue"
+
+
+def sender_access(program):
+    return json.loads(program.named("EmailSenderAccess").inputs["policy"])["Statement"]
+
+
+def test_email_queue_redrives_to_the_dead_letter_queue(run_program):
+    program = run_program({**EMAIL_CONFIG, "email:max_receive_count": "3"})
+
+    redrive_policy = json.loads(program.named("weather-alerting-email").inputs["redrivePolicy"])
+    assert redrive_policy["deadLetterTargetArn"].endswith(":weather-alerting-email-dlq")
+    assert redrive_policy["maxReceiveCount"] == 3
+
+
+def test_sender_can_move_malformed_messages_to_the_dead_letter_queue(run_program):
+    program = run_program(EMAIL_CONFIG, outputs={QUEUE: {"url": "https://sqs.mock"}})
+
+    variables = program.named("EmailSender").inputs["environment"]["variables"]
+    assert variables["DEAD_LETTER_QUEUE_URL"] == "https://sqs.mock"
+    assert {
+        "Action": "sqs:SendMessage",
+        "Effect": "Allow",
+        "Resource": "arn:aws:mock:eu-central-1:163636840347:weather-alerting-email-dlq",
+    } in sender_access(program)
+
+
+def test_sender_timeout_covers_a_paced_batch(run_program):
+    program = run_program(
+        {**EMAIL_CONFIG, "email:batch_size": "10", "email:max_send_rate": "2", "email:sender_concurrency": "2"}
+    )
+
+    sender = program.named("EmailSender")
+    assert sender.inputs["environment"]["variables"]["SES_MAX_SEND_RATE"] == "1.0"
+    # 10 emails at 1 per second, plus the margin to start and report the batch
+    assert sender.inputs["timeout"] == 40
+    assert program.named("weather-alerting-email").inputs["visibilityTimeoutSeconds"] == 240
@@ -0,0 +1,130 @@
+import importlib.util
+import json
+import os
+
+import pytest
+from botocore.exceptions import ClientError
+
+HANDLER_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "functions",
+    "email_sender",
+    "handler.py",
+)
+DEAD_LETTER_QUEUE_URL = "https://sqs.eu-central-1.amazonaws.com/163636840347/weather-alerting-email-dlq"
+EMAIL = {"to": ["user@example.com"], "subject": "Storm warning", "html": "<p>Storm</p>", "text": "Storm"}
+
+
+def ses_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "SendEmail")
+
+
+# StandInSes sends every email, unless the first recipient has an error in errors, which is raised instead.
+class StandInSes:
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.sent = []
+
+    def send_email(self, FromEmailAddress, Destination, Content, ConfigurationSetName):
+        error = self.errors.get(Destination["ToAddresses"][0])
+        if error:
+            raise error
+        self.sent.append(Destination["ToAddresses"])
+
+
+class StandInSqs:
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, QueueUrl, MessageBody):
+        self.messages.append((QueueUrl, MessageBody))
+
+
+def records(*bodies):
+    return {
+        "Records": [
+            {"messageId": f"message-{index}", "body": body if isinstance(body, str) else json.dumps(body)}
+            for index, body in enumerate(bodies)
+        ]
+    }
+
+
+def email_to(address):
+    return {**EMAIL, "to": [address]}
+
+
+@pytest.fixture
+def sender(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-central-1")
+    monkeypatch.setenv("SEND_EMAILS", "true")
+    monkeypatch.setenv("SES_MAX_SEND_RATE", "14")
+    monkeypatch.setenv("EMAIL_FROM_ADDRESS", "alerts@example.com")
+    monkeypatch.setenv("SES_CONFIGURATION_SET", "WeatherAlertingEmails")
+    monkeypatch.setenv("DEAD_LETTER_QUEUE_URL", DEAD_LETTER_QUEUE_URL)
+    spec = importlib.util.spec_from_file_location("email_sender_handler", HANDLER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module.time, "sleep", lambda seconds: None)
+    module.ses = StandInSes()
+    module.sqs = StandInSqs()
+    return module
+
+
+def test_batch_is_sent(sender):
+    event = records(email_to("a@example.com"), email_to("b@example.com"))
+
+    assert sender.handler(event, None) == {"batchItemFailures": []}
+    assert sender.ses.sent == [["a@example.com"], ["b@example.com"]]
+
+
+def test_retryable_error_only_fails_its_message(sender):
+    sender.ses = StandInSes({"b@example.com": ses_error("TooManyRequestsException")})
+    event = records(email_to("a@example.com"), email_to("b@example.com"), email_to("c@example.com"))
+
+    assert sender.handler(event, None) == {"batchItemFailures": [{"itemIdentifier": "message-1"}]}
+    assert sender.ses.sent == [["a@example.com"], ["c@example.com"]]
+
+
+def test_permanent_rejection_is_dropped(sender):
+    sender.ses = StandInSes({"a@example.com": ses_error("MessageRejected")})
+
+    assert sender.handler(records(email_to("a@example.com"), email_to("b@example.com")), None) == {
+        "batchItemFailures": []
+    }
+    assert sender.ses.sent == [["b@example.com"]]
+    assert sender.sqs.messages == []
+
+
+def test_unexpected_error_only_fails_its_message(sender):
+    sender.ses = StandInSes({"a@example.com": ConnectionError("connection reset")})
+
+    assert sender.handler(records(email_to("a@example.com"), email_to("b@example.com")), None) == {
+        "batchItemFailures": [{"itemIdentifier": "message-0"}]
+    }
+    assert sender.ses.sent == [["b@example.com"]]
+
+
+@pytest.mark.parametrize("body", ["{not json", '["a@example.com"]', {"subject": "No recipients"}, {"to": ["a@b.c"]}])
+def test_malformed_message_moves_to_the_dead_letter_queue(sender, body):
+    event = records(body, email_to("b@example.com"))
+
+    assert sender.handler(event, None) == {"batchItemFailures": []}
+    assert sender.sqs.messages == [(DEAD_LETTER_QUEUE_URL, event["Records"][0]["body"])]
+    assert sender.ses.sent == [["b@example.com"]]
+
+
+def test_malformed_message_is_retried_when_the_dead_letter_queue_fails(sender):
+    def send_message(QueueUrl, MessageBody):
+        raise ClientError({"Error": {"Code": "AccessDenied", "Message": "denied"}}, "SendMessage")
+
+    sender.sqs.send_message = send_message
+
+    assert sender.handler(records("{not json"), None) == {"batchItemFailures": [{"itemIdentifier": "message-0"}]}
+
+
+def test_emails_are_dropped_when_sending_is_off(sender, monkeypatch):
+    monkeypatch.setenv("SEND_EMAILS", "false")
+
+    assert sender.handler(records(email_to("a@example.com")), None) == {"batchItemFailures": []}
+    assert sender.ses.sent == []
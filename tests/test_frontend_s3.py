@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+BUCKET_POLICY = "aws:s3/bucketPolicy:BucketPolicy"
+PUBLISH_KEYS = [
+    "arn:aws:s3:::163636840347-weather-alerting-frontend/_publish/*",
+    "arn:aws:s3:::163636840347-weather-alerting-frontend/.publish-manifest.json",
+]
+
+
+def bucket_policy_statements(program):
+    (policy,) = program.of_type(BUCKET_POLICY)
+    return {statement["Sid"]: statement for statement in json.loads(policy.inputs["policy"])["Statement"]}
+
+
+@pytest.mark.parametrize(
+    "cdn_enabled, readers, conditions",
+    [
+        ("true", {"Service": "cloudfront.amazonaws.com"}, None),
+        ("false", "*", {"Null": {"aws:PrincipalArn": "true"}}),
+    ],
+)
+def test_site_readers_can_not_read_the_publish_manifest(run_program, cdn_enabled, readers, conditions):
+    statements = bucket_policy_statements(run_program({"frontend:cdn_enabled": cdn_enabled}))
+
+    deny = statements["DenyReadPublishKeys"]
+    assert deny["Effect"] == "Deny"
+    assert deny["Action"] == "s3:GetObject"
+    assert deny["Principal"] == readers
+    assert sorted(deny["Resource"]) == sorted(PUBLISH_KEYS)
+    assert deny.get("Condition") == conditions
@@ -0,0 +1,150 @@
+import asyncio
+import os
+
+import pulumi
+import pytest
+
+from iam_policy import Condition, Principal, Statement, policy_document
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "iam_policy")
+ACCOUNT_ID = "163636840347"
+
+# Documents shaped like those of the stack. The golden files hold their JSON in the layout of the provider's
+# aws_iam_policy_document: two-space indents, single values as strings, reverse-sorted sets, escaped HTML.
+DOCUMENTS = {
+    "service_assume_role": dict(
+        statements=[
+            Statement(
+                actions=("sts:AssumeRole",),
+                effect="Allow",
+                principals=(Principal(type="Service", identifiers=("build.apprunner.amazonaws.com",)),),
+            )
+        ]
+    ),
+    "github_web_identity": dict(
+        statements=[
+            Statement(
+                sid="GithubActionsPutToFrontendBucket",
+                actions=("sts:AssumeRoleWithWebIdentity",),
+                effect="Allow",
+                principals=(
+                    Principal(
+                        type="Federated",
+                        identifiers=(f"arn:aws:iam::{ACCOUNT_ID}:oidc-provider/token.actions.githubusercontent.com",),
+                    ),
+                ),
+                conditions=(
+                    Condition(
+                        test="StringLike",
+                        variable="token.actions.githubusercontent.com:sub",
+                        values=("repo:WeatherAlertingSystem/WeatherAlerting-Frontend:*",),
+                    ),
+                ),
+            )
+        ],
+        policy_id="AmazonS3PutFrontendBucket",
+    ),
+    "multiple_actions_and_resources": dict(
+        statements=[
+            Statement(
+                sid="GithubActionsPutToFrontendBucket",
+                actions=("s3:PutObject", "s3:GetObject", "s3:ListBucket", "s3:GetObject"),
+                effect="Allow",
+                resources=(
+                    "arn:aws:s3:::163636840347-weather-alerting-frontend",
+                    "arn:aws:s3:::163636840347-weather-alerting-frontend/*",
+                ),
+            ),
+            Statement(actions=("ecr:GetAuthorizationToken",), effect="Allow", resources=("*",)),
+        ],
+        policy_id="AmazonS3PutFrontendBucket",
+    ),
+    "public_read_with_deny": dict(
+        statements=[
+            Statement(
+                sid="PublicReadGetObject",
+                actions=("s3:GetObject",),
+                effect="Allow",
+                principals=(Principal(type="*", identifiers=("*",)),),
+                resources=("arn:aws:s3:::163636840347-weather-alerting-frontend/*",),
+            ),
+            Statement(
+                sid="DenyReadPublishKeys",
+                actions=("s3:GetObject",),
+                effect="Deny",
+                principals=(Principal(type="*", identifiers=("*",)),),
+                resources=(
+                    "arn:aws:s3:::163636840347-weather-alerting-frontend/_publish/*",
+                    "arn:aws:s3:::163636840347-weather-alerting-frontend/.publish-manifest.json",
+                ),
+                conditions=(Condition(test="Null", variable="aws:PrincipalArn", values=("true",)),),
+            ),
+        ]
+    ),
+    "several_principals_and_conditions": dict(
+        statements=[
+            Statement(
+                actions=("sqs:SendMessage",),
+                effect="Allow",
+                principals=(
+                    Principal(type="Service", identifiers=("scheduler.amazonaws.com", "events.amazonaws.com")),
+                    Principal(type="AWS", identifiers=(f"arn:aws:iam::{ACCOUNT_ID}:root",)),
+                ),
+                resources=(f"arn:aws:sqs:eu-central-1:{ACCOUNT_ID}:weather-alerts",),
+                conditions=(
+                    Condition(test="StringEquals", variable="aws:SourceAccount", values=(ACCOUNT_ID,)),
+                    Condition(
+                        test="ArnLike",
+                        variable="aws:SourceArn",
+                        values=(
+                            f"arn:aws:scheduler:eu-central-1:{ACCOUNT_ID}:schedule/default/*",
+                            f"arn:aws:events:eu-central-1:{ACCOUNT_ID}:rule/*",
+                        ),
+                    ),
+                    Condition(test="StringEquals", variable="aws:PrincipalAccount", values=(ACCOUNT_ID,)),
+                ),
+            )
+        ]
+    ),
+    "html_characters": dict(
+        statements=[
+            Statement(
+                actions=("ses:SendEmail",),
+                effect="Allow",
+                resources=("*",),
+                conditions=(
+                    Condition(
+                        test="StringLike",
+                        variable="ses:FromAddress",
+                        values=("Weather Alerting <alerts@weather-alerting.example.com>", "a&b@example.com"),
+                    ),
+                ),
+            )
+        ]
+    ),
+}
+
+
+def golden(name):
+    with open(os.path.join(GOLDEN_DIR, f"{name}.json")) as golden_file:
+        return golden_file.read().rstrip("\n")
+
+
+@pytest.mark.parametrize("name", sorted(DOCUMENTS))
+def test_document_matches_provider_rendering(name):
+    assert policy_document(**DOCUMENTS[name]) == golden(name)
+
+
+def test_document_with_outputs_resolves_to_the_same_json():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    statement = DOCUMENTS["service_assume_role"]["statements"][0]
+    principal = Principal(type="Service", identifiers=(pulumi.Output.from_input("build.apprunner.amazonaws.com"),))
+    document = policy_document(statements=[Statement(actions=statement.actions, principals=(principal,))])
+
+    assert isinstance(document, pulumi.Output)
+    assert loop.run_until_complete(document.future()) == golden("service_assume_role")
+
+
+def test_identical_documents_render_once():
+    assert policy_document(**DOCUMENTS["service_assume_role"]) is policy_document(**DOCUMENTS["service_assume_role"])
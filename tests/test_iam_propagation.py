@@ -0,0 +1,130 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import boto3
+import pulumi
+import pytest
+
+import iam_propagation
+from iam_propagation import RolePropagationTimeoutError, provider_iam_client, wait_for_role_propagation
+
+ROLE_ARN = "arn:aws:iam::123456789012:role/AppRunnerAccessToECR"
+ACTIONS = ("ecr:BatchGetImage", "ecr:GetAuthorizationToken")
+
+
+class NoSuchEntityException(Exception):
+    pass
+
+
+# StandInIam serves the role after missing_reads calls of get_role and denies every action for the first
+# denied_simulations simulations, like IAM while a new role propagates.
+class StandInIam:
+    exceptions = type("Exceptions", (), {"NoSuchEntityException": NoSuchEntityException})
+
+    def __init__(self, age_seconds=3600, missing_reads=0, denied_simulations=0):
+        self.created = datetime.now(timezone.utc) - timedelta(seconds=age_seconds)
+        self.missing_reads = missing_reads
+        self.denied_simulations = denied_simulations
+        self.get_role_calls = 0
+        self.simulations = []
+
+    def get_role(self, RoleName):
+        self.get_role_calls += 1
+        if self.get_role_calls <= self.missing_reads:
+            raise NoSuchEntityException(RoleName)
+        return {"Role": {"RoleName": RoleName, "Arn": ROLE_ARN, "CreateDate": self.created}}
+
+    def simulate_principal_policy(self, PolicySourceArn, ActionNames):
+        self.simulations.append((PolicySourceArn, ActionNames))
+        decision = "implicitDeny" if len(self.simulations) <= self.denied_simulations else "allowed"
+        return {"EvaluationResults": [{"EvalActionName": name, "EvalDecision": decision} for name in ActionNames]}
+
+
+class StandInConfig:
+    values = {"profile": "weather-alerting", "region": "eu-central-1"}
+
+    def get(self, key):
+        return self.values.get(key)
+
+
+@pytest.fixture(autouse=True)
+def update(monkeypatch):
+    monkeypatch.setattr(pulumi.runtime, "is_dry_run", lambda: False)
+
+
+def wait(iam_client, **options):
+    options = {"deadline_seconds": 2, "initial_delay_seconds": 0.01, "max_delay_seconds": 0.05, **options}
+    return asyncio.run(wait_for_role_propagation(ROLE_ARN, actions=ACTIONS, iam_client=iam_client, **options))
+
+
+def test_preview_does_not_call_iam(monkeypatch):
+    monkeypatch.setattr(pulumi.runtime, "is_dry_run", lambda: True)
+    iam_client = StandInIam()
+
+    assert wait(iam_client) == ROLE_ARN
+    assert iam_client.get_role_calls == 0
+
+
+def test_settled_role_resolves_after_one_check():
+    iam_client = StandInIam()
+
+    assert wait(iam_client) == ROLE_ARN
+    assert iam_client.get_role_calls == 1
+    assert iam_client.simulations == [(ROLE_ARN, list(ACTIONS))]
+
+
+def test_new_role_waits_for_settle_time():
+    iam_client = StandInIam(age_seconds=0)
+    started_at = time.monotonic()
+
+    assert wait(iam_client, settle_seconds=0.3) == ROLE_ARN
+    assert time.monotonic() - started_at >= 0.3
+    assert len(iam_client.simulations) == 1
+
+
+def test_consistent_reads_alone_do_not_resolve():
+    iam_client = StandInIam(denied_simulations=3)
+
+    assert wait(iam_client) == ROLE_ARN
+    assert len(iam_client.simulations) == 4
+
+
+def test_missing_role_is_polled():
+    iam_client = StandInIam(missing_reads=2)
+
+    assert wait(iam_client) == ROLE_ARN
+    assert iam_client.get_role_calls == 3
+    assert len(iam_client.simulations) == 1
+
+
+def test_role_never_allowed_times_out():
+    iam_client = StandInIam(denied_simulations=1000)
+
+    with pytest.raises(RolePropagationTimeoutError):
+        wait(iam_client, deadline_seconds=0.2)
+
+
+def test_role_without_actions_is_not_simulated():
+    iam_client = StandInIam()
+
+    assert asyncio.run(wait_for_role_propagation(ROLE_ARN, iam_client=iam_client)) == ROLE_ARN
+    assert iam_client.simulations == []
+
+
+def test_provider_iam_client_uses_provider_profile_and_region(monkeypatch):
+    sessions = []
+
+    class Session:
+        def __init__(self, profile_name=None, region_name=None):
+            sessions.append((profile_name, region_name))
+
+        def client(self, service_name):
+            return service_name
+
+    monkeypatch.setattr(boto3, "Session", Session)
+    monkeypatch.setattr(iam_propagation.pulumi, "Config", lambda name: StandInConfig())
+
+    assert provider_iam_client() == "iam"
+    assert provider_iam_client("us-east-1") == "iam"
+    assert sessions == [("weather-alerting", "eu-central-1"), ("weather-alerting", "us-east-1")]
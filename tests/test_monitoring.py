@@ -0,0 +1,30 @@
+DASHBOARD = "aws:cloudwatch/dashboard:Dashboard"
+METRIC_ALARM = "aws:cloudwatch/metricAlarm:MetricAlarm"
+OBSERVABILITY_CONFIGURATION = "aws:apprunner/observabilityConfiguration:ObservabilityConfiguration"
+APP_RUNNER_SERVICE = "aws:apprunner/service:Service"
+
+
+def test_monitoring_and_tracing_are_opt_in(run_program):
+    program = run_program()
+
+    assert program.of_type(DASHBOARD) == []
+    assert program.of_type(METRIC_ALARM) == []
+    assert program.of_type(OBSERVABILITY_CONFIGURATION) == []
+    (service,) = program.of_type(APP_RUNNER_SERVICE)
+    assert "observabilityConfiguration" not in service.inputs
+
+
+def test_enabled_monitoring_creates_alarms_without_tracing(run_program):
+    program = run_program({"monitoring:enabled": "true"})
+
+    assert len(program.of_type(DASHBOARD)) == 1
+    assert program.of_type(METRIC_ALARM)
+    assert program.of_type(OBSERVABILITY_CONFIGURATION) == []
+
+
+def test_tracing_adds_x_ray_to_the_service(run_program):
+    program = run_program({"monitoring:enabled": "true", "monitoring:tracing": "true"})
+
+    (service,) = program.of_type(APP_RUNNER_SERVICE)
+    assert service.inputs["observabilityConfiguration"]["observabilityEnabled"] is True
+    assert len(program.of_type(OBSERVABILITY_CONFIGURATION)) == 1
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+CUSTOM_DOMAIN = "aws:apprunner/customDomainAssociation:CustomDomainAssociation"
+RECORD = "aws:route53/record:Record"
+# App Runner validates the certificates of one domain in one account with the same record.
+VALIDATION_RECORDS = [
+    {"name": "_1234.api.example.com.", "type": "CNAME", "value": "_5678.acm-validations.aws."},
+    {"name": "_abcd.2a57j78h5fsbzb7ey72hbx9c01pbxcf.api.example.com.", "type": "CNAME", "value": "_ef01.aws."},
+]
+MULTI_REGION_CONFIG = {
+    "multi_region:secondary_regions": json.dumps(["us-east-1", "ap-southeast-1"]),
+    "multi_region:api_domain": "api.example.com",
+    "multi_region:hosted_zone_id": "Z123",
+    "database:instance_class": "db.r6g.large",
+    "database:mongodb_version": "5.0.0",
+}
+
+
+def custom_domain_outputs(status="pending_certificate_dns_validation"):
+    return {CUSTOM_DOMAIN: {"status": status, "certificateValidationRecords": VALIDATION_RECORDS}}
+
+
+def validation_records(program):
+    return [resource for resource in program.of_type(RECORD) if resource.name.startswith("ApiCertificateValidation")]
+
+
+def test_every_region_serves_the_api_domain(run_program):
+    program = run_program(MULTI_REGION_CONFIG, custom_domain_outputs())
+
+    custom_domains = program.of_type(CUSTOM_DOMAIN)
+    assert [resource.name for resource in custom_domains] == [
+        "ApiCustomDomain-eu-central-1",
+        "ApiCustomDomain-us-east-1",
+        "ApiCustomDomain-ap-southeast-1",
+    ]
+    assert {resource.inputs["domainName"] for resource in custom_domains} == {"api.example.com"}
+
+
+def test_validation_records_are_exported_once_and_not_created_from_outputs(run_program):
+    program = run_program(MULTI_REGION_CONFIG, custom_domain_outputs())
+
+    assert program.exports["api_certificate_validation_records"] == VALIDATION_RECORDS
+    assert validation_records(program) == []
+
+
+def test_configured_validation_records_are_created(run_program):
+    config = {**MULTI_REGION_CONFIG, "multi_region:certificate_validation_records": json.dumps(VALIDATION_RECORDS)}
+    program = run_program(config, custom_domain_outputs())
+
+    records = validation_records(program)
+    assert [(record.name, record.inputs["name"], record.inputs["records"]) for record in records] == [
+        ("ApiCertificateValidation-_1234.api.example.com", "_1234.api.example.com.", ["_5678.acm-validations.aws."]),
+        (
+            "ApiCertificateValidation-_abcd.2a57j78h5fsbzb7ey72hbx9c01pbxcf.api.example.com",
+            "_abcd.2a57j78h5fsbzb7ey72hbx9c01pbxcf.api.example.com.",
+            ["_ef01.aws."],
+        ),
+    ]
+    assert {record.inputs["zoneId"] for record in records} == {"Z123"}
+
+
+def test_region_after_a_rejected_domain_is_not_associated(run_program):
+    with pytest.raises(Exception, match="did not accept api.example.com on the service in eu-central-1"):
+        run_program(MULTI_REGION_CONFIG, custom_domain_outputs(status="create_failed"))
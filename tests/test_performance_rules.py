@@ -0,0 +1,155 @@
+from types import SimpleNamespace
+
+import pytest
+
+from performance_rules import (
+    APP_RUNNER_AUTO_SCALING,
+    APP_RUNNER_SERVICE,
+    AWSX_VPC,
+    DOCUMENTDB_INSTANCE,
+    validate_auto_scaling,
+    validate_cron_frequency,
+    validate_database_instances,
+    validate_image_deployment,
+    validate_log_level,
+    validate_nat_gateways,
+)
+
+
+def service_props(environment=None, auto_deployments=True, image="backend:latest"):
+    return {
+        "sourceConfiguration": {
+            "autoDeploymentsEnabled": auto_deployments,
+            "imageRepository": {
+                "imageIdentifier": f"163636840347.dkr.ecr.eu-central-1.amazonaws.com/{image}",
+                "imageConfiguration": {"runtimeEnvironmentVariables": environment or {}},
+            },
+        }
+    }
+
+
+def violations(validate, resource_type, props):
+    reported = []
+    validate(SimpleNamespace(resource_type=resource_type, props=props), lambda message: reported.append(message))
+    return reported
+
+
+@pytest.mark.parametrize(
+    "validate, resource_type, violating, compliant",
+    [
+        (
+            validate_log_level,
+            APP_RUNNER_SERVICE,
+            service_props({"LOG_LEVEL": "debug"}),
+            service_props({"LOG_LEVEL": "info"}),
+        ),
+        (
+            validate_cron_frequency,
+            APP_RUNNER_SERVICE,
+            service_props({"CRON_CONFIG": "* * * * *"}),
+            service_props({"CRON_CONFIG": "*/5 * * * *"}),
+        ),
+        (
+            validate_auto_scaling,
+            APP_RUNNER_AUTO_SCALING,
+            {"maxSize": 1},
+            {"maxSize": 4},
+        ),
+        (
+            validate_image_deployment,
+            APP_RUNNER_SERVICE,
+            service_props(auto_deployments=True, image="backend:latest"),
+            service_props(auto_deployments=False, image="backend:latest"),
+        ),
+        (
+            validate_nat_gateways,
+            AWSX_VPC,
+            {"natGateways": {"strategy": "Single"}},
+            {"natGateways": {"strategy": "OnePerAz"}},
+        ),
+    ],
+)
+def test_resource_rule(validate, resource_type, violating, compliant):
+    assert len(violations(validate, resource_type, violating)) == 1
+    assert violations(validate, resource_type, compliant) == []
+    # Rules only look at their own resource type
+    assert violations(validate, "aws:s3/bucket:Bucket", violating) == []
+
+
+@pytest.mark.parametrize(
+    "cron_config, violating",
+    [
+        ("* * * * *", True),
+        ("*/1 * * * *", True),
+        # node-cron's optional seconds field
+        ("0 * * * * *", True),
+        ("*/30 * * * * *", True),
+        ("0 */5 * * * *", False),
+        ("*/5 * * * *", False),
+        ("0 3 * * *", False),
+    ],
+)
+def test_cron_frequency(cron_config, violating):
+    assert (
+        bool(violations(validate_cron_frequency, APP_RUNNER_SERVICE, service_props({"CRON_CONFIG": cron_config})))
+        is violating
+    )
+
+
+def test_cron_frequency_is_ignored_with_the_alert_pipeline():
+    environment = {"CRON_CONFIG": "* * * * *", "ALERTS_PIPELINE_ENABLED": "true"}
+
+    assert violations(validate_cron_frequency, APP_RUNNER_SERVICE, service_props(environment)) == []
+
+
+def test_pinned_image_may_auto_deploy():
+    props = service_props(auto_deployments=True, image="backend:1.4.2")
+
+    assert violations(validate_image_deployment, APP_RUNNER_SERVICE, props) == []
+
+
+@pytest.mark.parametrize(
+    "validate, resource_type, props",
+    [
+        (validate_log_level, APP_RUNNER_SERVICE, {"sourceConfiguration": None}),
+        (validate_cron_frequency, APP_RUNNER_SERVICE, {}),
+        (validate_auto_scaling, APP_RUNNER_AUTO_SCALING, {"maxSize": None}),
+        (validate_image_deployment, APP_RUNNER_SERVICE, {"sourceConfiguration": {"autoDeploymentsEnabled": True}}),
+        (validate_nat_gateways, AWSX_VPC, {}),
+    ],
+)
+def test_properties_unknown_in_a_preview_are_not_violations(validate, resource_type, props):
+    assert violations(validate, resource_type, props) == []
+
+
+def stack(*instance_parents):
+    parents = {name: SimpleNamespace(urn=f"urn:pulumi:dev::WeatherAlerting::{name}") for name in set(instance_parents)}
+    return SimpleNamespace(
+        resources=[
+            SimpleNamespace(
+                resource_type=DOCUMENTDB_INSTANCE,
+                urn=f"urn:pulumi:dev::WeatherAlerting::cluster-instance-{index}",
+                parent=parents[parent],
+            )
+            for index, parent in enumerate(instance_parents)
+        ]
+        + [SimpleNamespace(resource_type="aws:docdb/cluster:Cluster", urn="urn:cluster", parent=None)]
+    )
+
+
+def database_violations(args):
+    reported = []
+    validate_database_instances(args, lambda message, urn: reported.append((message, urn)))
+    return reported
+
+
+def test_database_instances_rule():
+    (violation,) = database_violations(stack("database"))
+    assert violation[1] == "urn:pulumi:dev::WeatherAlerting::cluster-instance-0"
+    assert database_violations(stack("database", "database")) == []
+
+
+def test_database_instances_are_counted_per_cluster():
+    (violation,) = database_violations(stack("database", "database", "database-us-east-1"))
+
+    assert violation[1] == "urn:pulumi:dev::WeatherAlerting::cluster-instance-2"
@@ -0,0 +1,83 @@
+import hashlib
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from publish_frontend_assets import IMMUTABLE_CACHE_CONTROL, MANIFEST_KEY, REVALIDATE_CACHE_CONTROL, publish
+
+BUCKET = "163636840347-weather-alerting-frontend"
+INDEX_HTML = "<!doctype html><script src=main.3f2a1b4c5d6e7f80.js></script>" * 40
+MAIN_JS = "console.log('weather alerting');" * 100
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        s3_client = boto3.client("s3", region_name="eu-central-1")
+        s3_client.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "eu-central-1"})
+        yield s3_client
+
+
+@pytest.fixture
+def build_dir(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_text(INDEX_HTML)
+    (tmp_path / "main.3f2a1b4c5d6e7f80.js").write_text(MAIN_JS)
+    (tmp_path / "assets" / "config.json").write_text('{"backendApiUrl": "http://localhost"}')
+    return tmp_path
+
+
+def test_assets_are_uploaded_uncompressed_for_cloudfront_to_compress(s3_client, build_dir):
+    publish(build_dir, BUCKET, s3_client=s3_client)
+
+    index = s3_client.get_object(Bucket=BUCKET, Key="index.html")
+    assert index["Body"].read().decode() == INDEX_HTML
+    assert "ContentEncoding" not in index
+    assert index["ContentType"] == "text/html"
+    assert index["CacheControl"] == REVALIDATE_CACHE_CONTROL
+    bundle = s3_client.get_object(Bucket=BUCKET, Key="main.3f2a1b4c5d6e7f80.js")
+    assert bundle["Body"].read().decode() == MAIN_JS
+    assert "ContentEncoding" not in bundle
+    assert bundle["CacheControl"] == IMMUTABLE_CACHE_CONTROL
+
+
+def test_stack_managed_config_is_not_uploaded(s3_client, build_dir):
+    uploaded = publish(build_dir, BUCKET, s3_client=s3_client)
+
+    assert sorted(uploaded) == ["index.html", "main.3f2a1b4c5d6e7f80.js"]
+    with pytest.raises(s3_client.exceptions.NoSuchKey):
+        s3_client.get_object(Bucket=BUCKET, Key="assets/config.json")
+
+
+def test_manifest_is_kept_under_the_publish_prefix(s3_client, build_dir):
+    publish(build_dir, BUCKET, s3_client=s3_client)
+
+    assert MANIFEST_KEY.startswith("_publish/")
+    manifest = json.loads(s3_client.get_object(Bucket=BUCKET, Key=MANIFEST_KEY)["Body"].read())
+    assert sorted(manifest) == ["index.html", "main.3f2a1b4c5d6e7f80.js"]
+    keys = [item["Key"] for item in s3_client.list_objects_v2(Bucket=BUCKET)["Contents"]]
+    assert sorted(keys) == [MANIFEST_KEY, "index.html", "main.3f2a1b4c5d6e7f80.js"]
+
+
+def test_only_changed_files_are_uploaded_again(s3_client, build_dir):
+    publish(build_dir, BUCKET, s3_client=s3_client)
+    assert publish(build_dir, BUCKET, s3_client=s3_client) == []
+
+    (build_dir / "index.html").write_text(INDEX_HTML + "<!-- changed -->")
+    assert publish(build_dir, BUCKET, s3_client=s3_client, dry_run=True) == ["index.html"]
+    assert publish(build_dir, BUCKET, s3_client=s3_client) == ["index.html"]
+
+
+def test_bucket_published_with_gzip_bodies_is_uploaded_again(s3_client, build_dir):
+    # Publishes before the manifest moved stored gzip bodies and kept the manifest in the bucket root
+    legacy_manifest = {
+        path.name: {"sha256": hashlib.sha256(path.read_bytes()).hexdigest(), "encoding": "gzip"}
+        for path in (build_dir / "index.html", build_dir / "main.3f2a1b4c5d6e7f80.js")
+    }
+    s3_client.put_object(Bucket=BUCKET, Key=".publish-manifest.json", Body=json.dumps(legacy_manifest).encode())
+
+    assert sorted(publish(build_dir, BUCKET, s3_client=s3_client)) == ["index.html", "main.3f2a1b4c5d6e7f80.js"]
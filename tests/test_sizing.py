@@ -0,0 +1,71 @@
+import pytest
+
+from sizing import (
+    APP_RUNNER_MAX_INSTANCES,
+    CapacityPlan,
+    CapacityPlanError,
+    LoadProfile,
+    instance_throughput,
+    plan_capacity,
+)
+
+
+def test_small_load_fits_the_smallest_tier():
+    plan = plan_capacity(LoadProfile(peak_rps=1, p95_latency_ms=100, cpu_ms_per_request=10))
+
+    assert plan == CapacityPlan(min_instances=1, max_instances=1, max_concurrency=2, cpu=256, memory=512)
+
+
+def test_no_load_still_keeps_one_instance():
+    plan = plan_capacity(LoadProfile(peak_rps=0, p95_latency_ms=100, cpu_ms_per_request=10))
+
+    assert (plan.min_instances, plan.max_instances, plan.max_concurrency) == (1, 1, 2)
+
+
+def test_peak_at_the_instance_limit_stays_on_the_tier():
+    peak_rps = APP_RUNNER_MAX_INSTANCES * instance_throughput(256, 10)
+
+    plan = plan_capacity(LoadProfile(peak_rps=peak_rps, p95_latency_ms=100, cpu_ms_per_request=10))
+
+    assert (plan.cpu, plan.max_instances) == (256, APP_RUNNER_MAX_INSTANCES)
+
+
+def test_peak_above_the_instance_limit_moves_to_the_next_tier():
+    peak_rps = APP_RUNNER_MAX_INSTANCES * instance_throughput(256, 10) + 0.1
+
+    plan = plan_capacity(LoadProfile(peak_rps=peak_rps, p95_latency_ms=100, cpu_ms_per_request=10))
+
+    assert (plan.cpu, plan.memory, plan.max_instances) == (512, 1024, 13)
+
+
+def test_memory_per_request_moves_to_a_tier_with_enough_memory():
+    plan = plan_capacity(LoadProfile(peak_rps=1, p95_latency_ms=1000, cpu_ms_per_request=10, memory_mb_per_request=40))
+
+    # 384 MB base + 70 requests in flight x 40 MB do not fit the 256 and 512 CPU tiers' 1024 MB
+    assert plan == CapacityPlan(min_instances=1, max_instances=1, max_concurrency=70, cpu=1024, memory=4096)
+
+
+def test_baseline_above_peak_is_capped_at_max_instances():
+    plan = plan_capacity(LoadProfile(peak_rps=10, p95_latency_ms=100, cpu_ms_per_request=10, baseline_rps=100))
+
+    assert plan.min_instances == plan.max_instances == 1
+
+
+def test_baseline_keeps_warm_instances():
+    plan = plan_capacity(LoadProfile(peak_rps=400, p95_latency_ms=100, cpu_ms_per_request=10, baseline_rps=100))
+
+    assert (plan.cpu, plan.min_instances, plan.max_instances) == (256, 6, 23)
+
+
+@pytest.mark.parametrize(
+    "profile",
+    [
+        # More instances than App Runner allows even on its largest tier
+        LoadProfile(peak_rps=100000, p95_latency_ms=100, cpu_ms_per_request=10),
+        # More requests in flight per instance than App Runner's concurrency limit on every tier
+        LoadProfile(peak_rps=10, p95_latency_ms=12000, cpu_ms_per_request=10),
+    ],
+)
+def test_unservable_profile_is_rejected(profile):
+    with pytest.raises(CapacityPlanError):
+        plan_capacity(profile)
@@ -0,0 +1,115 @@
+import pulumi
+import pytest
+
+from conftest import STACK_CONFIG
+from stack_config import BackendConfig, CommonConfig, DatabaseConfig, StackConfigError
+
+
+@pytest.fixture
+def load_config():
+    def load(config_class, config):
+        pulumi.runtime.set_all_config({**STACK_CONFIG, **config})
+        return config_class.load()
+
+    yield load
+    pulumi.runtime.set_all_config({})
+
+
+def test_database_defaults_apply_to_unset_keys(load_config):
+    database_config = load_config(DatabaseConfig, {})
+
+    assert database_config.max_pool_size == DatabaseConfig.max_pool_size
+    assert database_config.connect_timeout_ms == DatabaseConfig.connect_timeout_ms
+    assert database_config.server_selection_timeout_ms == DatabaseConfig.server_selection_timeout_ms
+
+
+def test_explicit_zero_is_kept_and_validated(load_config):
+    database_config = load_config(
+        DatabaseConfig,
+        {
+            "database:max_pool_size": "0",
+            "database:connect_timeout_ms": "0",
+            "database:server_selection_timeout_ms": "0",
+        },
+    )
+
+    assert (database_config.connect_timeout_ms, database_config.server_selection_timeout_ms) == (0, 0)
+    assert database_config.max_pool_size == 0
+    assert database_config.validate() == ["database:max_pool_size must be at least 1"]
+
+
+def test_negative_timeout_is_rejected(load_config):
+    database_config = load_config(DatabaseConfig, {"database:connect_timeout_ms": "-1"})
+
+    assert database_config.validate() == ["database:connect_timeout_ms must not be negative"]
+
+
+def test_explicit_zero_load_profile_values_are_kept(load_config):
+    load_profile = load_config(
+        BackendConfig,
+        {
+            "backend:load_peak_rps": "100",
+            "backend:load_p95_latency_ms": "200",
+            "backend:load_cpu_ms_per_request": "20",
+            "backend:load_memory_mb_per_request": "0",
+        },
+    ).load_profile
+
+    assert load_profile.memory_mb_per_request == 0
+    assert load_profile.baseline_rps == 0
+
+
+def test_unselected_components_are_those_of_the_stack_or_its_layer(load_config):
+    assert load_config(CommonConfig, {}).unselected_components == ()
+    assert load_config(CommonConfig, {"WeatherAlerting:components": '["frontend"]'}).unselected_components == (
+        "networking",
+        "database",
+        "cache",
+        "email",
+        "backend",
+        "alerts",
+        "api_edge",
+        "warm_capacity",
+        "monitoring",
+    )
+    layer_config = {"WeatherAlerting:layer": "app", "WeatherAlerting:components": '["email"]'}
+    assert load_config(CommonConfig, layer_config).unselected_components == (
+        "backend",
+        "alerts",
+        "api_edge",
+        "warm_capacity",
+    )
+
+
+def test_subset_preview_warns_about_the_deletes_of_unselected_components(run_program, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(pulumi.log, "warn", lambda message, *args, **kwargs: warnings.append(message))
+
+    program = run_program({"WeatherAlerting:components": '["frontend"]'})
+
+    assert not program.of_type("aws:apprunner/service:Service")
+    assert any(
+        warning.startswith("Previewing only frontend: the deletes of the resources of networking, database")
+        for warning in warnings
+    )
+
+
+@pytest.mark.parametrize("compute, architecture", [("app_runner", "x86_64"), ("ecs_fargate", "arm64")])
+def test_image_architecture_follows_the_compute_platform(load_config, compute, architecture):
+    backend_config = load_config(BackendConfig, {"backend:compute": compute})
+
+    assert backend_config.image_architecture == architecture
+
+
+def test_backend_previews_without_the_disabled_components_it_depends_on(run_program):
+    program = run_program({"WeatherAlerting:components": '["networking", "database", "backend"]'})
+
+    assert len(program.of_type("aws:apprunner/service:Service")) == 1
+    assert program.of_type("aws:elasticache/replicationGroup:ReplicationGroup") == []
+
+
+def test_backend_preview_needs_the_enabled_components_it_depends_on(run_program):
+    config = {"WeatherAlerting:components": '["networking", "database", "backend"]', "cache:enabled": "true"}
+
+    with pytest.raises(StackConfigError, match=r"selects backend without \['cache'\]"):
+        run_program(config)
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+WARM_CAPACITY_CONFIG = {
+    "backend:auto_scaling_max_instances": "3",
+    "database:max_pool_size": "10",
+    "warm_capacity:enabled": "true",
+}
+BASE_CONFIGURATION = "AppRunnerAutoScalingConfig"
+WARM_CONFIGURATION = "AppRunnerWarmAutoScalingConfig"
+
+
+@pytest.fixture
+def program(run_program):
+    return run_program(WARM_CAPACITY_CONFIG)
+
+
+def configuration_named(program, name):
+    return next(
+        resource
+        for resource in program.of_type("aws:apprunner/autoScalingConfigurationVersion:AutoScalingConfigurationVersion")
+        if resource.inputs["autoScalingConfigurationName"] == name
+    )
+
+
+def test_replaced_configurations_are_kept_for_the_scaler_to_delete(program):
+    base = configuration_named(program, BASE_CONFIGURATION)
+    warm = configuration_named(program, WARM_CONFIGURATION)
+
+    assert {base.name, warm.name} <= program.retained
+
+    access = json.loads(program.named("WarmCapacityScalerAccess").inputs["policy"])
+    deletes = next(
+        statement
+        for statement in access["Statement"]
+        if statement["Action"] == "apprunner:DeleteAutoScalingConfiguration"
+    )
+    assert sorted(deletes["Resource"]) == [
+        f"arn:aws:mock:eu-central-1:163636840347:{base.name}/*",
+        f"arn:aws:mock:eu-central-1:163636840347:{warm.name}/*",
+    ]
+
+
+def test_replaced_configuration_is_applied_by_the_refresh_invocation(program):
+    refresh = program.named("WarmCapacityRefresh")
+
+    assert json.loads(refresh.inputs["input"]) == {"configuration": "current"}
+    assert set(refresh.inputs["triggers"]) == {"base_configuration_arn", "warm_configuration_arn"}
+
+
+def test_configuration_is_deleted_with_the_stack_without_warm_capacity(run_program):
+    program = run_program({"database:max_pool_size": "10"})
+
+    assert configuration_named(program, BASE_CONFIGURATION).name not in program.retained
@@ -0,0 +1,155 @@
+import importlib.util
+import os
+
+import pytest
+
+HANDLER_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "functions",
+    "warm_capacity_scaler",
+    "handler.py",
+)
+SERVICE_ARN = "arn:aws:apprunner:eu-central-1:163636840347:service/AppRunnerService/1"
+CONFIGURATION_ARN = "arn:aws:apprunner:eu-central-1:163636840347:autoscalingconfiguration"
+WARM_ARN = f"{CONFIGURATION_ARN}/AppRunnerWarmAutoScalingConfig/2/b2"
+BASE_ARN = f"{CONFIGURATION_ARN}/AppRunnerAutoScalingConfig/2/a2"
+OLD_WARM_ARN = f"{CONFIGURATION_ARN}/AppRunnerWarmAutoScalingConfig/1/b1"
+OLD_BASE_ARN = f"{CONFIGURATION_ARN}/AppRunnerAutoScalingConfig/1/a1"
+
+
+class InvalidRequestException(Exception):
+    pass
+
+
+# StandInAppRunner reports the service with each of statuses in turn, then keeps the last one, and holds the
+# revisions of the configurations of the stack, by ARN whether a service uses them.
+class StandInAppRunner:
+    exceptions = type("Exceptions", (), {"InvalidRequestException": InvalidRequestException})
+
+    def __init__(self, statuses, configuration_arn=BASE_ARN, revisions=None, undeletable=()):
+        self.statuses = list(statuses)
+        self.configuration_arn = configuration_arn
+        self.revisions = revisions if revisions is not None else {WARM_ARN: False, BASE_ARN: True}
+        self.undeletable = set(undeletable)
+        self.updates = []
+        self.deletes = []
+
+    def describe_service(self, ServiceArn):
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return {
+            "Service": {
+                "ServiceArn": ServiceArn,
+                "Status": status,
+                "AutoScalingConfigurationSummary": {"AutoScalingConfigurationArn": self.configuration_arn},
+            }
+        }
+
+    def update_service(self, ServiceArn, AutoScalingConfigurationArn):
+        self.updates.append((ServiceArn, AutoScalingConfigurationArn))
+
+    def list_auto_scaling_configurations(self, AutoScalingConfigurationName, LatestOnly):
+        assert not LatestOnly
+        return {
+            "AutoScalingConfigurationSummaryList": [
+                {"AutoScalingConfigurationArn": arn, "HasAssociatedService": in_use}
+                for arn, in_use in self.revisions.items()
+                if arn.split("/")[1] == AutoScalingConfigurationName
+            ]
+        }
+
+    def delete_auto_scaling_configuration(self, AutoScalingConfigurationArn):
+        if AutoScalingConfigurationArn in self.undeletable:
+            raise InvalidRequestException(f"{AutoScalingConfigurationArn} is in use")
+        self.deletes.append(AutoScalingConfigurationArn)
+
+
+class LambdaContext:
+    def __init__(self, remaining_seconds):
+        self.remaining_seconds = remaining_seconds
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_seconds * 1000
+
+
+@pytest.fixture
+def scaler(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-central-1")
+    monkeypatch.setenv("SERVICE_ARN", SERVICE_ARN)
+    monkeypatch.setenv("WARM_CONFIGURATION_ARN", WARM_ARN)
+    monkeypatch.setenv("BASE_CONFIGURATION_ARN", BASE_ARN)
+    spec = importlib.util.spec_from_file_location("warm_capacity_scaler_handler", HANDLER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sleeps = []
+    monkeypatch.setattr(module.time, "sleep", sleeps.append)
+    module.sleeps = sleeps
+    return module
+
+
+def test_running_service_is_swapped_to_the_warm_configuration(scaler):
+    scaler.apprunner = StandInAppRunner(["RUNNING"])
+
+    assert scaler.handler({"configuration": "warm"}, LambdaContext(300)) == {"updated": True}
+    assert scaler.apprunner.updates == [(SERVICE_ARN, WARM_ARN)]
+    assert scaler.sleeps == []
+
+
+def test_service_already_on_the_configuration_is_left_alone(scaler):
+    scaler.apprunner = StandInAppRunner(["RUNNING"], configuration_arn=BASE_ARN)
+
+    assert scaler.handler({"configuration": "base"}, LambdaContext(300)) == {"updated": False}
+    assert scaler.apprunner.updates == []
+
+
+def test_deployment_in_progress_is_waited_out(scaler):
+    scaler.apprunner = StandInAppRunner(["OPERATION_IN_PROGRESS", "OPERATION_IN_PROGRESS", "RUNNING"])
+
+    assert scaler.handler({"configuration": "warm"}, LambdaContext(300)) == {"updated": True}
+    assert scaler.sleeps == [scaler.POLL_INTERVAL_SECONDS] * 2
+    assert scaler.apprunner.updates == [(SERVICE_ARN, WARM_ARN)]
+
+
+def test_service_not_running_before_the_timeout_fails_the_invocation(scaler):
+    scaler.apprunner = StandInAppRunner(["OPERATION_IN_PROGRESS"])
+    remaining_seconds = scaler.POLL_INTERVAL_SECONDS + scaler.UPDATE_MARGIN_SECONDS - 1
+
+    with pytest.raises(RuntimeError, match="is OPERATION_IN_PROGRESS, the swap is retried"):
+        scaler.handler({"configuration": "warm"}, LambdaContext(remaining_seconds))
+    assert scaler.apprunner.updates == []
+    assert scaler.sleeps == []
+
+
+@pytest.mark.parametrize(
+    "configuration_arn, latest_arn",
+    [(OLD_BASE_ARN, BASE_ARN), (OLD_WARM_ARN, WARM_ARN)],
+)
+def test_refresh_moves_the_service_to_the_latest_revision_of_its_configuration(scaler, configuration_arn, latest_arn):
+    scaler.apprunner = StandInAppRunner(["RUNNING"], configuration_arn=configuration_arn)
+
+    assert scaler.handler({"configuration": "current"}, LambdaContext(300)) == {"updated": True}
+    assert scaler.apprunner.updates == [(SERVICE_ARN, latest_arn)]
+
+
+def test_refresh_of_a_service_on_the_latest_revision_is_left_alone(scaler):
+    scaler.apprunner = StandInAppRunner(["RUNNING"], configuration_arn=WARM_ARN)
+
+    assert scaler.handler({"configuration": "current"}, LambdaContext(300)) == {"updated": False}
+    assert scaler.apprunner.updates == []
+
+
+def test_replaced_revisions_are_deleted_once_no_service_uses_them(scaler):
+    revisions = {OLD_BASE_ARN: True, BASE_ARN: False, OLD_WARM_ARN: False, WARM_ARN: False}
+    scaler.apprunner = StandInAppRunner(["RUNNING"], configuration_arn=OLD_BASE_ARN, revisions=revisions)
+
+    scaler.handler({"configuration": "current"}, LambdaContext(300))
+
+    assert scaler.apprunner.deletes == [OLD_WARM_ARN]
+
+
+def test_revision_that_can_not_be_deleted_is_kept(scaler):
+    revisions = {OLD_BASE_ARN: False, BASE_ARN: True, OLD_WARM_ARN: False, WARM_ARN: False}
+    scaler.apprunner = StandInAppRunner(["RUNNING"], revisions=revisions, undeletable=[OLD_BASE_ARN])
+
+    assert scaler.handler({"configuration": "base"}, LambdaContext(300)) == {"updated": False}
+    assert scaler.apprunner.deletes == [OLD_WARM_ARN]